@@ -2,7 +2,9 @@
 import gradio as gr
 import os
 from pathlib import Path
-from food_recognition import build_food_recognition_page
+from food_recognition import (build_food_recognition_page, start_model_workers, stop_model_workers, preload_models,
+                              configure_intra_op_threads)
+from config import MODEL_WORKER_MODE, PRELOAD_MODELS
 from constitution_analysis import build_constitution_analysis_page
 from health_advice import build_health_advice_page
 
@@ -2273,8 +2275,21 @@ if __name__ == "__main__":
     import argparse
     parser = argparse.ArgumentParser(description='啟動中醫食物寒熱辨識與體質分析系統')
     parser.add_argument('--server_port', type=int, default=7861, help='服務器端口')
+    parser.add_argument('--model_workers', action='store_true', help='以獨立工作程序載入與執行辨識模型')
     args = parser.parse_args()
     
+    # 依同時執行的模型數分配 torch intra-op 執行緒（作用於整個程序，包含微批次排程執行緒）
+    configure_intra_op_threads()
+    
+    # 模型工作程序模式：模型在工作程序中載入，等待各程序回報載入結果後再啟動 UI
+    if args.model_workers or MODEL_WORKER_MODE:
+        import atexit
+        if start_model_workers() is not None:
+            atexit.register(stop_model_workers)
+    elif PRELOAD_MODELS:
+        # 在背景平行預載模型，UI 立即啟動並顯示各模型就緒狀態
+        preload_models()
+    
     app = build_main_app()
     print("🚀 應用啟動中...")
     print("📝 提示：請手動在瀏覽器中打開下方 URL")
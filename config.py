@@ -45,6 +45,127 @@ def load_food_database_from_csv(csv_file="food_database.csv"):
 # 載入食物資料庫
 FOOD_DATABASE = load_food_database_from_csv()
 
+# 食物辨識效能設定（可透過環境變數覆寫）
+# 多模型辨識時同時執行的模型數量，設為 1 則逐一執行
+ENSEMBLE_MAX_WORKERS = int(os.getenv("ENSEMBLE_MAX_WORKERS", "4"))
+
+# 模型工作程序模式：每組模型由獨立程序長駐載入與推論（MODEL_WORKER_MODE=1 啟用）
+MODEL_WORKER_MODE = os.getenv("MODEL_WORKER_MODE", "0") == "1"
+# 模型分組，以分號分隔各工作程序、逗號分隔同一程序內的模型；較重的模型獨立一組
+MODEL_WORKER_GROUPS = [
+    [name.strip() for name in group.split(",") if name.strip()]
+    for group in os.getenv(
+        "MODEL_WORKER_GROUPS",
+        "vgg_model_78;swin_model_94;swinv2_model_94,vit_model_74;convnext_90,densenet_86,efficientnet_84,resnet50_78"
+    ).split(";")
+    if group.strip()
+]
+# 是否將各工作程序綁定到專屬的 CPU 核心
+MODEL_WORKER_PIN_CORES = os.getenv("MODEL_WORKER_PIN_CORES", "0") == "1"
+# 等待工作程序回應的秒數
+MODEL_WORKER_TIMEOUT = float(os.getenv("MODEL_WORKER_TIMEOUT", "120"))
+
+# 啟動時是否在背景平行預載所有模型（PRELOAD_MODELS=0 停用，改為第一次辨識時載入）
+PRELOAD_MODELS = os.getenv("PRELOAD_MODELS", "1") == "1"
+# 背景預載時同時載入的模型數量
+PRELOAD_MAX_WORKERS = int(os.getenv("PRELOAD_MAX_WORKERS", "2"))
+# 辨識時等待背景預載中模型的最長秒數，逾時則略過該模型
+MODEL_READY_TIMEOUT = float(os.getenv("MODEL_READY_TIMEOUT", "10"))
+
+# 常駐模型的記憶體預算（MB），超出時釋放最久未使用的模型；0 表示不限制
+MODEL_MEMORY_BUDGET_MB = float(os.getenv("MODEL_MEMORY_BUDGET_MB", "0"))
+# 不會因記憶體預算被釋放的模型（逗號分隔）
+MODEL_PINNED = [name.strip() for name in os.getenv("MODEL_PINNED", "").split(",") if name.strip()]
+# 模型載入失敗後，首次等待多少秒才再次嘗試載入（期間直接使用模擬模式），之後每次失敗加倍
+MODEL_LOAD_RETRY_SECONDS = float(os.getenv("MODEL_LOAD_RETRY_SECONDS", "60"))
+# 重試等待秒數的上限
+MODEL_LOAD_RETRY_MAX_SECONDS = float(os.getenv("MODEL_LOAD_RETRY_MAX_SECONDS", "3600"))
+# 標準化檢查點與 manifest 的存放目錄（由 python3 model_store.py 產生），有記錄的模型直接依 manifest 載入
+MODEL_STORE_DIR = os.getenv("MODEL_STORE_DIR", "./model/canonical")
+# 標準化檢查點是否以記憶體映射載入（多個程序共用頁面快取中的同一份權重；MODEL_MMAP=0 停用）
+MODEL_MMAP = os.getenv("MODEL_MMAP", "1") == "1"
+# 半精度儲存的權重如何推論："fp32" 載入時轉回 fp32（會複製權重，記憶體映射無法共用）；
+# "bf16" 在 CPU/GPU 支援時直接以 bf16 儲存的權重推論，不需複製
+MODEL_COMPUTE_DTYPE = os.getenv("MODEL_COMPUTE_DTYPE", "fp32")
+
+# 模型推論後端："torch" 為原本的 fp32 推論；"compiled" 使用凍結的 TorchScript（conv-bn 折疊、卷積網路可用 channels-last，
+# 首次使用時編譯並快取）；"int8" 使用 CPU int8 量化模型（首次使用時量化並快取）；
+# "onnx" 使用 ONNX Runtime（首次使用時匯出並快取）；單次辨識也可由 backend 參數指定
+MODEL_BACKEND = os.getenv("MODEL_BACKEND", "torch")
+# 編譯模型（凍結的 TorchScript）的快取目錄
+COMPILED_MODEL_DIR = os.getenv("COMPILED_MODEL_DIR", "./model/compiled")
+# int8 量化模型的快取目錄
+QUANTIZED_MODEL_DIR = os.getenv("QUANTIZED_MODEL_DIR", "./model/int8")
+# 靜態量化校正使用的圖片目錄（與量化報告評估用的樣本圖片分開，報告會排除校正圖片；
+# 目錄不存在或沒有圖片時，ResNet 等需要靜態量化的模型不量化，int8 後端以 fp32 推論，量化報告列為略過）
+QUANTIZATION_CALIBRATION_DIR = os.getenv("QUANTIZATION_CALIBRATION_DIR", "./model/calibration")
+# 匯出的 ONNX 模型快取目錄
+ONNX_MODEL_DIR = os.getenv("ONNX_MODEL_DIR", "./model/onnx")
+# 每個 ONNX Runtime session 的 intra-op 執行緒數，0 表示依多模型並行數平均分配 CPU
+ONNX_INTRA_OP_THREADS = int(os.getenv("ONNX_INTRA_OP_THREADS", "0"))
+
+# 跨請求微批次：同一模型同時到達的請求合併為一次批次推論的最大輸入列數（預設 1 停用）；
+# 每個請求在每個模型都需等待 MICRO_BATCH_WAIT_MS，只適合多人同時使用的部署（例如設為 8）；
+# 測試時增強（4 列）、餐盤區塊（9 列）等多列請求依列數計算，列數已達上限的請求單獨推論
+MICRO_BATCH_MAX_SIZE = int(os.getenv("MICRO_BATCH_MAX_SIZE", "1"))
+# 取得第一個請求後等待後續請求的最長時間（毫秒）
+MICRO_BATCH_WAIT_MS = float(os.getenv("MICRO_BATCH_WAIT_MS", "5"))
+
+# 上傳圖片的工作尺寸（最長邊像素）：JPEG 以 draft 模式縮小解碼並依 EXIF 方向轉正，0 表示不縮小
+UPLOAD_MAX_SIDE = int(os.getenv("UPLOAD_MAX_SIDE", "1024"))
+
+# 測試時增強（TTA）：原圖、中央裁切與兩者的水平翻轉組成一個批次，每個模型一次推論後平均 logits（TTA_ENABLED=1 啟用）
+TTA_ENABLED = os.getenv("TTA_ENABLED", "0") == "1"
+# TTA 中央裁切保留的邊長比例
+TTA_CROP_FRACTION = float(os.getenv("TTA_CROP_FRACTION", "0.875"))
+# 使用 TTA 時多模型辨識執行的模型（逗號分隔，可指定較少的模型以降低總運算量；空白表示全部模型）
+TTA_ENSEMBLE_MODELS = [name.strip() for name in os.getenv("TTA_ENSEMBLE_MODELS", "").split(",") if name.strip()]
+
+# 餐盤多食物辨識使用的模型（逗號分隔；空白表示全部模型），每個模型以一次批次推論所有區塊
+PLATE_MODELS = [name.strip() for name in os.getenv("PLATE_MODELS", "").split(",") if name.strip()]
+# 餐盤辨識將圖片切成 PLATE_GRID x PLATE_GRID 個區塊，相鄰區塊重疊 PLATE_TILE_OVERLAP（區塊邊長的比例）
+PLATE_GRID = int(os.getenv("PLATE_GRID", "3"))
+PLATE_TILE_OVERLAP = float(os.getenv("PLATE_TILE_OVERLAP", "0.25"))
+# 區塊的融合信心度（%）達到此值才列入食物列表與五性平衡
+PLATE_MIN_CONFIDENCE = int(os.getenv("PLATE_MIN_CONFIDENCE", "30"))
+# 食物列表最多列出的食物數
+PLATE_MAX_FOODS = int(os.getenv("PLATE_MAX_FOODS", "5"))
+
+# 辨識結果快取的最大筆數（以圖片像素雜湊、模型與後端為鍵；0 表示停用）
+RESULT_CACHE_SIZE = int(os.getenv("RESULT_CACHE_SIZE", "256"))
+# 快取結果的有效秒數（0 表示不過期）
+RESULT_CACHE_TTL_SECONDS = float(os.getenv("RESULT_CACHE_TTL_SECONDS", "3600"))
+# 精確雜湊未命中時，感知雜湊（64 位元 dHash）漢明距離不超過此值的圖片視為同一張並使用快取結果（負數表示停用）
+NEAR_DUPLICATE_MAX_DISTANCE = int(os.getenv("NEAR_DUPLICATE_MAX_DISTANCE", "4"))
+
+# 多模型辨識前的圖片品質檢查："warn" 照常辨識並附上提醒，"reject" 拒絕品質不足的圖片（不執行模型推論），"off" 不檢查
+# 門檻只以少量範例圖片調整過，在實際上傳的圖片上驗證前預設只提醒
+QUALITY_GATE_MODE = os.getenv("QUALITY_GATE_MODE", "warn")
+# 品質檢查縮圖的最長邊（像素）
+QUALITY_THUMBNAIL_SIDE = int(os.getenv("QUALITY_THUMBNAIL_SIDE", "256"))
+# 縮圖拉普拉斯變異數低於 QUALITY_MIN_SHARPNESS 拒絕（嚴重模糊），低於 QUALITY_WARN_SHARPNESS 提醒
+QUALITY_MIN_SHARPNESS = float(os.getenv("QUALITY_MIN_SHARPNESS", "8"))
+QUALITY_WARN_SHARPNESS = float(os.getenv("QUALITY_WARN_SHARPNESS", "25"))
+# 平均亮度（0-255）超出此範圍拒絕（過暗或過亮）
+QUALITY_MIN_BRIGHTNESS = float(os.getenv("QUALITY_MIN_BRIGHTNESS", "25"))
+QUALITY_MAX_BRIGHTNESS = float(os.getenv("QUALITY_MAX_BRIGHTNESS", "245"))
+# 全黑或全白像素的比例超過此值時提醒曝光問題
+QUALITY_MAX_CLIPPED_FRACTION = float(os.getenv("QUALITY_MAX_CLIPPED_FRACTION", "0.5"))
+# 亮度標準差低於此值拒絕（沒有內容的單色圖片）
+QUALITY_MIN_CONTRAST = float(os.getenv("QUALITY_MIN_CONTRAST", "6"))
+# 判斷是否為食物的小型模型（空白表示不使用），最高信心度（%）低於 QUALITY_MIN_CONFIDENCE 時拒絕
+QUALITY_GATE_MODEL = os.getenv("QUALITY_GATE_MODEL", "")
+QUALITY_MIN_CONFIDENCE = int(os.getenv("QUALITY_MIN_CONFIDENCE", "10"))
+
+# 多模型辨識模式："all" 執行全部模型投票，"cascade" 依固定順序執行並在達成共識時提前停止
+ENSEMBLE_MODE = os.getenv("ENSEMBLE_MODE", "all")
+# 串接模式的執行順序："cheapest" 運算量小的模型優先，"accurate" 準確度高的模型優先
+CASCADE_ORDER = os.getenv("CASCADE_ORDER", "cheapest")
+# 串接模式中同一食物達到此票數即停止
+CASCADE_MIN_VOTES = int(os.getenv("CASCADE_MIN_VOTES", "3"))
+# 串接模式中單一模型信心度（%）達到此值即停止，設為 101 以上則停用
+CASCADE_CONFIDENCE_THRESHOLD = int(os.getenv("CASCADE_CONFIDENCE_THRESHOLD", "95"))
+
 # 體質類型定義
 CONSTITUTION_TYPES = {
     "平和質": "陰陽氣血調和，體質平和",
@@ -0,0 +1,110 @@
+# food_catalog.py - 食物目錄模組
+# 由食物資料庫一次建立精簡的食物記錄與各種索引，辨識與建議流程皆以索引查詢取代逐筆比對
+import math
+from collections import namedtuple
+from typing import Dict, List, Optional
+import numpy as np
+from config import FOOD_DATABASE
+
+# 五性順序（由寒至熱），五性分佈與五性矩陣的欄位依此順序
+FIVE_NATURES = ["寒", "涼", "平", "溫", "熱"]
+
+# 訓練時使用的標籤列表 (必須與訓練時一致)
+TRAINING_LABELS = ['Abalone', 'Abalonemushroom', 'Achoy', 'Adzukibean', 'Alfalfasprouts', 'Almond', 'Apple', 'Asparagus', 'Avocado', 'Babycorn', 'Bambooshoot', 'Banana', 'Beeftripe', 'Beetroot', 'Birds-nestfern', 'Birdsnest', 'Bittermelon', 'Blackmoss', 'Blackpepper', 'Blacksoybean', 'Blueberry', 'Bokchoy', 'Brownsugar', 'Buckwheat', 'Cabbage', 'Cardamom', 'Carrot', 'Cashewnut', 'Cauliflower', 'Celery', 'Centuryegg', 'Cheese', 'Cherry', 'Chestnut', 'Chilipepper', 'Chinesebayberry', 'Chinesechiveflowers', 'Chinesechives', 'Chinesekale', 'Cilantro', 'Cinnamon', 'Clove', 'Cocoa', 'Coconut', 'Corn', 'Cowpea', 'Crab', 'Cream', 'Cucumber', 'Daikon', 'Dragonfruit', 'Driedpersimmon', 'Driedscallop', 'Driedshrimp', 'Duckblood', 'Durian', 'Eggplant', 'Enokimushroom', 'Fennel', 'Fig', 'Fishmint', 'Freshwaterclam', 'Garlic', 'Ginger', 'Glutinousrice', 'Gojileaves', 'Grape', 'Grapefruit', 'GreenSoybean', 'Greenbean', 'Greenbellpepper', 'Greenonion', 'Guava', 'Gynuradivaricata', 'Headingmustard', 'Honey', 'Jicama', 'Jobstears', 'Jujube', 'Kale', 'Kelp', 'Kidneybean', 'Kingoystermushroom', 'Kiwifruit', 'Kohlrabi', 'Kumquat', 'Lettuce', 'Limabean', 'Lime', 'Lobster', 'Longan', 'Lotusroot', 'Lotusseed', 'Luffa', 'Lychee', 'Madeira_vine', 'Maitakemushroom', 'Mandarin', 'Mango', 'Mangosteen', 'Milk', 'Millet', 'Minongmelon', 'Mint', 'Mungbean', 'Napacabbage', 'Natto', 'Nori', 'Nutmeg', 'Oat', 'Octopus', 'Okinawaspinach', 'Okra', 'Olive', 'Onion', 'Orange', 'Oystermushroom', 'Papaya', 'Parsley', 'Passionfruit', 'Pea', 'Peach', 'Peanut', 'Pear', 'Pepper', 'Perilla', 'Persimmon', 'Pickledmustardgreens', 'Pineapple', 'Pinenut', 'Plum', 'Pomegranate', 'Pomelo', 'Porktripe', 'Potato', 'Pumpkin', 'Pumpkinseed', 'Quailegg', 'Radishsprouts', 'Rambutan', 'Raspberry', 'Redamaranth', 'Reddate', 'Rice', 'Rosemary', 'Safflower', 'Saltedpotherbmustard', 'Seacucumber', 'Seaurchin', 'Sesameseed', 'Shaggymanemushroom', 'Shiitakemushroom', 'Shrimp', 'Snowfungus', 'Soybean', 'Soybeansprouts', 'Soysauce', 'Staranise', 'Starfruit', 'Strawberry', 'Strawmushroom', 'Sugarapple', 'Sunflowerseed', 'Sweetpotato', 'Sweetpotatoleaves', 'Taro', 'Thyme', 'Tofu', 'Tomato', 'Wasabi', 'Waterbamboo', 'Watercaltrop', 'Watermelon', 'Waterspinach', 'Waxapple', 'Wheatflour', 'Wheatgrass', 'Whitepepper', 'Wintermelon', 'Woodearmushroom', 'Yapear', 'Yauchoy', 'spinach']
+
+# 單一食物的精簡記錄
+FoodRecord = namedtuple("FoodRecord", ["chinese", "english", "nature"])
+
+def normalize_name(name):
+    """
+    將英文名稱轉換為正規化格式（移除空格、連字符等，轉為小寫）
+    Args:
+        name: 需要正規化的名稱
+    Returns:
+        正規化後的名稱
+    """
+    if not name or (isinstance(name, float) and math.isnan(name)):
+        return ""
+    # 移除空格、連字符、底線，轉為小寫
+    normalized = str(name).replace(" ", "").replace("-", "").replace("_", "").lower()
+    return normalized
+
+def normalize_nature(nature: str) -> str:
+    """將「溫性」等寫法統一為單字的五性（如「溫」）"""
+    return str(nature).strip().rstrip("性")
+
+class FoodCatalog:
+    """
+    食物目錄：每種食物一筆 FoodRecord，並提供以訓練標籤索引、正規化英文名、
+    中文名與五性查詢的 O(1) 索引
+    """
+
+    def __init__(self, food_database: Dict, training_labels: List[str]):
+        """
+        Args:
+            food_database: config.FOOD_DATABASE 格式的食物資料庫（由 food_database.csv 載入）
+            training_labels: 模型訓練時使用的標籤列表，索引即模型輸出的類別索引
+        """
+        self.records = []
+        self._by_chinese = {}
+        self._by_english = {}
+        self._by_nature = {nature: [] for nature in FIVE_NATURES}
+
+        for chinese_name, food_info in food_database.items():
+            record = FoodRecord(
+                chinese=chinese_name,
+                english=food_info.get("英文名", ""),
+                nature=food_info["五性"]
+            )
+            self.records.append(record)
+            self._by_chinese[chinese_name] = record
+
+            # 同一正規化英文名出現多次時保留資料庫中的第一筆
+            normalized_english = normalize_name(record.english)
+            if normalized_english and normalized_english not in self._by_english:
+                self._by_english[normalized_english] = record
+
+            nature = normalize_nature(record.nature)
+            if nature in self._by_nature:
+                self._by_nature[nature].append(record)
+
+        # 訓練標籤索引 -> 食物記錄，模型輸出的類別索引可直接取得記錄
+        self._by_label_index = [self._by_english.get(normalize_name(label)) for label in training_labels]
+
+        # 訓練標籤索引 -> 五性的 one-hot 矩陣 [n_labels, 5]，找不到對應食物的標籤整列為 0
+        self.label_nature_matrix = np.zeros((len(training_labels), len(FIVE_NATURES)), dtype=np.float32)
+        for label_idx, record in enumerate(self._by_label_index):
+            if record is None:
+                continue
+            nature = normalize_nature(record.nature)
+            if nature in FIVE_NATURES:
+                self.label_nature_matrix[label_idx, FIVE_NATURES.index(nature)] = 1.0
+
+        unmapped = [label for label, record in zip(training_labels, self._by_label_index) if record is None]
+        if unmapped:
+            print(f"⚠️ 以下訓練標籤在食物資料庫中找不到對應項目: {unmapped}")
+
+    def __len__(self):
+        return len(self.records)
+
+    def by_label_index(self, label_idx: int) -> Optional[FoodRecord]:
+        """以模型輸出的類別索引取得食物記錄，找不到時返回 None"""
+        if 0 <= label_idx < len(self._by_label_index):
+            return self._by_label_index[label_idx]
+        return None
+
+    def by_english(self, english_name: str) -> Optional[FoodRecord]:
+        """以英文名稱（不分大小寫、忽略空格與連字符）取得食物記錄"""
+        return self._by_english.get(normalize_name(english_name))
+
+    def by_chinese(self, chinese_name: str) -> Optional[FoodRecord]:
+        """以中文名稱取得食物記錄"""
+        return self._by_chinese.get(chinese_name)
+
+    def by_nature(self, nature: str) -> List[FoodRecord]:
+        """取得指定五性（如「溫」或「溫性」）的所有食物記錄"""
+        return self._by_nature.get(normalize_nature(nature), [])
+
+# 食物目錄：由食物資料庫一次建立，以訓練標籤索引、英文名、中文名、五性查詢食物
+# （載入目錄不需要載入 PyTorch 或辨識模組）
+FOOD_CATALOG = FoodCatalog(FOOD_DATABASE, TRAINING_LABELS)
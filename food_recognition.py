@@ -4,16 +4,40 @@ import gradio as gr
 from typing import Dict
 from PIL import Image
 import os
-import pandas as pd
-from config import FOOD_DATABASE
+import glob
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from config import (FOOD_DATABASE, ENSEMBLE_MAX_WORKERS, MODEL_WORKER_GROUPS,
+                    MODEL_WORKER_PIN_CORES, MODEL_WORKER_TIMEOUT, ENSEMBLE_MODE,
+                    CASCADE_ORDER, CASCADE_MIN_VOTES, CASCADE_CONFIDENCE_THRESHOLD,
+                    PRELOAD_MAX_WORKERS, MODEL_READY_TIMEOUT, MODEL_MEMORY_BUDGET_MB,
+                    MODEL_PINNED, MODEL_LOAD_RETRY_SECONDS, MODEL_LOAD_RETRY_MAX_SECONDS,
+                    MODEL_STORE_DIR, MODEL_MMAP, MODEL_COMPUTE_DTYPE, MODEL_BACKEND,
+                    QUANTIZED_MODEL_DIR, QUANTIZATION_CALIBRATION_DIR, ONNX_MODEL_DIR,
+                    ONNX_INTRA_OP_THREADS, COMPILED_MODEL_DIR, MICRO_BATCH_MAX_SIZE,
+                    MICRO_BATCH_WAIT_MS, RESULT_CACHE_SIZE, RESULT_CACHE_TTL_SECONDS,
+                    NEAR_DUPLICATE_MAX_DISTANCE, UPLOAD_MAX_SIDE, TTA_ENABLED, TTA_CROP_FRACTION,
+                    TTA_ENSEMBLE_MODELS, PLATE_MODELS, PLATE_GRID, PLATE_TILE_OVERLAP,
+                    PLATE_MIN_CONFIDENCE, PLATE_MAX_FOODS, QUALITY_GATE_MODE, QUALITY_THUMBNAIL_SIDE,
+                    QUALITY_MIN_SHARPNESS, QUALITY_WARN_SHARPNESS, QUALITY_MIN_BRIGHTNESS,
+                    QUALITY_MAX_BRIGHTNESS, QUALITY_MAX_CLIPPED_FRACTION, QUALITY_MIN_CONTRAST,
+                    QUALITY_GATE_MODEL, QUALITY_MIN_CONFIDENCE)
 import numpy as np
+from food_catalog import FIVE_NATURES, TRAINING_LABELS, FOOD_CATALOG, normalize_name
+from model_registry import ModelRegistry
+from model_store import ModelStore
+from model_batching import MicroBatcher
+from result_cache import ResultCache, image_digest, perceptual_hash
+from image_ingest import load_image
+from image_quality import ImageQualityGate, QUALITY_WARN, QUALITY_REJECT
 
 # 嘗試導入PyTorch，如果失敗則使用模擬模式
 try:
     import torch
     import torch.nn as nn
-    from torchvision import transforms
     import timm  # 用於載入預訓練模型架構
+    from image_preprocessing import TTA_VIEWS
     TORCH_AVAILABLE = True
     print("✅ PyTorch已載入，使用完整AI模型功能")
 except ImportError:
@@ -33,28 +57,136 @@ except ImportError:
                 def __exit__(self, *args):
                     pass
             return MockContext()
+        
+        inference_mode = no_grad
     
     torch = MockTorch()
 
-# 全域變數來快取已載入的模型
-_loaded_models = {}
+# 已載入模型的註冊表（依記憶體預算以 LRU 順序釋放模型，並記錄載入失敗的模型以退避重試）
+_model_registry = ModelRegistry(budget_bytes=int(MODEL_MEMORY_BUDGET_MB * 1024**2), pinned_models=MODEL_PINNED,
+                                retry_backoff=MODEL_LOAD_RETRY_SECONDS,
+                                max_retry_backoff=MODEL_LOAD_RETRY_MAX_SECONDS)
 
-# 訓練時使用的標籤列表 (必須與訓練時一致)
-TRAINING_LABELS = ['Abalone', 'Abalonemushroom', 'Achoy', 'Adzukibean', 'Alfalfasprouts', 'Almond', 'Apple', 'Asparagus', 'Avocado', 'Babycorn', 'Bambooshoot', 'Banana', 'Beeftripe', 'Beetroot', 'Birds-nestfern', 'Birdsnest', 'Bittermelon', 'Blackmoss', 'Blackpepper', 'Blacksoybean', 'Blueberry', 'Bokchoy', 'Brownsugar', 'Buckwheat', 'Cabbage', 'Cardamom', 'Carrot', 'Cashewnut', 'Cauliflower', 'Celery', 'Centuryegg', 'Cheese', 'Cherry', 'Chestnut', 'Chilipepper', 'Chinesebayberry', 'Chinesechiveflowers', 'Chinesechives', 'Chinesekale', 'Cilantro', 'Cinnamon', 'Clove', 'Cocoa', 'Coconut', 'Corn', 'Cowpea', 'Crab', 'Cream', 'Cucumber', 'Daikon', 'Dragonfruit', 'Driedpersimmon', 'Driedscallop', 'Driedshrimp', 'Duckblood', 'Durian', 'Eggplant', 'Enokimushroom', 'Fennel', 'Fig', 'Fishmint', 'Freshwaterclam', 'Garlic', 'Ginger', 'Glutinousrice', 'Gojileaves', 'Grape', 'Grapefruit', 'GreenSoybean', 'Greenbean', 'Greenbellpepper', 'Greenonion', 'Guava', 'Gynuradivaricata', 'Headingmustard', 'Honey', 'Jicama', 'Jobstears', 'Jujube', 'Kale', 'Kelp', 'Kidneybean', 'Kingoystermushroom', 'Kiwifruit', 'Kohlrabi', 'Kumquat', 'Lettuce', 'Limabean', 'Lime', 'Lobster', 'Longan', 'Lotusroot', 'Lotusseed', 'Luffa', 'Lychee', 'Madeira_vine', 'Maitakemushroom', 'Mandarin', 'Mango', 'Mangosteen', 'Milk', 'Millet', 'Minongmelon', 'Mint', 'Mungbean', 'Napacabbage', 'Natto', 'Nori', 'Nutmeg', 'Oat', 'Octopus', 'Okinawaspinach', 'Okra', 'Olive', 'Onion', 'Orange', 'Oystermushroom', 'Papaya', 'Parsley', 'Passionfruit', 'Pea', 'Peach', 'Peanut', 'Pear', 'Pepper', 'Perilla', 'Persimmon', 'Pickledmustardgreens', 'Pineapple', 'Pinenut', 'Plum', 'Pomegranate', 'Pomelo', 'Porktripe', 'Potato', 'Pumpkin', 'Pumpkinseed', 'Quailegg', 'Radishsprouts', 'Rambutan', 'Raspberry', 'Redamaranth', 'Reddate', 'Rice', 'Rosemary', 'Safflower', 'Saltedpotherbmustard', 'Seacucumber', 'Seaurchin', 'Sesameseed', 'Shaggymanemushroom', 'Shiitakemushroom', 'Shrimp', 'Snowfungus', 'Soybean', 'Soybeansprouts', 'Soysauce', 'Staranise', 'Starfruit', 'Strawberry', 'Strawmushroom', 'Sugarapple', 'Sunflowerseed', 'Sweetpotato', 'Sweetpotatoleaves', 'Taro', 'Thyme', 'Tofu', 'Tomato', 'Wasabi', 'Waterbamboo', 'Watercaltrop', 'Watermelon', 'Waterspinach', 'Waxapple', 'Wheatflour', 'Wheatgrass', 'Whitepepper', 'Wintermelon', 'Woodearmushroom', 'Yapear', 'Yauchoy', 'spinach']
+# 標準化檢查點存放區（manifest 記錄架構、類別數與輸入尺寸，載入時不需推測）
+MODEL_STORE = ModelStore(MODEL_STORE_DIR, mmap=MODEL_MMAP, compute_dtype=MODEL_COMPUTE_DTYPE)
 
-def normalize_name(name):
-    """
-    將英文名稱轉換為正規化格式（移除空格、連字符等，轉為小寫）
-    Args:
-        name: 需要正規化的名稱
-    Returns:
-        正規化後的名稱
-    """
-    if pd.isna(name) or not name:
-        return ""
-    # 移除空格、連字符、底線，轉為小寫
-    normalized = str(name).replace(" ", "").replace("-", "").replace("_", "").lower()
-    return normalized
+# 可用的推論後端："torch" 原本的 PyTorch 推論、"compiled" 凍結的 TorchScript、"int8" CPU int8 量化、"onnx" ONNX Runtime
+MODEL_BACKENDS = ("torch", "compiled", "int8", "onnx")
+
+# 編譯模型的磁碟快取（使用 compiled 後端時第一次使用才建立）
+_compiled_model_cache = None
+
+# int8 量化模型的磁碟快取（使用 int8 後端時第一次使用才建立）
+_quantized_model_cache = None
+
+# 匯出的 ONNX 模型快取（使用 onnx 後端時第一次使用才建立）
+_onnx_model_cache = None
+
+# 各載入函數最近一次的失敗原因（以註冊表鍵區分後端），由 load_model 寫入註冊表的失敗記錄
+_model_load_errors = {}
+# 目前執行緒正在載入的註冊表鍵，載入函數記錄失敗原因時使用
+_model_loading = threading.local()
+
+# 每個模型一把載入鎖，同一模型同時只有一個執行緒執行載入，其他呼叫者等待其結果
+_model_load_locks = {}
+_model_load_locks_guard = threading.Lock()
+
+# 辨識結果快取（以解碼後像素的雜湊、模型與後端為鍵，重複上傳的圖片不再推論；
+# 精確雜湊未命中時以感知雜湊尋找重新壓縮或縮放過的相近圖片）
+_result_cache = ResultCache(max_entries=RESULT_CACHE_SIZE, ttl_seconds=RESULT_CACHE_TTL_SECONDS,
+                            max_hash_distance=NEAR_DUPLICATE_MAX_DISTANCE)
+
+# 多模型辨識前的圖片品質檢查（模糊、曝光、可選的小型模型信心度），品質不足的圖片不執行完整模型
+_quality_gate = ImageQualityGate(thumbnail_side=QUALITY_THUMBNAIL_SIDE, min_sharpness=QUALITY_MIN_SHARPNESS,
+                                 warn_sharpness=QUALITY_WARN_SHARPNESS, min_brightness=QUALITY_MIN_BRIGHTNESS,
+                                 max_brightness=QUALITY_MAX_BRIGHTNESS,
+                                 max_clipped_fraction=QUALITY_MAX_CLIPPED_FRACTION,
+                                 min_contrast=QUALITY_MIN_CONTRAST,
+                                 min_confidence=QUALITY_MIN_CONFIDENCE / 100 if QUALITY_GATE_MODEL else 0.0,
+                                 reject=QUALITY_GATE_MODE == "reject")
+
+# 串接模式實際執行的模型數（用於估計品質檢查拒絕時省下的推論次數，串接通常提前停止）
+_cascade_runs = 0
+_cascade_models_run = 0
+_cascade_stats_lock = threading.Lock()
+
+# 各模型（註冊表鍵）的微批次排程器，合併同時到達的請求為一次批次推論（第一次使用時建立）
+_micro_batchers = {}
+_micro_batchers_lock = threading.Lock()
+
+# 程序啟動時 torch 可用的 intra-op 執行緒總數，多模型並行時依此分配
+_TOTAL_TORCH_THREADS = torch.get_num_threads() if TORCH_AVAILABLE else 1
+
+# 多模型並行辨識使用的執行緒池（延遲建立並重複使用）
+_ensemble_executor = None
+_ensemble_executor_workers = 0
+_ensemble_executor_lock = threading.Lock()
+
+# 模型工作程序池（僅在啟用工作程序模式時建立）
+_model_worker_pool = None
+
+# 背景預載的模型狀態
+MODEL_STATUS_PENDING = "等待載入"
+MODEL_STATUS_LOADING = "載入中"
+MODEL_STATUS_READY = "已就緒"
+MODEL_STATUS_FAILED = "載入失敗（使用模擬模式）"
+MODEL_STATUS_EVICTED = "已釋放（下次使用時重新載入）"
+
+_model_load_status = {}
+_model_ready_events = {}
+_model_status_lock = threading.Lock()
+_preload_executor = None
+
+# 多模型辨識使用的所有模型
+ENSEMBLE_MODELS = [
+    "convnext_90",
+    "densenet_86", 
+    "efficientnet_84",
+    "resnet50_78",
+    "swin_model_94",
+    "swinv2_model_94",
+    "vgg_model_78",
+    "vit_model_74"
+]
+
+# 串接模式的執行順序：依單張推論的運算量（GFLOPs）由小到大
+CASCADE_CHEAPEST_FIRST = [
+    "efficientnet_84",   # EfficientNet-B5 @224 ≈ 2.4
+    "densenet_86",       # DenseNet ≈ 2.9
+    "resnet50_78",       # ResNet50 ≈ 4.1
+    "swinv2_model_94",   # SwinV2-B @192 ≈ 11.9
+    "convnext_90",       # ConvNeXt-B ≈ 15.4
+    "swin_model_94",     # Swin-B ≈ 15.4
+    "vgg_model_78",      # VGG16 ≈ 15.5
+    "vit_model_74"       # ViT-B/16 ≈ 17.6
+]
+
+# 串接模式的執行順序：依驗證準確度（模型名稱後綴）由高到低
+CASCADE_ACCURATE_FIRST = [
+    "swin_model_94",
+    "swinv2_model_94",
+    "convnext_90",
+    "densenet_86",
+    "efficientnet_84",
+    "resnet50_78",
+    "vgg_model_78",
+    "vit_model_74"
+]
+
+# 多模型軟投票的模型權重（依各模型的驗證準確度）
+ENSEMBLE_MODEL_WEIGHTS = {
+    "convnext_90": 0.90,
+    "densenet_86": 0.86,
+    "efficientnet_84": 0.84,
+    "resnet50_78": 0.78,
+    "swin_model_94": 0.94,
+    "swinv2_model_94": 0.94,
+    "vgg_model_78": 0.78,
+    "vit_model_74": 0.74
+}
+
+# 綜合結果列出的候選食物數量
+ENSEMBLE_TOP_K = 3
 
 def map_training_label_to_database(training_label: str) -> str:
     """
@@ -64,21 +196,9 @@ def map_training_label_to_database(training_label: str) -> str:
     Returns:
         對應的資料庫食物名稱 (中文)，如果找不到則返回 None
     """
-    # 模型輸出是英文，直接使用正規化名稱匹配英文名稱
-    normalized_training = normalize_name(training_label)
-    
-    # 檢查資料庫中所有英文名稱的正規化版本
-    for chinese_name, food_info in FOOD_DATABASE.items():
-        english_name = food_info.get("英文名", "")
-        if english_name:
-            normalized_english = normalize_name(english_name)
-            if normalized_training == normalized_english:
-                print(f"英文名稱匹配成功: '{training_label}' -> '{chinese_name}' (通過英文名: '{english_name}')")
-                return chinese_name
-    
-    # 如果找不到匹配項目，返回 None
-    print(f"無法找到匹配項目: '{training_label}'")
-    return None
+    # 模型輸出是英文，以正規化英文名稱索引直接查詢
+    record = FOOD_CATALOG.by_english(training_label)
+    return record.chinese if record else None
 
 def create_model_architecture(model_name: str, num_classes: int = None, state_dict: dict = None):
     """
@@ -290,53 +410,319 @@ def detect_densenet_variant(state_dict):
     # 預設返回 densenet121
     return 'densenet121'
 
-def load_model(model_name: str, model_path: str = None):
+def get_model_key(model_name: str, backend: str = None) -> str:
+    """
+    模型在註冊表中的鍵：PyTorch 後端為模型名稱，其他後端為「模型名稱@後端」
+    Args:
+        model_name: 模型名稱
+        backend: 推論後端，若為 None 則使用 config 的 MODEL_BACKEND
+    """
+    if backend is None:
+        backend = MODEL_BACKEND
+    if backend not in MODEL_BACKENDS:
+        raise ValueError(f"不支援的推論後端: {backend}（可用: {', '.join(MODEL_BACKENDS)}）")
+    return model_name if backend == "torch" else f"{model_name}@{backend}"
+
+def load_model(model_name: str, model_path: str = None, backend: str = None):
     """
     載入 PyTorch 模型 (如果PyTorch可用) 或返回模擬模型
+    載入失敗的模型會記錄原因，重試等待期間直接返回 None，不再重複檢查檔案或建立架構；
+    同一模型同時只會載入一次，並行的呼叫者等待進行中的載入並共用其結果
     Args:
         model_name: 模型名稱
-        model_path: 模型檔案路徑，如果為 None 則使用預設路徑
+        model_path: 模型檔案路徑，如果為 None 則使用預設路徑（指定路徑時一律以 PyTorch 載入）
+        backend: 推論後端（"torch"、"compiled"、"int8" 或 "onnx"），若為 None 則使用 config 的 MODEL_BACKEND
     """
     if not TORCH_AVAILABLE:
         print(f"⚠️ PyTorch未安裝，{model_name} 使用模擬模式")
         return None
+    
+    model_key = get_model_key(model_name, backend)
+    cached_model = _model_registry.get(model_key)
+    if cached_model is not None:
+        return cached_model
+
+    load_lock = _get_model_load_lock(model_key)
+    if not load_lock.acquire(blocking=False):
+        print(f"⏳ 模型 {model_key} 正由其他請求載入中，等待載入完成")
+        load_lock.acquire()
+    
+    try:
+        # 等待期間其他執行緒可能已完成載入或記錄失敗，取得鎖後再檢查一次
+        cached_model = _model_registry.get(model_key, record_stats=False)
+        if cached_model is not None:
+            return cached_model
+
+        if _model_registry.get_failure(model_key) is not None:
+            return None
+
+        _model_load_errors.pop(model_key, None)
+        _model_loading.model_key = model_key
+        backend = model_key.partition("@")[2] or "torch"
+        if backend == "compiled" and model_path is None:
+            model = load_compiled_model(model_name)
+        elif backend == "int8" and model_path is None:
+            model = load_quantized_model(model_name)
+        elif backend == "onnx" and model_path is None:
+            model = load_onnx_model(model_name)
+        else:
+            model = _load_model_from_checkpoint(model_name, model_path)
+        if model is None:
+            reason = _model_load_errors.pop(model_key, "載入失敗，詳見日誌")
+            _model_registry.record_failure(model_key, reason)
+            return None
+
+        _model_registry.put(model_key, model)
+        return model
+    finally:
+        _model_loading.model_key = None
+        load_lock.release()
+
+def _record_load_error(model_name: str, reason: str):
+    """
+    記錄載入函數的失敗原因
+    以目前執行緒正在載入的註冊表鍵（「模型名稱@後端」）為鍵，同一模型的不同後端同時載入時互不覆寫；
+    不經過 load_model 的載入（如轉換檢查點）以模型名稱為鍵
+    """
+    _model_load_errors[getattr(_model_loading, "model_key", None) or model_name] = reason
+
+def load_compiled_model(model_name: str):
+    """
+    載入編譯最佳化的模型（凍結的 TorchScript）：優先使用依檢查點指紋快取的版本，沒有快取時編譯後寫入快取
+    Args:
+        model_name: 模型名稱
+    Returns:
+        編譯後的模型；編譯失敗時返回原本的模型，模型無法載入時返回 None
+    """
+    global _compiled_model_cache
+    from model_compilation import CompiledModelCache, compile_model, apply_inference_optimization
+    
+    if _compiled_model_cache is None:
+        _compiled_model_cache = CompiledModelCache(COMPILED_MODEL_DIR)
+    
+    device = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
+    fingerprint = MODEL_STORE.fingerprint(model_name)
+    if fingerprint is not None:
+        cached_model = _compiled_model_cache.load(model_name, fingerprint, device)
+        if cached_model is not None:
+            return cached_model
+    
+    model = _load_model_from_checkpoint(model_name)
+    if model is None:
+        return None
+    
+    try:
+        start_time = time.time()
+        compiled_model, variant, latencies = compile_model(model.float(), model_name, get_model_input_size(model_name))
+        latency_text = "、".join(f"{name} {latency:.1f} ms" for name, latency in latencies.items())
+        print(f"🔧 模型 {model_name} 已完成編譯，採用 {variant} (耗時 {time.time() - start_time:.1f} 秒；{latency_text})")
+    except Exception as e:
+        print(f"⚠️ 模型 {model_name} 編譯失敗，改用原本的模型推論: {e}")
+        return model
+    
+    if fingerprint is not None:
+        _compiled_model_cache.save(model_name, fingerprint, compiled_model, variant)
+    return apply_inference_optimization(compiled_model, variant)
+
+def load_onnx_model(model_name: str):
+    """
+    載入 ONNX Runtime 推論模型：優先使用依檢查點指紋快取的 .onnx，沒有快取時由 PyTorch 模型匯出
+    Args:
+        model_name: 模型名稱
+    Returns:
+        OnnxModel；未安裝 ONNX Runtime 或匯出失敗時返回 PyTorch 模型，模型無法載入時返回 None
+    """
+    global _onnx_model_cache
+    from onnx_backend import OnnxModelCache, onnxruntime_available
+    
+    if not onnxruntime_available():
+        print(f"⚠️ ONNX Runtime 未安裝，{model_name} 使用 PyTorch 推論")
+        return _load_model_from_checkpoint(model_name)
+    
+    if _onnx_model_cache is None:
+        _onnx_model_cache = OnnxModelCache(ONNX_MODEL_DIR)
+    
+    # 每個 session 的執行緒數：未指定時依多模型並行數平均分配
+    num_threads = ONNX_INTRA_OP_THREADS or get_intra_op_threads_per_model(ENSEMBLE_MAX_WORKERS)
+    
+    fingerprint = MODEL_STORE.fingerprint(model_name)
+    if fingerprint is not None:
+        cached_model = _onnx_model_cache.load(model_name, fingerprint, num_threads)
+        if cached_model is not None:
+            return cached_model
+    
+    model = _load_model_from_checkpoint(model_name)
+    if model is None or fingerprint is None:
+        return model
+    
+    try:
+        _onnx_model_cache.export(model_name, fingerprint, model, get_model_input_size(model_name))
+        return _onnx_model_cache.load(model_name, fingerprint, num_threads) or model
+    except Exception as e:
+        print(f"⚠️ 模型 {model_name} 匯出 ONNX 失敗，改用 PyTorch 推論: {e}")
+        return model
+
+def load_quantized_model(model_name: str):
+    """
+    載入 CPU int8 量化模型：優先使用磁碟快取，沒有快取時由 fp32 模型量化後寫入快取
+    Args:
+        model_name: 模型名稱
+    Returns:
+        量化後的模型；量化失敗或缺少所需的校正圖片時返回 fp32 模型，模型無法載入時返回 None
+    """
+    global _quantized_model_cache
+    from model_quantization import QuantizedModelCache, quantize_model, requires_calibration
+    
+    if torch.cuda.is_available():
+        print(f"⚠️ int8 量化僅支援 CPU 推論，{model_name} 使用原本的模型")
+        return _load_model_from_checkpoint(model_name)
+    
+    if _quantized_model_cache is None:
+        _quantized_model_cache = QuantizedModelCache(QUANTIZED_MODEL_DIR)
+    
+    fingerprint = MODEL_STORE.fingerprint(model_name)
+    if fingerprint is not None:
+        cached_model = _quantized_model_cache.load(model_name, fingerprint)
+        if cached_model is not None:
+            return cached_model
+    
+    model = _load_model_from_checkpoint(model_name)
+    if model is None:
+        return None
+    
+    calibration_inputs = load_calibration_inputs(model_name)
+    if requires_calibration(model_name) and not calibration_inputs:
+        print(f"ℹ️ 沒有靜態量化的校正圖片（{QUANTIZATION_CALIBRATION_DIR}），模型 {model_name} 不量化，以 fp32 推論")
+        return model
+    
+    try:
+        start_time = time.time()
+        quantized_model, mode = quantize_model(model.float(), model_name, get_model_input_size(model_name),
+                                               calibration_inputs)
+        print(f"🔧 模型 {model_name} 已完成 int8 {mode} 量化 (耗時 {time.time() - start_time:.1f} 秒)")
+    except Exception as e:
+        print(f"⚠️ 模型 {model_name} 量化失敗，改用 fp32 推論: {e}")
+        return model
+    
+    if fingerprint is not None:
+        _quantized_model_cache.save(model_name, fingerprint, quantized_model, mode)
+    return quantized_model
+
+def get_calibration_image_paths() -> list:
+    """QUANTIZATION_CALIBRATION_DIR 中的校正圖片路徑（依檔名排序）"""
+    return sorted(path for pattern in ("*.jpg", "*.jpeg", "*.png")
+                  for path in glob.glob(os.path.join(QUANTIZATION_CALIBRATION_DIR, pattern)))
+
+def load_calibration_inputs(model_name: str) -> list:
+    """
+    讀取靜態量化的校正輸入（QUANTIZATION_CALIBRATION_DIR 中的食物圖片）
+    Args:
+        model_name: 模型名稱（決定輸入尺寸）
+    Returns:
+        預處理後的輸入 tensor 列表，沒有校正圖片時為空列表
+    """
+    calibration_inputs = []
+    for image_path in get_calibration_image_paths():
+        with Image.open(image_path) as image:
+            calibration_inputs.append(preprocess_image(image.convert("RGB"), model_name))
+    return calibration_inputs
+
+def convert_model_checkpoints(model_names=None, dtype: str = "fp32") -> Dict:
+    """
+    一次性轉換：以原始檢查點的推測流程載入各模型，寫入標準化檢查點與 manifest
+    Args:
+        model_names: 要轉換的模型名稱列表，若為 None 則轉換所有多模型辨識使用的模型
+        dtype: 標準化檢查點的儲存精度（"fp32"、"fp16" 或 "bf16"）
+    Returns:
+        模型名稱 -> manifest 記錄（成功）或失敗原因字串
+    """
+    if not TORCH_AVAILABLE:
+        raise RuntimeError("PyTorch未安裝，無法轉換模型檢查點")
+    
+    results = {}
+    for model_name in model_names or ENSEMBLE_MODELS:
+        _model_load_errors.pop(model_name, None)
+        model = _load_model_from_source(model_name)
+        if model is None:
+            results[model_name] = _model_load_errors.pop(model_name, "載入失敗，詳見日誌")
+            continue
         
-    if model_name in _loaded_models:
-        return _loaded_models[model_name]
+        try:
+            results[model_name] = MODEL_STORE.convert(model_name, model, get_model_input_size(model_name), dtype)
+        except Exception as e:
+            print(f"❌ 轉換模型 {model_name} 失敗: {e}")
+            results[model_name] = str(e)
+    
+    return results
+
+def _get_model_load_lock(model_name: str) -> threading.Lock:
+    """取得指定模型的載入鎖（第一次使用時建立）"""
+    with _model_load_locks_guard:
+        return _model_load_locks.setdefault(model_name, threading.Lock())
+
+def describe_model_load_failure(model_name: str, backend: str = None):
+    """
+    將模型的載入失敗記錄格式化為顯示用文字，未曾失敗時返回 None
+    Args:
+        model_name: 模型名稱
+        backend: 推論後端，若為 None 則使用 config 的 MODEL_BACKEND
+    """
+    return _format_load_failure(_model_registry.failures().get(get_model_key(model_name, backend)))
+
+def _format_load_failure(failure):
+    """將註冊表的失敗記錄格式化為顯示用文字"""
+    if failure is None:
+        return None
     
+    retry_in = failure["retry_at"] - time.time()
+    retry_text = f"{retry_in:.0f} 秒後重試" if retry_in > 0 else "下次辨識時重試"
+    return f"載入失敗（第 {failure['attempts']} 次，{retry_text}）: {failure['reason']}"
+
+def _load_model_from_checkpoint(model_name: str, model_path: str = None):
+    """
+    從檢查點建立模型（不經過註冊表）
+    使用預設路徑時優先依 manifest 載入標準化檢查點，沒有可用記錄時才推測原始檢查點的格式
+    Args:
+        model_name: 模型名稱
+        model_path: 模型檔案路徑，如果為 None 則使用預設路徑
+    """
+    if model_path is None:
+        device = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
+        model = MODEL_STORE.load(model_name, device)
+        if model is not None:
+            return model
+    
+    return _load_model_from_source(model_name, model_path)
+
+def _load_model_from_source(model_name: str, model_path: str = None):
+    """
+    依模型類型選擇載入函數，從原始 .pth 檢查點推測格式並建立模型
+    Args:
+        model_name: 模型名稱
+        model_path: 模型檔案路徑，如果為 None 則使用預設路徑
+    """
     # 特殊處理 EfficientNet 模型
     if 'efficientnet' in model_name.lower():
-        model = load_efficientnet_model(model_name, model_path)
-        if model is not None:
-            _loaded_models[model_name] = model
-        return model
+        return load_efficientnet_model(model_name, model_path)
     
     # 特殊處理 Swin Transformer 模型
     if 'swin' in model_name.lower():
-        model = load_swin_model(model_name, model_path)
-        if model is not None:
-            _loaded_models[model_name] = model
-        return model
+        return load_swin_model(model_name, model_path)
     
     # 特殊處理 ConvNeXt 模型
     if 'convnext' in model_name.lower():
-        model = load_convnext_model(model_name, model_path)
-        if model is not None:
-            _loaded_models[model_name] = model
-        return model
+        return load_convnext_model(model_name, model_path)
     
     # 特殊處理 VGG 模型
     if 'vgg' in model_name.lower():
-        model = load_vgg_model(model_name, model_path)
-        if model is not None:
-            _loaded_models[model_name] = model
-        return model
+        return load_vgg_model(model_name, model_path)
         
     if model_path is None:
         model_path = f"./model/{model_name}.pth"
     
     if not os.path.exists(model_path):
         print(f"❌ 模型檔案不存在: {model_path}，使用模擬模式")
+        _record_load_error(model_name, f"模型檔案不存在: {model_path}")
         return None
     
     try:
@@ -440,22 +826,221 @@ def load_model(model_name: str, model_path: str = None):
         # 確保模型在正確的設備上
         model = model.to(device)
         
-        # 快取模型
-        _loaded_models[model_name] = model
-        
         print(f"成功載入模型: {model_name} (設備: {device})")
         return model
         
     except Exception as e:
         print(f"載入模型失敗: {e}")
+        _record_load_error(model_name, str(e))
         return None
 
-def preprocess_image(image: Image.Image, model_name: str = None):
+def _set_model_load_status(model_name: str, status: str):
+    """更新模型的預載狀態"""
+    with _model_status_lock:
+        _model_load_status[model_name] = status
+
+def _preload_single_model(model_name: str):
+    """背景執行緒：載入單一模型並在完成後標示就緒"""
+    _set_model_load_status(model_name, MODEL_STATUS_LOADING)
+    start_time = time.time()
+    
+    try:
+        model = load_model(model_name)
+    except Exception as e:
+        print(f"❌ 背景載入模型 {model_name} 失敗: {e}")
+        model = None
+    
+    status = MODEL_STATUS_READY if model is not None else MODEL_STATUS_FAILED
+    _set_model_load_status(model_name, status)
+    _model_ready_events[model_name].set()
+    print(f"📦 背景載入 {model_name}: {status} (耗時 {time.time() - start_time:.1f} 秒)")
+
+def preload_models(model_names=None, max_workers: int = None):
+    """
+    在背景以小型執行緒池平行載入模型，不阻塞呼叫端
+    Args:
+        model_names: 要預載的模型名稱列表，若為 None 則載入所有多模型辨識使用的模型
+        max_workers: 同時載入的模型數量，若為 None 則使用 config 的 PRELOAD_MAX_WORKERS
+    """
+    global _preload_executor
+    
+    if not TORCH_AVAILABLE:
+        print("⚠️ PyTorch未安裝，略過模型預載")
+        return
+    
+    if model_names is None:
+        model_names = ENSEMBLE_MODELS
+    if max_workers is None:
+        max_workers = PRELOAD_MAX_WORKERS
+    
+    # 已在預載中的模型不重複排程
+    with _model_status_lock:
+        pending_models = [name for name in model_names if name not in _model_ready_events]
+        for model_name in pending_models:
+            _model_load_status[model_name] = MODEL_STATUS_PENDING
+            _model_ready_events[model_name] = threading.Event()
+        
+        if not pending_models:
+            return
+        
+        if _preload_executor is None:
+            _preload_executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="preload")
+    
+    print(f"📦 開始背景預載 {len(pending_models)} 個模型（同時載入 {max_workers} 個）")
+    for model_name in pending_models:
+        _preload_executor.submit(_preload_single_model, model_name)
+
+def wait_for_model_ready(model_name: str, timeout: float = None) -> bool:
+    """
+    等待背景預載中的模型完成載入
+    Args:
+        model_name: 模型名稱
+        timeout: 最長等待秒數，若為 None 則使用 config 的 MODEL_READY_TIMEOUT
+    Returns:
+        模型已完成載入（或未排入預載）時返回 True，逾時返回 False
+    """
+    event = _model_ready_events.get(model_name)
+    if event is None:
+        # 未排入背景預載的模型維持原本的延遲載入
+        return True
+    
+    if timeout is None:
+        timeout = MODEL_READY_TIMEOUT
+    return event.wait(timeout)
+
+def get_model_load_status() -> Dict:
+    """取得各模型目前的預載狀態"""
+    with _model_status_lock:
+        status = dict(_model_load_status)
+    
+    # 已就緒但因記憶體預算被釋放的模型，下次使用時會重新載入
+    for model_name, model_status in status.items():
+        if model_status == MODEL_STATUS_READY and get_model_key(model_name) not in _model_registry:
+            status[model_name] = MODEL_STATUS_EVICTED
+    return status
+
+def get_model_registry_stats() -> Dict:
+    """取得模型註冊表的命中、未命中、釋放次數與記憶體使用情況"""
+    return _model_registry.stats()
+
+def format_model_load_status() -> str:
+    """將各模型的預載狀態格式化為可讀文本"""
+    status = get_model_load_status()
+    
+    icons = {
+        MODEL_STATUS_PENDING: "⏳",
+        MODEL_STATUS_LOADING: "🔄",
+        MODEL_STATUS_READY: "✅",
+        MODEL_STATUS_FAILED: "⚠️",
+        MODEL_STATUS_EVICTED: "💤"
+    }
+    ready_count = sum(1 for value in status.values() if value == MODEL_STATUS_READY)
+    
+    if status:
+        text = f"已就緒 {ready_count}/{len(status)} 個模型\n"
+    else:
+        text = "模型將於第一次辨識時載入\n"
+    for model_name, model_status in status.items():
+        text += f"{icons.get(model_status, '•')} {model_name}: {model_status}\n"
+    
+    stats = get_model_registry_stats()
+    for model_key, failure in _model_registry.failures().items():
+        text += f"🚫 {model_key}: {_format_load_failure(failure)}\n"
+    
+    budget_text = f"{stats['budget_mb']} MB" if stats["budget_mb"] else "不限"
+    text += (f"記憶體: {stats['resident_mb']} MB / {budget_text}，"
+             f"命中 {stats['hits']}、未命中 {stats['misses']}、釋放 {stats['evictions']}、"
+             f"略過失敗載入 {stats['skipped_loads']}\n")
+    
+    cache_stats = get_result_cache_stats()
+    text += (f"結果快取: {cache_stats['entries']}/{cache_stats['max_entries']} 筆，"
+             f"命中 {cache_stats['hits']}、相近圖片命中 {cache_stats['near_hits']}、未命中 {cache_stats['misses']}"
+             f"（命中率 {cache_stats['hit_rate']}%，省下 {cache_stats['forwards_avoided']} 次模型推論，"
+             f"相近圖片省下 {cache_stats['near_forwards_avoided']} 次）\n")
+    
+    quality_stats = get_quality_gate_stats()
+    if quality_stats["checks"]:
+        text += (f"品質檢查: {quality_stats['checks']} 張，提醒 {quality_stats['warnings']}、"
+                 f"拒絕 {quality_stats['rejections']}（拒絕率 {quality_stats['rejection_rate']}%，"
+                 f"省下{'約' if ENSEMBLE_MODE == 'cascade' else ''} {quality_stats['forwards_avoided']} 次模型推論，檢查模型推論 {quality_stats['classifier_forwards']} 次）\n")
+    
+    for model_key, batch_stats in get_micro_batching_stats().items():
+        if batch_stats["batches"]:
+            text += (f"📦 {model_key}: {batch_stats['items']} 個請求合併為 {batch_stats['batches']} 次推論，"
+                     f"平均批次 {batch_stats['average_batch_size']}、最大 {batch_stats['largest_batch']} 個請求"
+                     f"（{batch_stats['largest_batch_rows']} 列）\n")
+    return text
+
+def get_model_input_size(model_name: str = None) -> int:
+    """
+    根據模型類型決定輸入尺寸
+    Args:
+        model_name: 模型名稱
+    Returns:
+        模型輸入的邊長（像素）
+    """
+    # 已轉換的模型以 manifest 記錄的輸入尺寸為準
+    entry = MODEL_STORE.manifest["models"].get(model_name) if model_name else None
+    if entry is not None:
+        return entry["input_size"]
+    
+    if model_name and 'swinv2' in model_name.lower():
+        return 192  # Swin Transformer V2 訓練時使用 192x192
+    return 224  # 其他模型使用 224x224
+
+def start_model_workers(model_groups=None, pin_cores: bool = None):
+    """
+    啟動模型工作程序模式：每組模型由一個長駐程序載入與推論
+    Args:
+        model_groups: 模型分組列表，若為 None 則使用 config 的 MODEL_WORKER_GROUPS
+        pin_cores: 是否綁定專屬 CPU 核心，若為 None 則使用 config 的 MODEL_WORKER_PIN_CORES
+    Returns:
+        啟動的工作程序池，PyTorch 不可用時返回 None
+    """
+    global _model_worker_pool
+    
+    if not TORCH_AVAILABLE:
+        print("⚠️ PyTorch未安裝，無法啟用模型工作程序模式")
+        return None
+    
+    if _model_worker_pool is not None:
+        return _model_worker_pool
+    
+    from model_workers import ModelWorkerPool
+    
+    if model_groups is None:
+        model_groups = MODEL_WORKER_GROUPS
+    if pin_cores is None:
+        pin_cores = MODEL_WORKER_PIN_CORES
+    
+    # 共享緩衝區依各模型 manifest 記錄的輸入尺寸配置，列數可容納測試時增強的視角與餐盤區塊
+    input_sizes = {model_name: get_model_input_size(model_name) for group in model_groups for model_name in group}
+    max_rows = max(len(TTA_VIEWS), PLATE_GRID * PLATE_GRID)
+    _model_worker_pool = ModelWorkerPool(model_groups, pin_cores=pin_cores, timeout=MODEL_WORKER_TIMEOUT,
+                                         input_sizes=input_sizes, max_rows=max_rows)
+    _model_worker_pool.start()
+    return _model_worker_pool
+
+def stop_model_workers():
+    """停止模型工作程序，之後的辨識回到主程序內執行"""
+    global _model_worker_pool
+    
+    if _model_worker_pool is not None:
+        _model_worker_pool.stop()
+        _model_worker_pool = None
+
+def get_model_worker_pool():
+    """取得目前的模型工作程序池，未啟用時返回 None"""
+    return _model_worker_pool
+
+def preprocess_image(image: Image.Image, model_name: str = None, reuse_buffer: bool = False):
     """
     圖片預處理 (如果PyTorch可用) 或模擬預處理
     Args:
         image: 輸入圖片
         model_name: 模型名稱，用於決定輸入尺寸
+        reuse_buffer: 是否寫入目前執行緒重複使用的輸入緩衝區（不配置新的 tensor）；
+                      同一執行緒下一次預處理相同尺寸時會覆寫內容，只適用於請求內立即使用的輸入
     """
     if not TORCH_AVAILABLE:
         # 模擬模式，只進行基本的圖片檢查
@@ -463,31 +1048,243 @@ def preprocess_image(image: Image.Image, model_name: str = None):
             image = image.convert('RGB')
         return np.array(image)  # 返回numpy數組作為模擬tensor
     
-    # 根據模型類型決定輸入尺寸
-    if model_name and 'swinv2' in model_name.lower():
-        input_size = 192  # Swin Transformer V2 訓練時使用 192x192
-    else:
-        input_size = 224  # 其他模型使用 224x224
-    
-    transform = transforms.Compose([
-        transforms.Resize((input_size, input_size)),
-        transforms.ToTensor(),
-        transforms.Normalize(mean=[0.485, 0.456, 0.406], 
-                           std=[0.229, 0.224, 0.225])
-    ])
+    from image_preprocessing import get_image_preprocessor
     
     # 確保圖片是 RGB 格式
     if image.mode != 'RGB':
         image = image.convert('RGB')
     
-    return transform(image).unsqueeze(0)
+    preprocessor = get_image_preprocessor(get_model_input_size(model_name))
+    return preprocessor(image, preprocessor.buffer() if reuse_buffer else None)
+
+def preprocess_image_for_models(image: Image.Image, model_names, tta: bool = False) -> Dict:
+    """
+    多模型共用的圖片預處理，每種輸入尺寸只解碼與正規化一次
+    Args:
+        image: 輸入圖片
+        model_names: 將使用這批輸入的模型名稱列表
+        tta: 是否產生測試時增強的多視角批次（見 preprocess_image_tta）
+    Returns:
+        以輸入尺寸為鍵、預處理後 tensor 為值的字典（寫入目前執行緒重複使用的緩衝區，只在本次請求中有效）
+    """
+    # 只轉換一次 RGB，讓各尺寸共用同一張解碼後的圖片
+    if image.mode != 'RGB':
+        image = image.convert('RGB')
+    
+    input_tensors = {}
+    for model_name in model_names:
+        input_size = get_model_input_size(model_name)
+        if input_size not in input_tensors:
+            input_tensors[input_size] = (preprocess_image_tta(image, model_name) if tta
+                                         else preprocess_image(image, model_name, reuse_buffer=True))
+    
+    return input_tensors
+
+def preprocess_image_tta(image: Image.Image, model_name: str = None):
+    """
+    測試時增強（TTA）的預處理：原圖、中央裁切與兩者的水平翻轉組成一個批次，一次推論後平均 logits
+    Args:
+        image: 輸入圖片
+        model_name: 模型名稱，用於決定輸入尺寸
+    Returns:
+        [視角數, 3, H, W] 的輸入 tensor（寫入目前執行緒重複使用的緩衝區，只在本次請求中有效）
+    """
+    if not TORCH_AVAILABLE:
+        return preprocess_image(image, model_name)
+    
+    from image_preprocessing import get_image_preprocessor
+    
+    if image.mode != 'RGB':
+        image = image.convert('RGB')
+    return get_image_preprocessor(get_model_input_size(model_name)).write_tta_batch(image, TTA_CROP_FRACTION)
+
+def compute_nature_distribution(probabilities: np.ndarray) -> Dict:
+    """
+    將食物機率分佈轉換為五性機率分佈
+    Args:
+        probabilities: [n_labels] 的食物機率（softmax 輸出）
+    Returns:
+        依 FIVE_NATURES 順序、以百分比字串表示的五性分佈
+    """
+    nature_probabilities = probabilities @ FOOD_CATALOG.label_nature_matrix
+    return {nature: f"{probability * 100:.1f}%" for nature, probability in zip(FIVE_NATURES, nature_probabilities)}
+
+def softmax_probabilities(logits: np.ndarray) -> np.ndarray:
+    """
+    對最後一個維度計算數值穩定的 softmax
+    Args:
+        logits: 單一模型 [n_labels] 或多個模型 [n_models, n_labels] 的 logits
+    """
+    shifted = logits - logits.max(axis=-1, keepdims=True)
+    exp_logits = np.exp(shifted)
+    return exp_logits / exp_logits.sum(axis=-1, keepdims=True)
+
+def _logits_for_confidence(predicted_idx: int, confidence: float) -> np.ndarray:
+    """建立 softmax 後在指定索引得到指定信心度、其餘類別平均分配的 logits"""
+    num_labels = len(TRAINING_LABELS)
+    rest = (1 - confidence) / (num_labels - 1)
+    logits = np.zeros(num_labels, dtype=np.float32)
+    logits[predicted_idx] = np.log(confidence / rest)
+    return logits
+
+def _build_mock_logits(image: Image.Image) -> np.ndarray:
+    """模擬模式：基於圖片尺寸產生固定的隨機預測，並以 logits 形式返回"""
+    np.random.seed(hash(str(image.size)) % 1000)  # 基於圖片尺寸產生種子
+    predicted_idx = np.random.randint(len(TRAINING_LABELS))
+    confidence = np.random.randint(82, 96) / 100  # 模擬信心度
+    return _logits_for_confidence(predicted_idx, confidence)
+
+def compute_model_logits(image: Image.Image, model_name: str, input_tensor=None, backend: str = None,
+                         tta: bool = False, reduce_rows: bool = True):
+    """
+    執行單一模型推論並返回 logits
+    Args:
+        image: 輸入圖片
+        model_name: 要使用的模型名稱
+        input_tensor: 已預處理好的輸入 tensor（多列時為測試時增強的各視角，返回各列 logits 的平均），
+                      若為 None 則自行預處理
+        backend: 推論後端（"torch"、"compiled"、"int8" 或 "onnx"），若為 None 則使用 config 的 MODEL_BACKEND；
+                 工作程序模式下由工作程序以相同後端推論
+        tta: 自行預處理時是否使用測試時增強的多視角批次
+        reduce_rows: 多列輸入時是否平均各列 logits；False 時返回 [列數, 訓練標籤數] 的各列 logits
+                     （模擬模式下為單列）
+    Returns:
+        (logits, is_ai)：logits 為長度等於訓練標籤數的 numpy 陣列；
+        模型無法載入或 PyTorch 不可用時以模擬結果代替，is_ai 為 False
+    """
+    if backend is None:
+        backend = MODEL_BACKEND
+    
+    # 載入模型（工作程序模式下由工作程序負責推論，主程序不載入權重）
+    is_remote = _model_worker_pool is not None and _model_worker_pool.serves(model_name)
+    if is_remote:
+        model = _model_worker_pool.remote_model(model_name, backend)
+    else:
+        # 背景預載（使用預設後端）中的模型最多等待 MODEL_READY_TIMEOUT 秒，避免重複載入
+        if backend == MODEL_BACKEND and not wait_for_model_ready(model_name):
+            raise TimeoutError(f"模型 {model_name} 仍在背景載入中")
+        model = load_model(model_name, backend=backend)
+    
+    if model is None or not TORCH_AVAILABLE:
+        # 如果模型載入失敗或PyTorch不可用，使用模擬模式
+        print(f"🎲 模型 {model_name} 使用模擬模式進行辨識")
+        mock_logits = _build_mock_logits(image)
+        return (mock_logits if reduce_rows else mock_logits[np.newaxis]), False
+    
+    # 使用真實模型進行預測
+    device = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
+    
+    # 圖片預處理（多模型辨識時由呼叫端共用已預處理的 tensor）
+    if input_tensor is None:
+        input_tensor = (preprocess_image_tta(image, model_name) if tta
+                        else preprocess_image(image, model_name, reuse_buffer=True))
+    input_tensor = input_tensor.to(device, dtype=get_model_dtype(model))
+    
+    # 模型推論：同時到達的請求由微批次排程器合併為一次批次推論（工作程序模式下直接送往工作程序）
+    if MICRO_BATCH_MAX_SIZE > 1 and not is_remote:
+        outputs = get_micro_batcher(get_model_key(model_name, backend)).submit(model, input_tensor).result()
+    else:
+        outputs = _run_model_forward(model, input_tensor)
+    
+    # 分類頭的類別數與訓練標籤數不符時，截斷或補齊都會產生錯誤的機率，直接回報錯誤
+    if len(outputs.shape) > 1 and outputs.shape[-1] != len(TRAINING_LABELS):
+        raise ValueError(f"模型 {model_name} 輸出類別數 {outputs.shape[-1]} 與訓練標籤數 {len(TRAINING_LABELS)} 不符")
+    
+    # 假設模型輸出是類別索引或機率分布（多視角輸入時平均各列 logits）
+    if len(outputs.shape) > 1 and not reduce_rows:
+        logits = outputs.float().cpu().numpy()
+    elif len(outputs.shape) > 1:
+        logits = outputs.float().mean(dim=0).cpu().numpy()
+    else:
+        predicted_idx = int(outputs.item())
+        if predicted_idx >= len(TRAINING_LABELS):
+            raise ValueError(f"預測索引 {predicted_idx} 超出範圍")
+        logits = _logits_for_confidence(predicted_idx, random.randint(85, 98) / 100)
+    
+    return logits, True
+
+def _run_model_forward(model, input_tensor):
+    """執行模型推論（inference_mode 不記錄 autograd 版本計數，比 no_grad 開銷更低）"""
+    with torch.inference_mode():
+        return model(input_tensor)
+
+def get_micro_batcher(model_key: str) -> MicroBatcher:
+    """
+    取得模型的微批次排程器（第一次使用時建立）
+    Args:
+        model_key: 模型在註冊表中的鍵（不同後端各自排程）
+    """
+    with _micro_batchers_lock:
+        batcher = _micro_batchers.get(model_key)
+        if batcher is None:
+            batcher = MicroBatcher(model_key, MICRO_BATCH_MAX_SIZE, MICRO_BATCH_WAIT_MS, _run_model_forward)
+            _micro_batchers[model_key] = batcher
+        return batcher
 
-def classify_food_image(image: Image.Image, model_name: str) -> Dict:
+def get_micro_batching_stats() -> Dict:
+    """取得各模型微批次排程的批次數、請求數與平均批次大小"""
+    with _micro_batchers_lock:
+        batchers = dict(_micro_batchers)
+    return {model_key: batcher.stats() for model_key, batcher in batchers.items()}
+
+def get_model_dtype(model):
+    """模型權重的精度，輸入需轉換為相同精度（工作程序代理等沒有參數的模型視為 fp32）"""
+    parameter = next(model.parameters(), None) if hasattr(model, "parameters") else None
+    if parameter is None or not parameter.is_floating_point():
+        return torch.float32
+    return parameter.dtype
+
+def build_model_result(model_name: str, logits: np.ndarray, is_ai: bool = True, backend: str = None) -> Dict:
+    """
+    將單一模型的 logits 轉換為辨識結果
+    Args:
+        model_name: 模型名稱
+        logits: compute_model_logits 返回的 logits
+        is_ai: 是否為真實模型的輸出（False 表示模擬模式）
+        backend: 推論後端，用於顯示對應的載入失敗記錄
+    """
+    probabilities = softmax_probabilities(logits)
+    predicted_idx = int(np.argmax(probabilities))
+    confidence = int(probabilities[predicted_idx] * 100)
+    
+    if is_ai:
+        print(f"AI辨識結果: {TRAINING_LABELS[predicted_idx]} (索引: {predicted_idx}, 信心度: {confidence}%)")
+    
+    # 以類別索引直接從食物目錄取得食物記錄
+    record = FOOD_CATALOG.by_label_index(predicted_idx)
+    if record is None:
+        return {"錯誤": f"辨識的食物 '{TRAINING_LABELS[predicted_idx]}' 無法在資料庫中找到對應項目"}
+    
+    # 決定狀態標示
+    status_prefix = "🤖" if is_ai else "🎲"
+    
+    result = {
+        "辨識食物": record.chinese,
+        "英文名": record.english or "unknown",
+        "五性屬性": record.nature,
+        "使用模型": f"{status_prefix} {model_name}",
+        "信心度": f"{confidence}%",
+        "五性分佈": compute_nature_distribution(probabilities),
+        "模式": "AI模式" if is_ai else "模擬模式"
+    }
+    
+    load_failure = None if is_ai else describe_model_load_failure(model_name, backend)
+    if load_failure:
+        result["載入狀態"] = load_failure
+    
+    return result
+
+def classify_food_image(image: Image.Image, model_name: str, input_tensor=None, backend: str = None,
+                        tta: bool = None) -> Dict:
     """
     使用指定的 PyTorch 模型進行食物辨識 (或模擬辨識)
+    相同像素的圖片在快取有效期間內直接返回先前的結果
     Args:
         image: 輸入圖片
         model_name: 要使用的模型名稱
+        input_tensor: 已預處理好的輸入 tensor，若為 None 則自行預處理
+        backend: 推論後端（"torch"、"compiled"、"int8" 或 "onnx"），若為 None 則使用 config 的 MODEL_BACKEND
+        tta: 是否使用測試時增強（多視角一次批次推論後平均 logits），若為 None 則使用 config 的 TTA_ENABLED
     """
     if image is None:
         return {"錯誤": "請上傳食物圖片"}
@@ -495,180 +1292,590 @@ def classify_food_image(image: Image.Image, model_name: str) -> Dict:
     if not model_name:
         return {"錯誤": "請指定模型名稱"}
     
+    if tta is None:
+        tta = TTA_ENABLED
+    
+    # 呼叫端自行提供輸入 tensor 時不經過結果快取
+    cache_key, phash = None, None
+    if input_tensor is None:
+        cache_key, phash = get_result_cache_key(image, f"{model_name}+tta" if tta else model_name, backend)
+        cached_result = _result_cache.get(cache_key, phash)
+        if cached_result is not None:
+            return cached_result
+    
     try:
-        # 載入模型
-        model = load_model(model_name)
+        logits, is_ai = compute_model_logits(image, model_name, input_tensor=input_tensor, backend=backend, tta=tta)
+        result = build_model_result(model_name, logits, is_ai, backend)
+        if tta and is_ai and input_tensor is None and "錯誤" not in result:
+            result["測試時增強"] = "、".join(TTA_VIEWS)
         
-        if model is None or not TORCH_AVAILABLE:
-            # 如果模型載入失敗或PyTorch不可用，使用模擬模式
-            print(f"🎲 模型 {model_name} 使用模擬模式進行辨識")
-            food_names = list(FOOD_DATABASE.keys())
-            # 基於圖片特性的簡單模擬邏輯
-            np.random.seed(hash(str(image.size)) % 1000)  # 基於圖片尺寸產生種子
-            recognized_food = np.random.choice(food_names)
-            confidence = np.random.randint(82, 96)  # 模擬信心度
-        else:
-            # 使用真實模型進行預測
-            device = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
-            
-            # 圖片預處理
-            input_tensor = preprocess_image(image, model_name).to(device)
+    except Exception as e:
+        return {"錯誤": f"辨識過程發生錯誤: {str(e)}"}
+    
+    if cache_key is not None and is_cacheable_result(result):
+        _result_cache.put(cache_key, result, phash)
+    return result
+
+def get_result_cache_key(image: Image.Image, scope: str, backend: str = None):
+    """
+    取得圖片的結果快取鍵與感知雜湊
+    Args:
+        image: 輸入圖片
+        scope: 模型名稱或多模型辨識模式
+        backend: 推論後端，若為 None 則使用 config 的 MODEL_BACKEND
+    Returns:
+        ((像素雜湊, 範圍, 後端), 感知雜湊)；停用近似重複比對時感知雜湊為 None
+    """
+    cache_key = (image_digest(image), scope, backend or MODEL_BACKEND)
+    phash = perceptual_hash(image) if NEAR_DUPLICATE_MAX_DISTANCE >= 0 else None
+    return cache_key, phash
+
+def is_cacheable_result(result) -> bool:
+    """
+    結果是否可寫入快取：含有錯誤或模擬模式（模型尚未載入、載入失敗）的結果不快取，
+    下次上傳同一張圖片時重新辨識
+    """
+    if isinstance(result, dict):
+        if "錯誤" in result or "錯誤信息" in result:
+            return False
+        return all(is_cacheable_result(value) for value in result.values())
+    return result != "模擬模式"
+
+def get_result_cache_stats() -> Dict:
+    """取得辨識結果快取的命中率與使用情況"""
+    return _result_cache.stats()
+
+def get_intra_op_threads_per_model(max_workers: int) -> int:
+    """
+    計算每個同時執行的模型可使用的 torch intra-op 執行緒數，避免超額使用 CPU 核心
+    Args:
+        max_workers: 同時執行的模型數量
+    Returns:
+        每個模型分配到的執行緒數（至少為 1）
+    """
+    return max(1, _TOTAL_TORCH_THREADS // max(1, max_workers))
+
+def configure_intra_op_threads(max_workers: int = None) -> int:
+    """
+    設定整個程序的 torch intra-op 執行緒數
+    torch.set_num_threads 作用於整個程序（之後建立的執行緒也使用同一個值），無法只限制執行緒池的工作執行緒；
+    因此在程序層級設定一次，執行緒池、微批次排程執行緒與請求執行緒的推論都使用相同的分配
+    Args:
+        max_workers: 同時執行的模型數量，若為 None 則使用 config 的 ENSEMBLE_MAX_WORKERS
+    Returns:
+        設定後每個模型可使用的執行緒數
+    """
+    if max_workers is None:
+        max_workers = ENSEMBLE_MAX_WORKERS
+    num_threads = get_intra_op_threads_per_model(max_workers)
+    if TORCH_AVAILABLE and torch.get_num_threads() != num_threads:
+        torch.set_num_threads(num_threads)
+        print(f"⚙️ torch intra-op 執行緒: {num_threads}（共 {_TOTAL_TORCH_THREADS} 個，{max_workers} 個模型同時執行）")
+    return num_threads
+
+def get_ensemble_executor(max_workers: int = None) -> ThreadPoolExecutor:
+    """
+    取得多模型並行辨識使用的執行緒池，數量改變時重新建立
+    Args:
+        max_workers: 同時執行的模型數量，若為 None 則使用 config 的 ENSEMBLE_MAX_WORKERS
+    """
+    global _ensemble_executor, _ensemble_executor_workers
+    
+    if max_workers is None:
+        max_workers = ENSEMBLE_MAX_WORKERS
+    
+    with _ensemble_executor_lock:
+        if _ensemble_executor is None or _ensemble_executor_workers != max_workers:
+            if _ensemble_executor is not None:
+                _ensemble_executor.shutdown(wait=False)
             
-            # 模型推論
-            with torch.no_grad():
-                outputs = model(input_tensor)
-                
-                # 假設模型輸出是類別索引或機率分布
-                if len(outputs.shape) > 1:
-                    predicted_idx = torch.argmax(outputs, dim=1).item()
-                    # 計算信心度
-                    probabilities = torch.softmax(outputs, dim=1)
-                    confidence = int(probabilities[0][predicted_idx].item() * 100)
-                else:
-                    predicted_idx = outputs.item()
-                    confidence = random.randint(85, 98)
-                
-                # 將預測索引轉換為食物名稱
-                # 使用訓練時的標籤列表進行映射
-                if predicted_idx < len(TRAINING_LABELS):
-                    recognized_food = TRAINING_LABELS[predicted_idx]
-                    print(f"AI辨識結果: {recognized_food} (索引: {predicted_idx}, 信心度: {confidence}%)")
-                else:
-                    print(f"警告: 預測索引 {predicted_idx} 超出範圍，使用隨機選擇")
-                    food_names = list(FOOD_DATABASE.keys())
-                    recognized_food = random.choice(food_names)
-                    confidence = random.randint(75, 90)
-
-        # 從資料庫獲取食物資訊
-        # 首先嘗試直接匹配，如果失敗則嘗試映射
-        if recognized_food in FOOD_DATABASE:
-            food_info = FOOD_DATABASE[recognized_food]
-        else:
-            # 嘗試映射到資料庫中的食物名稱
-            mapped_food = map_training_label_to_database(recognized_food)
-            if mapped_food and mapped_food in FOOD_DATABASE:
-                food_info = FOOD_DATABASE[mapped_food]
-                recognized_food = mapped_food  # 使用映射後的名稱
-            else:
-                return {"錯誤": f"辨識的食物 '{recognized_food}' 無法在資料庫中找到對應項目"}
-        
-        # 決定狀態標示
-        status_prefix = "🎲" if (model is None or not TORCH_AVAILABLE) else "🤖"
-        
-        result = {
-            "辨識食物": recognized_food,
-            "英文名": food_info.get("英文名", "unknown"),
-            "五性屬性": food_info["五性"],
-            "使用模型": f"{status_prefix} {model_name}",
-            "信心度": f"{confidence}%",
-            "模式": "模擬模式" if (model is None or not TORCH_AVAILABLE) else "AI模式"
-        }
+            _ensemble_executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="ensemble")
+            _ensemble_executor_workers = max_workers
+            num_threads = torch.get_num_threads() if TORCH_AVAILABLE else 1
+            print(f"⚙️ 多模型並行執行緒池: {max_workers} 個模型同時執行，每個模型 {num_threads} 個 intra-op 執行緒")
         
-        return result
+        return _ensemble_executor
+
+def run_ensemble_models(image: Image.Image, model_names, input_tensors: Dict, max_workers: int = None,
+                        backend: str = None, reduce_rows: bool = True) -> list:
+    """
+    在執行緒池上同時執行多個模型的辨識
+    Args:
+        image: 輸入圖片
+        model_names: 要執行的模型名稱列表
+        input_tensors: preprocess_image_for_models 產生的各尺寸輸入 tensor
+        max_workers: 同時執行的模型數量，1 表示逐一執行
+        backend: 推論後端，若為 None 則使用 config 的 MODEL_BACKEND
+        reduce_rows: 多列輸入時是否平均各列 logits（見 compute_model_logits）
+    Returns:
+        與 model_names 順序一致的 (模型名稱, (logits, is_ai) 或例外) 列表
+    """
+    if max_workers is None:
+        max_workers = ENSEMBLE_MAX_WORKERS
+    
+    def run_one(model_name):
+        print(f"正在使用模型 {model_name} 進行辨識...")
+        input_tensor = input_tensors[get_model_input_size(model_name)]
+        return compute_model_logits(image, model_name, input_tensor=input_tensor, backend=backend,
+                                    reduce_rows=reduce_rows)
+    
+    outcomes = []
+    
+    if max_workers <= 1 or len(model_names) <= 1:
+        for model_name in model_names:
+            try:
+                outcomes.append((model_name, run_one(model_name)))
+            except Exception as e:
+                outcomes.append((model_name, e))
+        return outcomes
+    
+    executor = get_ensemble_executor(max_workers)
+    futures = [(model_name, executor.submit(run_one, model_name)) for model_name in model_names]
+    
+    # 依原本的模型順序收集結果，使投票與詳細結果的順序與逐一執行時一致
+    for model_name, future in futures:
+        try:
+            outcomes.append((model_name, future.result()))
+        except Exception as e:
+            outcomes.append((model_name, e))
+    
+    return outcomes
+
+def fuse_model_logits(logits_stack: np.ndarray, weights: np.ndarray):
+    """
+    以加權軟投票融合多個模型的輸出
+    Args:
+        logits_stack: [n_models, n_labels] 的 logits，或 [n_models, n_rows, n_labels]（如餐盤的各區塊）
+        weights: [n_models] 的模型權重
+    Returns:
+        (各模型機率（形狀同 logits_stack）, 融合後機率 [n_labels] 或 [n_rows, n_labels])
+    """
+    probabilities = softmax_probabilities(logits_stack)
+    fused = np.tensordot(weights, probabilities, axes=1) / weights.sum()
+    return probabilities, fused
+
+def summarize_ensemble_outcomes(outcomes: list, total_models: int, backend: str = None) -> Dict:
+    """
+    將多個模型的 logits 疊成單一陣列並以加權軟投票產生綜合結果
+    Args:
+        outcomes: (模型名稱, (logits, is_ai) 或例外) 的列表，順序即顯示順序
+        total_models: 參與辨識的模型總數
+        backend: 推論後端，用於顯示對應的載入失敗記錄
+    Returns:
+        包含綜合結果與各模型詳細結果的字典
+    """
+    results = {}
+    results["🎯 綜合辨識結果"] = {}
+    results["📊 各模型詳細結果"] = {}
+    detailed = results["📊 各模型詳細結果"]
+    
+    successful_models = []
+    logits_rows = []
+    
+    for i, (model_name, outcome) in enumerate(outcomes, 1):
+        model_key = f"#{i} {model_name}"
+        if isinstance(outcome, Exception):
+            detailed[model_key] = {
+                "狀態": "載入中" if isinstance(outcome, TimeoutError) else "辨識失敗", 
+                "錯誤信息": str(outcome)
+            }
+            continue
         
-    except Exception as e:
-        return {"錯誤": f"辨識過程發生錯誤: {str(e)}"}
+        logits, is_ai = outcome
+        if logits.shape[-1] != len(TRAINING_LABELS):
+            detailed[model_key] = {
+                "狀態": "辨識失敗",
+                "錯誤信息": f"模型輸出類別數 {logits.shape[-1]} 與訓練標籤數 {len(TRAINING_LABELS)} 不符"
+            }
+            continue
+        
+        # 先佔位以維持模型的顯示順序，融合後再填入結果
+        detailed[model_key] = None
+        successful_models.append((model_key, model_name, is_ai))
+        logits_rows.append(logits)
+    
+    if not logits_rows:
+        results["🎯 綜合辨識結果"]["錯誤"] = "所有模型都無法成功辨識圖片"
+        return results
+    
+    # [n_models, n_labels] 的 logits 一次完成 softmax 與加權融合
+    logits_stack = np.stack(logits_rows)
+    weights = np.array([ENSEMBLE_MODEL_WEIGHTS.get(name, 1.0) for _, name, _ in successful_models], dtype=np.float32)
+    probabilities, fused = fuse_model_logits(logits_stack, weights)
+    
+    predicted = probabilities.argmax(axis=1)
+    confidences = probabilities[np.arange(len(predicted)), predicted]
+    
+    # 各模型結果與硬投票分佈（僅供參考，最終結果由軟投票決定）
+    food_votes = {}
+    for (model_key, model_name, is_ai), predicted_idx, confidence in zip(successful_models, predicted, confidences):
+        record = FOOD_CATALOG.by_label_index(int(predicted_idx))
+        if record is None:
+            detailed[model_key] = {
+                "狀態": "辨識失敗",
+                "錯誤信息": f"辨識的食物 '{TRAINING_LABELS[predicted_idx]}' 無法在資料庫中找到對應項目"
+            }
+            continue
+        
+        food_votes[record.chinese] = food_votes.get(record.chinese, 0) + 1
+        detailed[model_key] = {
+            "辨識食物": record.chinese,
+            "英文名": record.english or "unknown",
+            "五性屬性": record.nature,
+            "信心度": f"{int(confidence * 100)}%"
+        }
+        if not is_ai:
+            detailed[model_key]["模式"] = "模擬模式"
+            load_failure = describe_model_load_failure(model_name, backend)
+            if load_failure:
+                detailed[model_key]["載入狀態"] = load_failure
+    
+    # 融合機率最高者為最終結果；同分時取索引較小者，結果不受字典順序影響
+    ranked_indices = np.argsort(-fused, kind="stable")
+    final_idx = int(ranked_indices[0])
+    final_record = FOOD_CATALOG.by_label_index(final_idx)
+    if final_record is None:
+        results["🎯 綜合辨識結果"]["錯誤"] = "無法獲取食物詳細資訊"
+        return results
+    
+    total_successful = len(logits_rows)
+    vote_count = int((predicted == final_idx).sum())
+    
+    top_foods = {}
+    for idx in ranked_indices[:ENSEMBLE_TOP_K]:
+        record = FOOD_CATALOG.by_label_index(int(idx))
+        top_foods[record.chinese if record else TRAINING_LABELS[idx]] = f"{fused[idx] * 100:.1f}%"
+    
+    results["🎯 綜合辨識結果"] = {
+        "最終辨識": final_record.chinese,
+        "英文名": final_record.english or "unknown",
+        "五性屬性": final_record.nature,
+        "綜合信心度": f"{fused[final_idx] * 100:.1f}%",
+        "五性分佈": compute_nature_distribution(fused),
+        "模型共識度": f"{vote_count}/{total_successful} ({vote_count/total_successful*100:.1f}%)",
+        "成功模型數": f"{total_successful}/{total_models}",
+        "候選食物": top_foods,
+        "投票分佈": food_votes
+    }
+    
+    return results
 
-def classify_with_all_models(image: Image.Image) -> Dict:
+def check_image_quality(image: Image.Image, forwards: int = 0, backend: str = None) -> Dict:
+    """
+    以縮圖檢查圖片的模糊與曝光，設定 QUALITY_GATE_MODEL 時再以該模型的信心度判斷是否為食物
+    Args:
+        image: 輸入圖片
+        forwards: 拒絕時省下的模型推論次數
+        backend: 小型模型的推論後端，若為 None 則使用 config 的 MODEL_BACKEND
+    Returns:
+        {"verdict": 通過/提醒/拒絕, "reasons": 原因列表, "metrics": 各項指標}
+    """
+    def classify(checked_image):
+        logits, is_ai = compute_model_logits(checked_image, QUALITY_GATE_MODEL, backend=backend)
+        return float(softmax_probabilities(logits).max()), is_ai
+    
+    return _quality_gate.check(image, forwards, classify if QUALITY_GATE_MODEL else None)
+
+def estimate_cascade_forwards() -> int:
+    """
+    估計一次串接辨識執行的模型數：已執行過的串接辨識的平均模型數（無條件捨去），
+    尚未執行過時為最少的 1 個模型（第一個模型的信心度即可能達到門檻）
+    Returns:
+        估計的模型推論次數
+    """
+    with _cascade_stats_lock:
+        if _cascade_runs == 0:
+            return 1
+        return max(1, _cascade_models_run // _cascade_runs)
+
+def get_quality_gate_stats() -> Dict:
+    """取得圖片品質檢查的提醒、拒絕次數與省下的模型推論次數"""
+    return _quality_gate.stats()
+
+def classify_with_all_models(image: Image.Image, mode: str = None, backend: str = None, tta: bool = None) -> Dict:
     """
     使用所有可用模型進行食物辨識，並以隨機順序返回結果
+    相同像素的圖片在快取有效期間內直接返回先前的結果；
+    未命中快取時先檢查圖片品質（QUALITY_GATE_MODE），品質不足的圖片不執行模型推論
     Args:
         image: 輸入圖片
+        mode: "all" 執行全部模型投票，"cascade" 依固定順序執行並在達成共識時提前停止；
+              若為 None 則使用 config 的 ENSEMBLE_MODE
+        backend: 推論後端（"torch"、"compiled"、"int8" 或 "onnx"），若為 None 則使用 config 的 MODEL_BACKEND
+        tta: 是否使用測試時增強（每個模型一次多視角批次推論），若為 None 則使用 config 的 TTA_ENABLED；
+             "all" 模式下只執行 TTA_ENSEMBLE_MODELS 指定的模型（未指定時為全部模型）
     Returns:
         包含所有模型辨識結果的字典
     """
     if image is None:
         return {"錯誤": "請上傳食物圖片"}
     
-    # 定義所有可用的模型
-    available_models = [
-        "convnext_90",
-        "densenet_86", 
-        "efficientnet_84",
-        "resnet50_78",
-        "swin_model_94",
-        "swinv2_model_94",
-        "vgg_model_78",
-        "vit_model_74"
-    ]
+    if mode is None:
+        mode = ENSEMBLE_MODE
+    if tta is None:
+        tta = TTA_ENABLED
+    
+    cache_key, phash = get_result_cache_key(image, f"ensemble:{mode}+tta" if tta else f"ensemble:{mode}", backend)
+    cached_result = _result_cache.get(cache_key, phash)
+    if cached_result is not None:
+        return cached_result
+    
+    quality = None
+    if QUALITY_GATE_MODE != "off":
+        # 拒絕時省下的推論次數：全部模型模式為執行的模型數；串接模式通常提前停止，
+        # 以先前串接辨識的平均執行模型數估計，而非串接的全部模型數
+        if mode == "cascade":
+            planned_forwards = estimate_cascade_forwards()
+        else:
+            planned_forwards = len((TTA_ENSEMBLE_MODELS or ENSEMBLE_MODELS) if tta else ENSEMBLE_MODELS)
+        quality = check_image_quality(image, planned_forwards, backend)
+        if quality["verdict"] == QUALITY_REJECT:
+            print(f"🚫 圖片品質不足，略過約 {planned_forwards} 個模型的推論: {'、'.join(quality['reasons'])}")
+            return {
+                "🎯 綜合辨識結果": {"錯誤": f"圖片品質不足（{'、'.join(quality['reasons'])}），請重新拍攝清晰、光線充足的食物照片"},
+                "📊 各模型詳細結果": {}
+            }
+    
+    if mode == "cascade":
+        results = classify_with_cascade(image, backend=backend, tta=tta)
+    else:
+        results = _classify_with_all_models(image, backend, tta)
     
+    if quality is not None and quality["verdict"] == QUALITY_WARN and "錯誤" not in results["🎯 綜合辨識結果"]:
+        results["🎯 綜合辨識結果"]["圖片品質提醒"] = "、".join(quality["reasons"])
+    
+    if is_cacheable_result(results):
+        # 命中時省下的推論次數為實際執行的模型數（串聯模式可能提前停止）
+        _result_cache.put(cache_key, results, phash, forwards=len(results.get("📊 各模型詳細結果", {})))
+    return results
+
+def _classify_with_all_models(image: Image.Image, backend: str = None, tta: bool = False) -> Dict:
+    """執行全部模型（測試時增強時為 TTA_ENSEMBLE_MODELS）並以加權軟投票產生綜合結果（不經過結果快取）"""
     # 隨機打亂模型順序
-    shuffled_models = available_models.copy()
+    model_names = (TTA_ENSEMBLE_MODELS or ENSEMBLE_MODELS) if tta else ENSEMBLE_MODELS
+    shuffled_models = list(model_names)
     random.shuffle(shuffled_models)
     
-    results = {}
-    results["🎯 綜合辨識結果"] = {}
-    results["📊 各模型詳細結果"] = {}
+    # 每種輸入尺寸只預處理一次，所有模型共用
+    input_tensors = preprocess_image_for_models(image, shuffled_models, tta)
     
-    # 用於統計最終結果
-    food_votes = {}
-    successful_results = []
+    # 所有模型同時執行，結果依打亂後的順序處理
+    outcomes = run_ensemble_models(image, shuffled_models, input_tensors, backend=backend)
+    
+    results = summarize_ensemble_outcomes(outcomes, len(shuffled_models), backend)
+    if tta and TORCH_AVAILABLE and "錯誤" not in results["🎯 綜合辨識結果"]:
+        results["🎯 綜合辨識結果"]["測試時增強"] = "、".join(TTA_VIEWS)
+    return results
+
+def classify_with_cascade(image: Image.Image, order: str = None, min_votes: int = None,
+                          confidence_threshold: int = None, backend: str = None, tta: bool = False) -> Dict:
+    """
+    串接式多模型辨識：依固定順序逐一執行模型，達成共識或信心度門檻即提前停止
+    Args:
+        image: 輸入圖片
+        order: "cheapest" 由運算量最小的模型開始，"accurate" 由準確度最高的模型開始；
+               若為 None 則使用 config 的 CASCADE_ORDER
+        min_votes: 同一食物達到此票數即停止，若為 None 則使用 config 的 CASCADE_MIN_VOTES
+        confidence_threshold: 單一模型信心度（%）達到此值即停止，若為 None 則使用 config 的
+                              CASCADE_CONFIDENCE_THRESHOLD
+        backend: 推論後端，若為 None 則使用 config 的 MODEL_BACKEND
+        tta: 是否使用測試時增強（每個模型一次多視角批次推論）
+    Returns:
+        與 classify_with_all_models 相同格式的結果字典，並附上執行模型數與停止原因
+    """
+    if image is None:
+        return {"錯誤": "請上傳食物圖片"}
+    
+    if order is None:
+        order = CASCADE_ORDER
+    if min_votes is None:
+        min_votes = CASCADE_MIN_VOTES
+    if confidence_threshold is None:
+        confidence_threshold = CASCADE_CONFIDENCE_THRESHOLD
+    
+    cascade_models = CASCADE_ACCURATE_FIRST if order == "accurate" else CASCADE_CHEAPEST_FIRST
+    
+    # 只轉換一次 RGB，各尺寸的輸入在第一次需要時才預處理
+    if image.mode != 'RGB':
+        image = image.convert('RGB')
+    input_tensors = {}
+    
+    outcomes = []
+    label_votes = {}
+    stop_reason = "已執行所有模型"
     
-    for i, model_name in enumerate(shuffled_models, 1):
+    for model_name in cascade_models:
+        input_size = get_model_input_size(model_name)
+        if input_size not in input_tensors:
+            input_tensors[input_size] = (preprocess_image_tta(image, model_name) if tta
+                                         else preprocess_image(image, model_name, reuse_buffer=True))
+        
         try:
-            print(f"正在使用模型 {model_name} 進行辨識...")
-            result = classify_food_image(image, model_name)
-            
-            if "錯誤" not in result:
-                # 成功的辨識結果
-                recognized_food = result["辨識食物"]
-                
-                # 統計投票
-                if recognized_food in food_votes:
-                    food_votes[recognized_food] += 1
-                else:
-                    food_votes[recognized_food] = 1
-                
-                successful_results.append(result)
-                
-                # 添加到詳細結果中
-                results["📊 各模型詳細結果"][f"#{i} {model_name}"] = {
-                    "辨識食物": recognized_food,
-                    "英文名": result.get("英文名", "unknown"),
-                    "五性屬性": result.get("五性屬性", "未知"),
-                    "信心度": result.get("信心度", "N/A")
-                }
-            else:
-                # 失敗的辨識結果
-                results["📊 各模型詳細結果"][f"#{i} {model_name}"] = {
-                    "狀態": "載入失敗",
-                    "錯誤信息": result.get("錯誤", "未知錯誤")
-                }
-                
+            print(f"正在使用模型 {model_name} 進行辨識（串接模式）...")
+            outcome = compute_model_logits(image, model_name, input_tensor=input_tensors[input_size],
+                                           backend=backend)
         except Exception as e:
-            results["📊 各模型詳細結果"][f"#{i} {model_name}"] = {
-                "狀態": "辨識失敗", 
-                "錯誤信息": str(e)
-            }
+            outcome = e
+        outcomes.append((model_name, outcome))
+        
+        if isinstance(outcome, Exception):
+            continue
+        
+        # 檢查是否已達成共識或信心度門檻
+        probabilities = softmax_probabilities(outcome[0])
+        predicted_idx = int(np.argmax(probabilities))
+        confidence = int(probabilities[predicted_idx] * 100)
+        label_votes[predicted_idx] = label_votes.get(predicted_idx, 0) + 1
+        
+        if label_votes[predicted_idx] >= min_votes:
+            stop_reason = f"{label_votes[predicted_idx]} 個模型結果一致"
+            break
+        if confidence >= confidence_threshold:
+            stop_reason = f"{model_name} 信心度達 {confidence}%"
+            break
+    
+    global _cascade_runs, _cascade_models_run
+    models_run = len(outcomes)
+    with _cascade_stats_lock:
+        _cascade_runs += 1
+        _cascade_models_run += models_run
+    if models_run < len(cascade_models):
+        print(f"⏩ 串接模式提前停止: {stop_reason}，已執行 {models_run}/{len(cascade_models)} 個模型")
+    
+    results = summarize_ensemble_outcomes(outcomes, models_run, backend)
+    comprehensive = results["🎯 綜合辨識結果"]
+    if "錯誤" not in comprehensive:
+        comprehensive["執行模型數"] = f"{models_run}/{len(cascade_models)}"
+        comprehensive["停止原因"] = stop_reason
     
-    # 生成綜合結果
-    if food_votes:
-        # 找出得票最多的食物
-        most_voted_food = max(food_votes, key=food_votes.get)
-        vote_count = food_votes[most_voted_food]
-        total_successful = len(successful_results)
-        
-        # 獲取該食物的詳細資訊
-        food_info = None
-        for result in successful_results:
-            if result["辨識食物"] == most_voted_food:
-                food_info = result
-                break
-        
-        if food_info:
-            results["🎯 綜合辨識結果"] = {
-                "最終辨識": most_voted_food,
-                "英文名": food_info.get("英文名", "unknown"),
-                "五性屬性": food_info.get("五性屬性", "未知"),
-                "模型共識度": f"{vote_count}/{total_successful} ({vote_count/total_successful*100:.1f}%)",
-                "成功模型數": f"{total_successful}/{len(available_models)}",
-                "投票分佈": food_votes
-            }
-        else:
-            results["🎯 綜合辨識結果"]["錯誤"] = "無法獲取食物詳細資訊"
-    else:
-        results["🎯 綜合辨識結果"]["錯誤"] = "所有模型都無法成功辨識圖片"
+    return results
+
+def classify_plate(image: Image.Image, model_names=None, backend: str = None) -> Dict:
+    """
+    餐盤多食物辨識：將圖片切成互相重疊的區塊，每個模型以一次批次推論所有區塊，
+    合併各區塊的預測為食物列表（含所在區域）與整餐的五性平衡
+    Args:
+        image: 輸入圖片
+        model_names: 使用的模型名稱列表，若為 None 則使用 config 的 PLATE_MODELS（未指定時為全部模型）
+        backend: 推論後端，若為 None 則使用 config 的 MODEL_BACKEND
+    Returns:
+        包含食物列表與五性平衡的結果字典
+    """
+    if image is None:
+        return {"🍱 餐盤辨識結果": {"錯誤": "請上傳食物圖片"}}
+    
+    model_names = list(model_names or PLATE_MODELS or ENSEMBLE_MODELS)
+    # 切塊與篩選參數不同時結果不同，一併納入快取鍵
+    scope = (f"plate:{PLATE_GRID}x{PLATE_GRID}:{PLATE_TILE_OVERLAP}:{PLATE_MIN_CONFIDENCE}:{PLATE_MAX_FOODS}:"
+             f"{','.join(sorted(model_names))}")
+    cache_key, phash = get_result_cache_key(image, scope, backend)
+    cached_result = _result_cache.get(cache_key, phash)
+    if cached_result is not None:
+        # 相近圖片（如縮放後的副本）共用結果時，區域依目前圖片的尺寸換算
+        return _scale_plate_regions(cached_result, image.width, image.height)
+    
+    if image.mode != 'RGB':
+        image = image.convert('RGB')
     
+    from image_preprocessing import tile_boxes
+    boxes = tile_boxes(image.width, image.height, PLATE_GRID, PLATE_TILE_OVERLAP)
+    
+    # 每種輸入尺寸只裁切與預處理一次，所有區塊寫入同一個批次
+    input_tensors = {}
+    if TORCH_AVAILABLE:
+        from image_preprocessing import get_image_preprocessor
+        for model_name in model_names:
+            input_size = get_model_input_size(model_name)
+            if input_size not in input_tensors:
+                input_tensors[input_size] = get_image_preprocessor(input_size).write_crops(image, boxes)
+    else:
+        input_tensors = preprocess_image_for_models(image, model_names)
+    
+    outcomes = run_ensemble_models(image, model_names, input_tensors, backend=backend, reduce_rows=False)
+    
+    logits_rows, weights, ai_models = [], [], 0
+    for model_name, outcome in outcomes:
+        if isinstance(outcome, Exception):
+            print(f"⚠️ 餐盤辨識: 模型 {model_name} 辨識失敗: {outcome}")
+            continue
+        logits, is_ai = outcome
+        if logits.shape[-1] != len(TRAINING_LABELS):
+            continue
+        # 模擬模式的單列結果套用到所有區塊
+        logits_rows.append(np.broadcast_to(logits, (len(boxes), len(TRAINING_LABELS))))
+        weights.append(ENSEMBLE_MODEL_WEIGHTS.get(model_name, 1.0))
+        ai_models += int(is_ai)
+    
+    if not logits_rows:
+        return {"🍱 餐盤辨識結果": {"錯誤": "所有模型都無法成功辨識圖片"}}
+    
+    # [n_models, n_tiles, n_labels]：一次以加權軟投票融合所有區塊的各模型結果
+    _, tile_probabilities = fuse_model_logits(np.stack(logits_rows), np.array(weights, dtype=np.float32))
+    # 模擬模式的結果不依區塊而異，此時不顯示食物所在的區域
+    tile_regions = ai_models == len(logits_rows)
+    predicted = tile_probabilities.argmax(axis=1)
+    confidences = tile_probabilities[np.arange(len(boxes)), predicted]
+    
+    # 同一食物的區塊合併為一筆，區域為這些區塊的外接矩形
+    foods = {}
+    kept = confidences * 100 >= PLATE_MIN_CONFIDENCE
+    for tile_idx in np.flatnonzero(kept):
+        label_idx = int(predicted[tile_idx])
+        food = foods.setdefault(label_idx, {"boxes": [], "confidences": []})
+        food["boxes"].append(boxes[tile_idx])
+        food["confidences"].append(float(confidences[tile_idx]))
+    
+    if not foods:
+        return {"🍱 餐盤辨識結果": {"錯誤": f"沒有任何區塊的信心度達到 {PLATE_MIN_CONFIDENCE}%"}}
+    
+    food_list = {}
+    ranked_foods = sorted(foods.items(), key=lambda item: -sum(item[1]["confidences"]))[:PLATE_MAX_FOODS]
+    for label_idx, food in ranked_foods:
+        record = FOOD_CATALOG.by_label_index(label_idx)
+        if record is None:
+            continue
+        food_list[record.chinese] = {
+            "英文名": record.english or "unknown",
+            "五性屬性": record.nature,
+            "信心度": f"{max(food['confidences']) * 100:.1f}%"
+        }
+        if tile_regions:
+            lefts, tops, rights, bottoms = zip(*food["boxes"])
+            # 以相對於圖片寬高的比例保存，快取的結果可套用到不同尺寸的相近圖片
+            food_list[record.chinese]["區域比例"] = [
+                round(min(lefts) / image.width, 4), round(min(tops) / image.height, 4),
+                round(max(rights) / image.width, 4), round(max(bottoms) / image.height, 4)]
+            food_list[record.chinese]["區塊數"] = len(food["boxes"])
+    
+    # 整餐的五性平衡：保留的區塊依信心度加權平均其食物機率
+    kept_weights = confidences[kept]
+    meal_probabilities = (tile_probabilities[kept] * kept_weights[:, np.newaxis]).sum(axis=0) / kept_weights.sum()
+    nature_balance = compute_nature_distribution(meal_probabilities)
+    
+    results = {"🍱 餐盤辨識結果": {
+        "食物數": len(food_list),
+        "食物列表": food_list,
+        "五性平衡": nature_balance,
+        "主要五性": max(nature_balance, key=lambda nature: float(nature_balance[nature].rstrip("%"))),
+        "區塊數": f"{len(boxes)}（{PLATE_GRID}x{PLATE_GRID}，重疊 {PLATE_TILE_OVERLAP * 100:.0f}%）",
+        "成功模型數": f"{len(logits_rows)}/{len(model_names)}",
+        "模式": "AI模式" if tile_regions else "模擬模式"
+    }}
+    if not tile_regions:
+        results["🍱 餐盤辨識結果"]["說明"] = "部分模型使用模擬模式，預測不依區塊而異，不顯示食物所在區域"
+    
+    if is_cacheable_result(results):
+        _result_cache.put(cache_key, results, phash, forwards=len(logits_rows))
+    return _scale_plate_regions(results, image.width, image.height)
+
+def _scale_plate_regions(results: Dict, width: int, height: int) -> Dict:
+    """依圖片尺寸將餐盤結果各食物的「區域比例」換算為像素座標的「區域」（原地修改並返回結果）"""
+    for food in results.get("🍱 餐盤辨識結果", {}).get("食物列表", {}).values():
+        if "區域比例" not in food:
+            continue
+        left, top, right, bottom = food["區域比例"]
+        food["區域"] = (f"({round(left * width)}, {round(top * height)})-"
+                      f"({round(right * width)}, {round(bottom * height)})")
     return results
 
 def build_food_recognition_page():
@@ -1441,9 +2648,10 @@ def build_food_recognition_page():
             
             with gr.Row():
                 with gr.Column():
+                    # 以檔案路徑接收上傳，由 load_image 縮小解碼（不在 Gradio 中解碼全解析度圖片）
                     food_image = gr.Image(
                         label="選擇或拖拽食物圖片", 
-                        type="pil",
+                        type="filepath",
                         height=400,
                         container=True
                     )
@@ -1467,6 +2675,28 @@ def build_food_recognition_page():
                         size="lg"
                     )
                     
+                    # 餐盤多食物辨識按鈕
+                    recognize_plate_btn = gr.Button(
+                        "🍱 餐盤多食物辨識",
+                        elem_classes=["food-recognition-btn"],
+                        variant="secondary",
+                        size="lg"
+                    )
+                    
+                    # 模型載入狀態（背景預載時顯示各模型是否就緒）
+                    model_status_display = gr.Textbox(
+                        label="🧠 模型載入狀態",
+                        value=format_model_load_status,
+                        interactive=False,
+                        lines=4,
+                        max_lines=10
+                    )
+                    refresh_model_status_btn = gr.Button(
+                        "🔄 更新模型狀態",
+                        variant="secondary",
+                        size="sm"
+                    )
+                    
                     # single_model_btn = gr.Button(
                     #     "🔍 單一模型辨識", 
                     #     elem_classes=["food-single-model-btn"],
@@ -1582,8 +2812,28 @@ def build_food_recognition_page():
             text += f"最終辨識: {result_dict.get('最終辨識', 'N/A')}\n"
             text += f"英文名: {result_dict.get('英文名', 'N/A')}\n"
             text += f"五性屬性: {result_dict.get('五性屬性', 'N/A')}\n"
+            text += f"綜合信心度: {result_dict.get('綜合信心度', 'N/A')}\n"
             text += f"模型共識度: {result_dict.get('模型共識度', 'N/A')}\n"
-            text += f"成功模型數: {result_dict.get('成功模型數', 'N/A')}\n\n"
+            text += f"成功模型數: {result_dict.get('成功模型數', 'N/A')}\n"
+            if "執行模型數" in result_dict:
+                text += f"執行模型數: {result_dict['執行模型數']}（{result_dict.get('停止原因', '')}）\n"
+            if "測試時增強" in result_dict:
+                text += f"測試時增強: {result_dict['測試時增強']}\n"
+            if "圖片品質提醒" in result_dict:
+                text += f"⚠️ 圖片品質提醒: {result_dict['圖片品質提醒']}（結果可能較不準確）\n"
+            text += "\n"
+
+            if "五性分佈" in result_dict:
+                text += "五性機率分佈:\n"
+                for nature, probability in result_dict["五性分佈"].items():
+                    text += f"   • {nature}: {probability}\n"
+                text += "\n"
+            
+            if "候選食物" in result_dict:
+                text += "軟投票候選食物:\n"
+                for food, probability in result_dict["候選食物"].items():
+                    text += f"   • {food}: {probability}\n"
+                text += "\n"
             
             if "投票分佈" in result_dict:
                 text += "各食物得票分佈:\n"
@@ -1592,6 +2842,30 @@ def build_food_recognition_page():
             
             return text
         
+        def format_plate_result(result_dict):
+            """格式化餐盤多食物辨識結果為可讀文本"""
+            if not result_dict or "錯誤" in result_dict:
+                return f"❌ 錯誤: {result_dict.get('錯誤', '未知錯誤')}"
+            
+            text = "餐盤多食物辨識結果\n"
+            text += "=" * 40 + "\n\n"
+            text += f"辨識出 {result_dict.get('食物數', 0)} 種食物（{result_dict.get('區塊數', '')}，"
+            text += f"成功模型數 {result_dict.get('成功模型數', 'N/A')}，{result_dict.get('模式', '')}）\n\n"
+            
+            for food, info in result_dict.get("食物列表", {}).items():
+                text += f"🍽️ {food}（{info['英文名']}）- {info['五性屬性']}，信心度 {info['信心度']}\n"
+                if "區域" in info:
+                    text += f"   區域: {info['區域']}，涵蓋 {info['區塊數']} 個區塊\n"
+            if "說明" in result_dict:
+                text += f"\n⚠️ {result_dict['說明']}\n"
+            text += "\n"
+            
+            text += f"整餐五性平衡（主要為{result_dict.get('主要五性', 'N/A')}）:\n"
+            for nature, probability in result_dict.get("五性平衡", {}).items():
+                text += f"   • {nature}: {probability}\n"
+            
+            return text
+        
         def format_detailed_result(result_dict):
             """格式化詳細辨識結果為可讀文本"""
             if not result_dict:
@@ -1612,6 +2886,10 @@ def build_food_recognition_page():
                     text += f"英文名: {result.get('英文名', 'N/A')}\n"
                     text += f"五性屬性: {result.get('五性屬性', 'N/A')}\n"
                     text += f"信心度: {result.get('信心度', 'N/A')}\n"
+                    if "模式" in result:
+                        text += f"運行模式: {result['模式']}\n"
+                    if "載入狀態" in result:
+                        text += f"🚫 {result['載入狀態']}\n"
                 
                 text += "\n"
             
@@ -1630,6 +2908,14 @@ def build_food_recognition_page():
             text += f"使用模型: {result_dict.get('使用模型', 'N/A')}\n"
             text += f"信心度: {result_dict.get('信心度', 'N/A')}\n"
             text += f"運行模式: {result_dict.get('模式', 'N/A')}\n"
+            if "測試時增強" in result_dict:
+                text += f"測試時增強: {result_dict['測試時增強']}\n"
+            if "載入狀態" in result_dict:
+                text += f"🚫 {result_dict['載入狀態']}\n"
+            
+            if "五性分佈" in result_dict:
+                distribution = "、".join(f"{nature} {probability}" for nature, probability in result_dict["五性分佈"].items())
+                text += f"五性分佈: {distribution}\n"
             
             return text
 
@@ -1639,6 +2925,7 @@ def build_food_recognition_page():
                 return "❌ 請先上傳圖片", "請先上傳圖片"
             
             try:
+                image = load_image(image, UPLOAD_MAX_SIDE)
                 if use_all_models:
                     # 使用多模型綜合辨識
                     all_results = classify_with_all_models(image)
@@ -1652,6 +2939,8 @@ def build_food_recognition_page():
                     quick_text += f"五性: {comprehensive.get('五性屬性', 'N/A')}\n"
                     quick_text += f"模型共識度: {comprehensive.get('模型共識度', 'N/A')}\n"
                     quick_text += f"成功模型數: {comprehensive.get('成功模型數', 'N/A')}\n"
+                    if "圖片品質提醒" in comprehensive:
+                        quick_text += f"⚠️ 圖片品質提醒: {comprehensive['圖片品質提醒']}\n"
                     quick_text += "詳細結果請查看下方分頁"
                     
                     status = "✅ 多模型綜合辨識完成！"
@@ -1680,6 +2969,7 @@ def build_food_recognition_page():
                 return "", "", "請先上傳圖片", None
             
             try:
+                image = load_image(image, UPLOAD_MAX_SIDE)
                 # 執行綜合辨識
                 all_results = classify_with_all_models(image)
                 
@@ -1698,11 +2988,24 @@ def build_food_recognition_page():
                 error_text = f"❌ 辨識過程發生錯誤: {str(e)}"
                 return error_text, "", f"❌ 辨識失敗: {str(e)}", None
         
+        def update_plate_result(image):
+            if image is None:
+                return "請先上傳圖片", "請先上傳圖片"
+            
+            try:
+                image = load_image(image, UPLOAD_MAX_SIDE)
+                plate = classify_plate(image).get("🍱 餐盤辨識結果", {})
+                status = "✅ 餐盤多食物辨識完成！" if plate and "錯誤" not in plate else "⚠️ 辨識遇到問題"
+                return format_plate_result(plate), status
+            except Exception as e:
+                return f"❌ 辨識過程發生錯誤: {str(e)}", f"❌ 辨識失敗: {str(e)}"
+        
         def update_single_result(image, model_name):
             if image is None:
                 return "❌ 請先上傳圖片", "請先上傳圖片"
             
             try:
+                image = load_image(image, UPLOAD_MAX_SIDE)
                 result = classify_food_image(image, model_name)
                 formatted_result = format_single_result(result)
                 status = f"✅ 使用 {model_name} 辨識完成！" if "錯誤" not in result else f"⚠️ {model_name} 辨識失敗"
@@ -1716,9 +3019,8 @@ def build_food_recognition_page():
             try:
                 image_path = f"./assets/images/{image_filename}"
                 if os.path.exists(image_path):
-                    from PIL import Image
-                    image = Image.open(image_path)
-                    return image, f"✅ 已載入範例圖片: {image_filename}"
+                    # 圖片元件以檔案路徑接收，辨識時才縮小解碼
+                    return image_path, f"✅ 已載入範例圖片: {image_filename}"
                 else:
                     return None, f"❌ 找不到範例圖片: {image_filename}"
             except Exception as e:
@@ -1810,6 +3112,21 @@ def build_food_recognition_page():
             show_progress=True
         )
         
+        # 餐盤多食物辨識按鈕事件（結果顯示於綜合辨識結果分頁）
+        recognize_plate_btn.click(
+            fn=update_plate_result,
+            inputs=[food_image],
+            outputs=[comprehensive_result_display, status_display],
+            api_name="recognize_food_plate",
+            show_progress=True
+        )
+        
+        # 模型載入狀態更新事件
+        refresh_model_status_btn.click(
+            fn=format_model_load_status,
+            outputs=[model_status_display]
+        )
+        
         # 單一模型辨識按鈕事件
         # single_model_btn.click(
         #     fn=update_single_result,
@@ -1842,6 +3159,7 @@ def load_swin_model(model_name: str, model_path: str = None):
     
     if not os.path.exists(model_path):
         print(f"❌ Swin 模型檔案不存在: {model_path}，使用模擬模式")
+        _record_load_error(model_name, f"模型檔案不存在: {model_path}")
         return None
     
     try:
@@ -1919,6 +3237,7 @@ def load_swin_model(model_name: str, model_path: str = None):
         print(f"❌ 載入 Swin 模型失敗: {e}")
         import traceback
         traceback.print_exc()
+        _record_load_error(model_name, str(e))
         return None
 
 def load_efficientnet_model(model_name: str, model_path: str = None):
@@ -1931,6 +3250,7 @@ def load_efficientnet_model(model_name: str, model_path: str = None):
     
     if not os.path.exists(model_path):
         print(f"❌ EfficientNet 模型檔案不存在: {model_path}，使用模擬模式")
+        _record_load_error(model_name, f"模型檔案不存在: {model_path}")
         return None
     
     try:
@@ -1989,6 +3309,7 @@ def load_efficientnet_model(model_name: str, model_path: str = None):
         
     except Exception as e:
         print(f"❌ 載入 EfficientNet 模型失敗: {e}")
+        _record_load_error(model_name, str(e))
         return None
 
 def load_convnext_model(model_name: str, model_path: str = None):
@@ -1998,6 +3319,7 @@ def load_convnext_model(model_name: str, model_path: str = None):
     
     if not os.path.exists(model_path):
         print(f"❌ ConvNeXt 模型檔案不存在: {model_path}，使用模擬模式")
+        _record_load_error(model_name, f"模型檔案不存在: {model_path}")
         return None
     
     try:
@@ -2057,6 +3379,7 @@ def load_convnext_model(model_name: str, model_path: str = None):
         
     except Exception as e:
         print(f"Error loading ConvNeXt model: {str(e)}")
+        _record_load_error(model_name, str(e))
         return None
 
 def load_vgg_model(model_name: str, model_path: str = None):
@@ -2069,6 +3392,7 @@ def load_vgg_model(model_name: str, model_path: str = None):
     
     if not os.path.exists(model_path):
         print(f"❌ VGG 模型檔案不存在: {model_path}，使用模擬模式")
+        _record_load_error(model_name, f"模型檔案不存在: {model_path}")
         return None
     
     try:
@@ -2127,5 +3451,6 @@ def load_vgg_model(model_name: str, model_path: str = None):
         
     except Exception as e:
         print(f"❌ 載入 VGG 模型失敗: {e}")
+        _record_load_error(model_name, str(e))
         return None
 
@@ -0,0 +1,33 @@
+# image_ingest.py - 上傳圖片讀取模組
+# 上傳時即將圖片縮小至有上限的工作尺寸：JPEG 以 draft 模式在 DCT 階段直接縮小解碼，
+# 並依 EXIF 方向轉正，之後的辨識、快取與介面狀態都只處理縮小後的圖片
+import io
+from PIL import Image, ImageOps
+
+def load_image(source, max_side: int = 1024) -> Image.Image:
+    """
+    讀取上傳的圖片並縮小至工作尺寸
+    Args:
+        source: 圖片檔案路徑、位元組、檔案物件或已解碼的 PIL 圖片
+        max_side: 工作尺寸的最長邊（像素），0 表示不縮小
+    Returns:
+        已依 EXIF 方向轉正、最長邊不超過 max_side 的 RGB 圖片
+    """
+    if isinstance(source, bytes):
+        source = io.BytesIO(source)
+    image = source if isinstance(source, Image.Image) else Image.open(source)
+
+    # draft 只對尚未解碼的 JPEG 有效：以 1/2、1/4、1/8 的比例解碼，且解碼後不小於要求的尺寸
+    width, height = image.size
+    if max_side > 0 and image.format == "JPEG" and max(width, height) > max_side:
+        scale = max_side / max(width, height)
+        image.draft("RGB", (int(width * scale), int(height * scale)))
+
+    # 先縮小再轉正與轉換色彩，旋轉與轉換只處理工作尺寸的圖片；模型輸入遠小於工作尺寸，雙線性縮小即足夠
+    if max_side > 0 and max(width, height) > max_side:
+        image.thumbnail((max_side, max_side), Image.BILINEAR)
+
+    image = ImageOps.exif_transpose(image)
+    if image.mode != "RGB":
+        image = image.convert("RGB")
+    return image
@@ -0,0 +1,142 @@
+# image_preprocessing.py - 圖片預處理模組
+# 每種輸入尺寸一個預處理器（每個執行緒各自一份）：縮放後的 uint8 像素寫入重複使用的暫存陣列，
+# 再以一次乘加運算轉為正規化的 float 並直接寫入預先配置的輸入緩衝區（或批次中的某一列）
+import threading
+import numpy as np
+import torch
+from PIL import Image
+
+# ImageNet 正規化參數（與訓練時的 transforms.Normalize 相同）
+IMAGENET_MEAN = (0.485, 0.456, 0.406)
+IMAGENET_STD = (0.229, 0.224, 0.225)
+
+# 測試時增強（TTA）的視角，依序對應 write_tta_batch 寫入的批次列
+TTA_VIEWS = ("原圖", "中央裁切", "水平翻轉", "中央裁切水平翻轉")
+
+class ImagePreprocessor:
+    """
+    單一輸入尺寸的圖片預處理器
+    結果與 Resize → ToTensor → Normalize 相同：(像素 / 255 - mean) / std 合併為 像素 * scale + bias
+    """
+
+    def __init__(self, input_size: int):
+        """
+        Args:
+            input_size: 模型輸入的邊長（像素）
+        """
+        self.input_size = input_size
+        std = torch.tensor(IMAGENET_STD)
+        # 以 HWC 順序存放，直接套用在緩衝區的 HWC 視圖上
+        self.scale = 1 / (255 * std)
+        self.bias = -torch.tensor(IMAGENET_MEAN) / std
+        # 縮放後像素的暫存陣列與共用同一塊記憶體的 tensor 視圖
+        self._pixels = np.empty((input_size, input_size, 3), dtype=np.uint8)
+        self._pixels_tensor = torch.from_numpy(self._pixels)
+        self._buffers = {}
+
+    def buffer(self, batch_size: int = 1) -> torch.Tensor:
+        """
+        取得重複使用的輸入緩衝區 [batch_size, 3, H, W]
+        同一執行緒下一次取得相同大小的緩衝區時內容會被覆寫，需要保留結果的呼叫端應自行配置
+        """
+        buffer = self._buffers.get(batch_size)
+        if buffer is None:
+            buffer = torch.empty(batch_size, 3, self.input_size, self.input_size)
+            self._buffers[batch_size] = buffer
+        return buffer
+
+    def write(self, image: Image.Image, out: torch.Tensor):
+        """
+        將圖片預處理後寫入 out
+        Args:
+            image: RGB 圖片
+            out: [3, H, W] 的 float tensor（可為批次緩衝區中的一列）
+        """
+        size = (self.input_size, self.input_size)
+        resized = image if image.size == size else image.resize(size, Image.BILINEAR)
+        np.copyto(self._pixels, np.asarray(resized))
+        # uint8 → float 與正規化在同一次運算中完成，直接寫入輸出的 HWC 視圖
+        out_hwc = out.permute(1, 2, 0)
+        torch.mul(self._pixels_tensor, self.scale, out=out_hwc)
+        out_hwc.add_(self.bias)
+
+    def __call__(self, image: Image.Image, out: torch.Tensor = None) -> torch.Tensor:
+        """
+        預處理單張圖片
+        Args:
+            image: RGB 圖片
+            out: 寫入的 [1, 3, H, W] tensor（如 buffer() 取得的緩衝區），若為 None 則配置新的 tensor
+        Returns:
+            [1, 3, H, W] 的輸入 tensor
+        """
+        if out is None:
+            out = torch.empty(1, 3, self.input_size, self.input_size)
+        self.write(image, out[0])
+        return out
+
+    def write_tta_batch(self, image: Image.Image, crop_fraction: float = 0.875) -> torch.Tensor:
+        """
+        將測試時增強（TTA）的各個視角寫入重複使用的批次緩衝區：
+        原圖、中央裁切，以及兩者的水平翻轉
+        Args:
+            image: RGB 圖片
+            crop_fraction: 中央裁切保留的邊長比例
+        Returns:
+            [len(TTA_VIEWS), 3, H, W] 的輸入 tensor（目前執行緒的緩衝區，下一次呼叫時覆寫）
+        """
+        batch = self.buffer(len(TTA_VIEWS))
+        self.write(image, batch[0])
+
+        width, height = image.size
+        crop_width, crop_height = int(width * crop_fraction), int(height * crop_fraction)
+        left, top = (width - crop_width) // 2, (height - crop_height) // 2
+        self.write(image.crop((left, top, left + crop_width, top + crop_height)), batch[1])
+
+        # 翻轉直接由已正規化的列產生，不重新縮放與正規化
+        batch[2:].copy_(batch[:2].flip(-1))
+        return batch
+
+    def write_crops(self, image: Image.Image, boxes) -> torch.Tensor:
+        """
+        將圖片的多個裁切區域分別預處理，寫入重複使用的批次緩衝區（每個區域一列）
+        Args:
+            image: RGB 圖片
+            boxes: (left, top, right, bottom) 區域列表
+        Returns:
+            [len(boxes), 3, H, W] 的輸入 tensor（目前執行緒的緩衝區，下一次呼叫時覆寫）
+        """
+        batch = self.buffer(len(boxes))
+        for row, box in enumerate(boxes):
+            self.write(image.crop(box), batch[row])
+        return batch
+
+def tile_boxes(width: int, height: int, grid: int = 3, overlap: float = 0.25) -> list:
+    """
+    將圖片切成 grid x grid 個互相重疊的區塊
+    Args:
+        width: 圖片寬度
+        height: 圖片高度
+        grid: 每個方向的區塊數
+        overlap: 相鄰區塊重疊的比例（相對於區塊邊長）
+    Returns:
+        由左上到右下的 (left, top, right, bottom) 區域列表
+    """
+    def spans(length):
+        tile = length / (grid - (grid - 1) * overlap)
+        step = tile * (1 - overlap)
+        return [(round(i * step), min(length, round(i * step + tile))) for i in range(grid)]
+
+    return [(left, top, right, bottom) for top, bottom in spans(height) for left, right in spans(width)]
+
+# 每個執行緒各自的預處理器（暫存陣列與緩衝區不跨執行緒共用）
+_thread_local = threading.local()
+
+def get_image_preprocessor(input_size: int) -> ImagePreprocessor:
+    """取得目前執行緒指定輸入尺寸的預處理器（第一次使用時建立）"""
+    preprocessors = getattr(_thread_local, "preprocessors", None)
+    if preprocessors is None:
+        preprocessors = _thread_local.preprocessors = {}
+    preprocessor = preprocessors.get(input_size)
+    if preprocessor is None:
+        preprocessor = preprocessors[input_size] = ImagePreprocessor(input_size)
+    return preprocessor
@@ -0,0 +1,143 @@
+# image_quality.py - 圖片品質檢查模組
+# 在多模型辨識前以縮圖快速檢查上傳圖片：拉普拉斯變異數判斷模糊、亮度直方圖判斷曝光，
+# 可選擇再以一個小型模型的信心度判斷是否為食物；品質不足的圖片在執行完整模型前即拒絕或提醒
+import threading
+from typing import Dict
+import numpy as np
+from PIL import Image
+
+# 檢查結果
+QUALITY_PASS = "通過"
+QUALITY_WARN = "提醒"
+QUALITY_REJECT = "拒絕"
+
+class ImageQualityGate:
+    """
+    上傳圖片的品質檢查
+    各項指標都在最長邊 thumbnail_side 的灰階縮圖上計算；低於拒絕門檻的圖片不執行模型推論，
+    介於拒絕與提醒門檻之間的圖片照常辨識並附上提醒
+    """
+
+    def __init__(self, thumbnail_side: int = 256, min_sharpness: float = 8.0, warn_sharpness: float = 25.0,
+                 min_brightness: float = 25.0, max_brightness: float = 245.0, max_clipped_fraction: float = 0.5,
+                 min_contrast: float = 6.0, min_confidence: float = 0.0, reject: bool = True):
+        """
+        Args:
+            thumbnail_side: 檢查用縮圖的最長邊（像素）
+            min_sharpness: 拉普拉斯變異數低於此值視為嚴重模糊（拒絕）
+            warn_sharpness: 拉普拉斯變異數低於此值視為模糊（提醒）
+            min_brightness: 平均亮度（0-255）低於此值視為過暗（拒絕）
+            max_brightness: 平均亮度高於此值視為過亮（拒絕）
+            max_clipped_fraction: 全黑或全白像素的比例超過此值視為曝光不足或過度（提醒）
+            min_contrast: 亮度標準差低於此值視為沒有內容的單色圖片（拒絕）
+            min_confidence: 小型模型的最高機率（0-1）低於此值視為不是食物（拒絕），0 表示不檢查
+            reject: False 時拒絕的圖片也照常辨識，只附上提醒
+        """
+        self.thumbnail_side = thumbnail_side
+        self.min_sharpness = min_sharpness
+        self.warn_sharpness = warn_sharpness
+        self.min_brightness = min_brightness
+        self.max_brightness = max_brightness
+        self.max_clipped_fraction = max_clipped_fraction
+        self.min_contrast = min_contrast
+        self.min_confidence = min_confidence
+        self.reject = reject
+        self._lock = threading.Lock()
+        self.checks = 0
+        self.warnings = 0
+        self.rejections = 0
+        self.classifier_forwards = 0
+        self.forwards_avoided = 0
+
+    def measure(self, image: Image.Image) -> Dict:
+        """
+        計算縮圖的清晰度與曝光指標
+        Args:
+            image: PIL 圖片
+        Returns:
+            sharpness（拉普拉斯變異數）、brightness（平均亮度）、contrast（亮度標準差）、
+            dark_fraction 與 bright_fraction（全黑、全白像素比例）
+        """
+        scale = self.thumbnail_side / max(image.size)
+        if scale < 1:
+            size = (max(1, round(image.width * scale)), max(1, round(image.height * scale)))
+            image = image.resize(size, Image.BILINEAR, reducing_gap=2.0)
+        gray = np.asarray(image.convert("L"), dtype=np.float32)
+
+        # 4 鄰域拉普拉斯：清晰的邊緣產生大的二階差分，模糊圖片的變異數很小
+        laplacian = (gray[:-2, 1:-1] + gray[2:, 1:-1] + gray[1:-1, :-2] + gray[1:-1, 2:]
+                     - 4 * gray[1:-1, 1:-1])
+        histogram = np.bincount(gray.astype(np.uint8).ravel(), minlength=256) / gray.size
+        return {
+            "sharpness": float(laplacian.var()) if laplacian.size else 0.0,
+            "brightness": float(gray.mean()),
+            "contrast": float(gray.std()),
+            "dark_fraction": float(histogram[:16].sum()),
+            "bright_fraction": float(histogram[240:].sum())
+        }
+
+    def check(self, image: Image.Image, forwards: int = 0, classify=None) -> Dict:
+        """
+        檢查圖片品質並記錄統計
+        Args:
+            image: PIL 圖片
+            forwards: 拒絕時省下的模型推論次數
+            classify: 可選的小型模型函數，參數為圖片，返回 (最高機率, 是否為實際模型結果)；
+                      只在縮圖檢查沒有拒絕時執行
+        Returns:
+            {"verdict": 檢查結果, "reasons": 原因列表, "metrics": 各項指標}
+        """
+        metrics = self.measure(image)
+        rejections, warnings = [], []
+
+        if metrics["contrast"] < self.min_contrast:
+            rejections.append("圖片幾乎沒有內容")
+        if metrics["brightness"] < self.min_brightness:
+            rejections.append("圖片過暗")
+        elif metrics["brightness"] > self.max_brightness:
+            rejections.append("圖片過亮")
+        elif metrics["dark_fraction"] > self.max_clipped_fraction:
+            warnings.append("圖片大部分區域曝光不足")
+        elif metrics["bright_fraction"] > self.max_clipped_fraction:
+            warnings.append("圖片大部分區域曝光過度")
+        if metrics["sharpness"] < self.min_sharpness:
+            rejections.append("圖片嚴重模糊")
+        elif metrics["sharpness"] < self.warn_sharpness:
+            warnings.append("圖片有些模糊")
+
+        classifier_forwards = 0
+        if classify is not None and self.min_confidence > 0 and not rejections:
+            confidence, is_ai = classify(image)
+            classifier_forwards = 1
+            # 模擬模式的結果不代表圖片內容，不作為判斷依據
+            if is_ai:
+                metrics["confidence"] = float(confidence)
+                if confidence < self.min_confidence:
+                    rejections.append("圖片可能不是食物")
+
+        if not self.reject:
+            warnings, rejections = rejections + warnings, []
+        verdict = QUALITY_REJECT if rejections else QUALITY_WARN if warnings else QUALITY_PASS
+
+        with self._lock:
+            self.checks += 1
+            self.classifier_forwards += classifier_forwards
+            if verdict == QUALITY_REJECT:
+                self.rejections += 1
+                self.forwards_avoided += forwards
+            elif verdict == QUALITY_WARN:
+                self.warnings += 1
+        return {"verdict": verdict, "reasons": rejections or warnings, "metrics": metrics}
+
+    def stats(self) -> Dict:
+        """檢查、提醒與拒絕次數，小型模型的推論次數，以及拒絕省下的模型推論次數"""
+        with self._lock:
+            return {
+                "checks": self.checks,
+                "warnings": self.warnings,
+                "rejections": self.rejections,
+                "rejection_rate": round(self.rejections / self.checks * 100, 1) if self.checks else 0.0,
+                "classifier_forwards": self.classifier_forwards,
+                "forwards_avoided": self.forwards_avoided,
+                "net_forwards_saved": self.forwards_avoided - self.classifier_forwards
+            }
@@ -42,3 +42,9 @@ ls -la *.pth
 
 # Return to the previous directory
 cd ..
+
+# 轉換為標準化檢查點與 manifest，之後載入不需再推測檢查點格式
+# 預設以 fp32 儲存，記憶體映射的權重可直接推論並由多個程序共用；
+# 支援 bf16 的 CPU 可設定 MODEL_STORAGE_DTYPE=bf16 並以 MODEL_COMPUTE_DTYPE=bf16 執行，讀取量減半且同樣不需複製
+echo "轉換模型檢查點..."
+python3 model_store.py --dtype "${MODEL_STORAGE_DTYPE:-fp32}"
@@ -0,0 +1,133 @@
+# model_batching.py - 跨請求微批次排程模組
+# 每個模型一個排程執行緒：收集同時到達的推論請求（最多等待數毫秒或湊滿批次列數），
+# 合併為一次批次推論後，再將各列 logits 分別交回對應的呼叫者
+import time
+import queue
+import threading
+from concurrent.futures import Future
+from typing import Dict
+
+class MicroBatcher:
+    """
+    單一模型的微批次排程器
+    呼叫者以 submit 送出輸入並等待結果；排程執行緒取得第一個請求後，
+    最多再等待 max_wait_ms 毫秒收集後續請求，合併的總列數不超過 max_batch_rows 後一次推論
+    （測試時增強、餐盤區塊等一個請求即有多列；單一請求的列數已達上限時單獨推論）
+    """
+
+    def __init__(self, name: str, max_batch_rows: int, max_wait_ms: float, run_batch):
+        """
+        Args:
+            name: 排程器名稱（模型在註冊表中的鍵，用於日誌與統計）
+            max_batch_rows: 單次批次推論合併的最大輸入列數
+            max_wait_ms: 取得第一個請求後等待後續請求的最長時間（毫秒）
+            run_batch: 批次推論函數，參數為 (模型, 合併後的輸入)，返回 logits
+        """
+        self.name = name
+        self.max_batch_rows = max(1, max_batch_rows)
+        self.max_wait = max(0.0, max_wait_ms) / 1000
+        self.run_batch = run_batch
+        self.requests = queue.Queue()
+        # 超出上一批次列數上限的請求，留待下一批次第一個處理
+        self._deferred = None
+        self.stats_lock = threading.Lock()
+        self.batches = 0
+        self.items = 0
+        self.rows = 0
+        self.largest_batch = 0
+        self.largest_batch_rows = 0
+        self.thread = threading.Thread(target=self._run, name=f"batcher-{name}", daemon=True)
+        self.thread.start()
+
+    def submit(self, model, input_tensor) -> Future:
+        """
+        送出單一請求
+        Args:
+            model: 執行推論的模型（模型被釋放並重新載入後，新舊模型的請求會分開推論）
+            input_tensor: 輸入 tensor（一般為批次大小 1，測試時增強等為多列）
+        Returns:
+            Future，結果為該請求各列輸入的 logits
+        """
+        future = Future()
+        self.requests.put((model, input_tensor, future))
+        return future
+
+    def _collect(self) -> list:
+        """等待第一個請求，再於等待時間內收集後續請求，總列數不超過 max_batch_rows"""
+        first, self._deferred = self._deferred or self.requests.get(), None
+        batch = [first]
+        rows = first[1].shape[0]
+        deadline = time.monotonic() + self.max_wait
+        while rows < self.max_batch_rows:
+            # 等待期間已排入佇列的請求一併處理，等待時間結束後不再等待新的請求
+            remaining = deadline - time.monotonic()
+            try:
+                request = self.requests.get(timeout=remaining) if remaining > 0 else self.requests.get_nowait()
+            except queue.Empty:
+                break
+            if rows + request[1].shape[0] > self.max_batch_rows:
+                self._deferred = request
+                break
+            batch.append(request)
+            rows += request[1].shape[0]
+        return batch
+
+    def _run(self):
+        """排程執行緒主迴圈"""
+        while True:
+            batch = self._collect()
+
+            groups = {}
+            for model, input_tensor, future in batch:
+                groups.setdefault(id(model), (model, []))[1].append((input_tensor, future))
+            for model, requests in groups.values():
+                self._run_group(model, requests)
+
+    def _run_group(self, model, requests: list):
+        """以同一模型批次推論一組請求，並將各列結果交回對應的 Future"""
+        import torch
+
+        try:
+            if len(requests) == 1:
+                requests[0][1].set_result(self.run_batch(model, requests[0][0]))
+            else:
+                outputs = self.run_batch(model, torch.cat([input_tensor for input_tensor, _ in requests]))
+                total_rows = sum(input_tensor.shape[0] for input_tensor, _ in requests)
+                if outputs.dim() == 0 or outputs.shape[0] != total_rows:
+                    raise ValueError(f"批次輸出形狀 {tuple(outputs.shape)} 與輸入列數 {total_rows} 不符")
+                row = 0
+                for input_tensor, future in requests:
+                    future.set_result(outputs[row:row + input_tensor.shape[0]])
+                    row += input_tensor.shape[0]
+        except Exception as e:
+            if len(requests) == 1:
+                requests[0][1].set_exception(e)
+                return
+            # 模型不支援批次推論（例如以固定批次大小追蹤的模型）時逐一推論
+            print(f"⚠️ {self.name} 批次推論失敗，改為逐一推論: {e}")
+            for input_tensor, future in requests:
+                try:
+                    future.set_result(self.run_batch(model, input_tensor))
+                except Exception as single_error:
+                    future.set_exception(single_error)
+            return
+
+        batch_rows = sum(input_tensor.shape[0] for input_tensor, _ in requests)
+        with self.stats_lock:
+            self.batches += 1
+            self.items += len(requests)
+            self.rows += batch_rows
+            self.largest_batch = max(self.largest_batch, len(requests))
+            self.largest_batch_rows = max(self.largest_batch_rows, batch_rows)
+
+    def stats(self) -> Dict:
+        """批次數、請求數、平均與最大批次大小（請求數與輸入列數）"""
+        with self.stats_lock:
+            return {
+                "batches": self.batches,
+                "items": self.items,
+                "rows": self.rows,
+                "average_batch_size": round(self.items / self.batches, 2) if self.batches else 0,
+                "largest_batch": self.largest_batch,
+                "largest_batch_rows": self.largest_batch_rows
+            }
@@ -0,0 +1,173 @@
+# model_compilation.py - 模型編譯最佳化模組
+# 將 PyTorch 模型轉為凍結的 TorchScript（折疊 conv-bn、常數化權重），卷積網路另外嘗試 channels-last 記憶體格式；
+# 各候選版本以實際推論時間擇優，結果依檢查點指紋快取於磁碟，之後啟動直接載入
+import os
+import glob
+import io
+import copy
+import time
+import warnings
+import torch
+import torch.nn as nn
+
+# 嘗試 channels-last 記憶體格式的卷積網路系列（Transformer 系列維持 NCHW）
+CHANNELS_LAST_FAMILIES = ("resnet", "densenet", "efficientnet", "convnext", "vgg")
+
+# 候選版本與原始模型輸出的最大容許差異（超過時不採用該版本）
+MAX_OUTPUT_DIFFERENCE = 1e-3
+
+# 套用推論專用圖形最佳化（optimize_for_inference）的版本名稱後綴；
+# 最佳化後的圖形無法序列化，快取中保存凍結的模組，載入後再套用
+OPTIMIZED_SUFFIX = "+optimized"
+
+# TorchScript 檔案中記錄採用版本的附加欄位
+_VARIANT_EXTRA_FILE = "compile_variant"
+
+class _ChannelsLastModel(nn.Module):
+    """將輸入轉為 channels-last 後再推論，讓追蹤出的圖形包含格式轉換，呼叫端仍傳入一般的 NCHW tensor"""
+
+    def __init__(self, model):
+        super().__init__()
+        self.model = copy.deepcopy(model).to(memory_format=torch.channels_last)
+
+    def forward(self, x):
+        return self.model(x.contiguous(memory_format=torch.channels_last))
+
+def _freeze(model, example_input):
+    """追蹤並凍結模型（輸出由 compile_model 另行比對；凍結時折疊 conv-bn 並將權重常數化）"""
+    with torch.no_grad(), warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        return torch.jit.freeze(torch.jit.trace(model, example_input, check_trace=False).eval())
+
+def apply_inference_optimization(model, variant: str):
+    """
+    依採用的版本對凍結的模組套用推論專用的圖形最佳化（原地修改模組）
+    Args:
+        model: 凍結的 TorchScript 模組
+        variant: compile_model 選出的版本名稱
+    """
+    if not variant.endswith(OPTIMIZED_SUFFIX):
+        return model
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        return torch.jit.optimize_for_inference(model)
+
+def _time_forward(model, example_input, repeats: int) -> float:
+    """模型單次推論的平均耗時（毫秒），先執行兩次暖機（TorchScript 前幾次呼叫會進行圖形最佳化）"""
+    with torch.inference_mode():
+        for _ in range(2):
+            model(example_input)
+        start_time = time.perf_counter()
+        for _ in range(repeats):
+            model(example_input)
+    return (time.perf_counter() - start_time) / repeats * 1000
+
+def compile_model(model, model_name: str, input_size: int, repeats: int = 3):
+    """
+    建立模型的各個編譯版本，保留輸出與原始模型一致且推論最快的版本
+    Args:
+        model: fp32 模型（eval 模式）
+        model_name: 模型名稱（決定是否嘗試 channels-last）
+        input_size: 模型輸入的邊長（像素）
+        repeats: 量測各版本延遲的重複次數
+    Returns:
+        (凍結的 TorchScript 模組, 採用的版本名稱, 各版本延遲（毫秒）)；
+        模組可直接寫入快取，推論前需以 apply_inference_optimization 套用採用版本的最佳化
+    """
+    model = model.float().eval()
+    device = next(model.parameters()).device
+    example_input = torch.rand(1, 3, input_size, input_size, device=device)
+    with torch.inference_mode():
+        reference = model(example_input)
+
+    builders = {"frozen": lambda: _freeze(model, example_input)}
+    if any(family in model_name.lower() for family in CHANNELS_LAST_FAMILIES):
+        builders["channels_last"] = lambda: _freeze(_ChannelsLastModel(model), example_input)
+
+    latencies = {"eager": _time_forward(model, example_input, repeats)}
+    best_model, best_variant = None, None
+    for base_variant, build in builders.items():
+        try:
+            base = build()
+        except Exception as e:
+            print(f"⚠️ 模型 {model_name} 無法建立 {base_variant} 版本: {e}")
+            continue
+        for variant in (base_variant, base_variant + OPTIMIZED_SUFFIX):
+            try:
+                # 以序列化後的副本套用最佳化，保留可寫入快取的凍結模組
+                candidate = base if variant == base_variant else apply_inference_optimization(
+                    torch.jit.load(io.BytesIO(base.save_to_buffer())), variant)
+                with torch.inference_mode():
+                    difference = (candidate(example_input).float() - reference).abs().max().item()
+                if difference > MAX_OUTPUT_DIFFERENCE:
+                    print(f"⚠️ 模型 {model_name} 的 {variant} 版本輸出差異 {difference:.2e} 過大，不採用")
+                    continue
+                latencies[variant] = _time_forward(candidate, example_input, repeats)
+            except Exception as e:
+                print(f"⚠️ 模型 {model_name} 無法建立 {variant} 版本: {e}")
+                continue
+            if best_variant is None or latencies[variant] < latencies[best_variant]:
+                best_model, best_variant = base, variant
+
+    if best_model is None:
+        raise RuntimeError(f"模型 {model_name} 沒有可用的編譯版本")
+    return best_model, best_variant, latencies
+
+class CompiledModelCache:
+    """
+    編譯模型的磁碟快取
+    檔名包含原始檢查點的指紋，檢查點更新後自動重新編譯
+    """
+
+    def __init__(self, cache_dir: str):
+        """
+        Args:
+            cache_dir: 編譯模型的存放目錄
+        """
+        self.cache_dir = cache_dir
+
+    def path(self, model_name: str, fingerprint: str) -> str:
+        """編譯模型檔案的完整路徑"""
+        return os.path.join(self.cache_dir, f"{model_name}.compiled.{fingerprint[:12]}.pt")
+
+    def load(self, model_name: str, fingerprint: str, device=None):
+        """
+        載入快取的編譯模型
+        Args:
+            model_name: 模型名稱
+            fingerprint: 原始檢查點的指紋
+            device: 載入的裝置，若為 None 則載入至 CPU
+        Returns:
+            已套用最佳化的 TorchScript 模組；沒有快取或載入失敗時返回 None
+        """
+        path = self.path(model_name, fingerprint)
+        if not os.path.exists(path):
+            return None
+        try:
+            extra_files = {_VARIANT_EXTRA_FILE: ""}
+            with warnings.catch_warnings():
+                warnings.simplefilter("ignore")
+                model = torch.jit.load(path, map_location=device or "cpu", _extra_files=extra_files)
+            variant = extra_files[_VARIANT_EXTRA_FILE]
+            variant = variant.decode() if isinstance(variant, bytes) else variant
+            model = apply_inference_optimization(model, variant)
+            print(f"✅ 由快取載入編譯模型 {model_name} ({variant})")
+            return model
+        except Exception as e:
+            print(f"⚠️ 編譯模型快取 {path} 載入失敗，將重新編譯: {e}")
+            return None
+
+    def save(self, model_name: str, fingerprint: str, model, variant: str):
+        """寫入編譯模型快取（尚未套用最佳化的凍結模組），並移除同一模型舊指紋的快取檔案"""
+        os.makedirs(self.cache_dir, exist_ok=True)
+        path = self.path(model_name, fingerprint)
+        for stale_path in glob.glob(os.path.join(self.cache_dir, f"{model_name}.compiled.*.pt")):
+            if stale_path != path:
+                os.remove(stale_path)
+
+        temp_path = path + ".tmp"
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            torch.jit.save(model, temp_path, _extra_files={_VARIANT_EXTRA_FILE: variant})
+        os.replace(temp_path, path)
+        print(f"📦 已快取編譯模型 {model_name} ({variant}) -> {path}")
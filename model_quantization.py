@@ -0,0 +1,278 @@
+# model_quantization.py - 模型量化模組
+# CPU 推論用的 int8 量化：卷積網路在可行時以樣本圖片校正後靜態量化，其餘模型動態量化 Linear 層；
+# 量化後的模型以 TorchScript 快取於磁碟，之後啟動直接載入
+import os
+import glob
+import time
+import copy
+import warnings
+from typing import Dict, List
+import torch
+import torch.nn as nn
+
+# 以靜態量化（卷積與激活皆為 int8）處理的模型系列，其餘模型使用動態量化；
+# 這些模型需要校正圖片，動態量化只會處理最後的 Linear 層而幾乎沒有加速
+STATIC_QUANTIZATION_FAMILIES = ("resnet", "densenet", "vgg")
+
+# 動態量化時保留 fp32 的 Linear 層：SwinV2 的注意力以 F.linear 直接讀取 qkv.weight
+DYNAMIC_QUANTIZATION_EXCLUDES = {
+    "swinv2": ("attn.qkv",),
+}
+
+# TorchScript 檔案中記錄量化方式的附加欄位
+_MODE_EXTRA_FILE = "quantization_mode"
+
+def select_quantized_engine() -> str:
+    """選擇可用的量化運算後端（x86 > fbgemm > qnnpack）"""
+    for engine in ("x86", "fbgemm", "qnnpack"):
+        if engine in torch.backends.quantized.supported_engines:
+            torch.backends.quantized.engine = engine
+            return engine
+    raise RuntimeError("此環境的 PyTorch 不支援量化運算")
+
+def _model_family(model_name: str, families) -> str:
+    """取得模型名稱對應的系列（如 swinv2、resnet），不在列表中時返回空字串"""
+    lowered = model_name.lower()
+    for family in families:
+        if family in lowered:
+            return family
+    return ""
+
+def requires_calibration(model_name: str) -> bool:
+    """模型是否以靜態量化處理（需要 QUANTIZATION_CALIBRATION_DIR 的校正圖片才量化）"""
+    return bool(_model_family(model_name, STATIC_QUANTIZATION_FAMILIES))
+
+def quantize_dynamic_model(model, model_name: str):
+    """
+    動態量化：Linear 層權重預先轉為 int8，激活在推論時動態量化
+    Args:
+        model: fp32 模型
+        model_name: 模型名稱（決定需保留 fp32 的層）
+    """
+    from torch.ao.quantization import quantize_dynamic, default_dynamic_qconfig
+
+    excludes = DYNAMIC_QUANTIZATION_EXCLUDES.get(_model_family(model_name, DYNAMIC_QUANTIZATION_EXCLUDES), ())
+    qconfig_spec = {
+        name: default_dynamic_qconfig
+        for name, module in model.named_modules()
+        if isinstance(module, nn.Linear) and not name.endswith(excludes)
+    }
+    return quantize_dynamic(copy.deepcopy(model), qconfig_spec, dtype=torch.qint8)
+
+def quantize_static_model(model, calibration_inputs: List, engine: str):
+    """
+    靜態量化（FX graph mode）：以校正資料統計激活範圍，卷積、線性層與激活皆以 int8 運算
+    Args:
+        model: fp32 模型
+        calibration_inputs: 校正用的輸入 tensor 列表
+        engine: 量化運算後端
+    """
+    from torch.ao.quantization import get_default_qconfig_mapping
+    from torch.ao.quantization.quantize_fx import prepare_fx, convert_fx
+
+    prepared = prepare_fx(copy.deepcopy(model), get_default_qconfig_mapping(engine), (calibration_inputs[0],))
+    with torch.no_grad():
+        for calibration_input in calibration_inputs:
+            prepared(calibration_input)
+    return convert_fx(prepared)
+
+def _quantized_bytes(model) -> int:
+    """量化後模型權重的位元組數（包含不在 parameters() 中的 int8 打包權重）"""
+    def tensor_bytes(value):
+        if torch.is_tensor(value):
+            return value.nbytes
+        if isinstance(value, (tuple, list)):
+            return sum(tensor_bytes(item) for item in value)
+        return 0
+    return sum(tensor_bytes(value) for value in model.state_dict().values())
+
+def quantize_model(model, model_name: str, input_size: int, calibration_inputs: List = None):
+    """
+    將 fp32 模型量化為 int8 並轉為凍結的 TorchScript 模組
+    Args:
+        model: fp32 模型
+        model_name: 模型名稱
+        input_size: 模型輸入的邊長（像素）
+        calibration_inputs: 靜態量化的校正輸入（requires_calibration 的模型必須提供）
+    Returns:
+        (量化後的模型, 量化方式 "static" 或 "dynamic")
+    """
+    if requires_calibration(model_name) and not calibration_inputs:
+        raise ValueError(f"模型 {model_name} 需要校正圖片才能靜態量化（QUANTIZATION_CALIBRATION_DIR）")
+
+    engine = select_quantized_engine()
+    model = model.eval()
+
+    quantized, mode = None, "dynamic"
+    if requires_calibration(model_name):
+        try:
+            quantized, mode = quantize_static_model(model, calibration_inputs, engine), "static"
+        except Exception as e:
+            print(f"⚠️ 模型 {model_name} 無法靜態量化，改用動態量化: {e}")
+    if quantized is None:
+        quantized = quantize_dynamic_model(model, model_name)
+
+    example_input = torch.zeros(1, 3, input_size, input_size)
+    with torch.no_grad(), warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        traced = torch.jit.freeze(torch.jit.trace(quantized, example_input).eval())
+    # 凍結後權重成為常數，parameters() 為空，由量化後的權重計算註冊表的記憶體佔用
+    traced.model_bytes = _quantized_bytes(quantized)
+    return traced, mode
+
+class QuantizedModelCache:
+    """
+    量化模型的磁碟快取
+    檔名包含原始檢查點的指紋，檢查點更新後自動重新量化
+    """
+
+    def __init__(self, cache_dir: str):
+        """
+        Args:
+            cache_dir: 量化模型的存放目錄
+        """
+        self.cache_dir = cache_dir
+
+    def path(self, model_name: str, fingerprint: str) -> str:
+        """量化模型檔案的完整路徑"""
+        return os.path.join(self.cache_dir, f"{model_name}.int8.{fingerprint[:12]}.pt")
+
+    def load(self, model_name: str, fingerprint: str):
+        """
+        載入快取的量化模型
+        Returns:
+            量化後的 TorchScript 模組；沒有快取或載入失敗時返回 None
+        """
+        path = self.path(model_name, fingerprint)
+        if not os.path.exists(path):
+            return None
+        try:
+            select_quantized_engine()
+            extra_files = {_MODE_EXTRA_FILE: ""}
+            with warnings.catch_warnings():
+                warnings.simplefilter("ignore")
+                model = torch.jit.load(path, map_location="cpu", _extra_files=extra_files)
+            mode = extra_files[_MODE_EXTRA_FILE]
+            mode = mode.decode() if isinstance(mode, bytes) else mode
+            # 凍結的模組沒有可計算的參數，以快取檔案大小作為註冊表的記憶體佔用
+            model.model_bytes = os.path.getsize(path)
+            print(f"✅ 由快取載入 int8 量化模型 {model_name} ({mode} 量化)")
+            return model
+        except Exception as e:
+            print(f"⚠️ 量化模型快取 {path} 載入失敗，將重新量化: {e}")
+            return None
+
+    def save(self, model_name: str, fingerprint: str, model, mode: str):
+        """寫入量化模型快取，並移除同一模型舊指紋的快取檔案"""
+        os.makedirs(self.cache_dir, exist_ok=True)
+        path = self.path(model_name, fingerprint)
+        for stale_path in glob.glob(os.path.join(self.cache_dir, f"{model_name}.int8.*.pt")):
+            if stale_path != path:
+                os.remove(stale_path)
+
+        temp_path = path + ".tmp"
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            torch.jit.save(model, temp_path, _extra_files={_MODE_EXTRA_FILE: mode})
+        os.replace(temp_path, path)
+        print(f"📦 已快取 int8 量化模型 {model_name} ({mode} 量化) -> {path}")
+
+def _time_forward(model, input_tensor, repeats: int) -> float:
+    """模型單次推論的平均耗時（毫秒），先執行一次暖機"""
+    with torch.no_grad():
+        model(input_tensor)
+        start_time = time.perf_counter()
+        for _ in range(repeats):
+            model(input_tensor)
+    return (time.perf_counter() - start_time) / repeats * 1000
+
+def build_quantization_report(model_names=None, image_dir: str = "assets/images", repeats: int = 3) -> List[Dict]:
+    """
+    以樣本圖片比較 fp32 與 int8 量化模型的準確度與延遲
+    沒有校正圖片時，需要靜態量化的模型不量化（int8 後端以 fp32 推論），報告列出略過的原因；
+    圖片檔名（如 Corn.jpg）對應訓練標籤時計入準確度；與 fp32 的 top-1 一致率則使用全部圖片；
+    內容與校正圖片相同的樣本圖片不列入評估，避免以校正資料評估而高估 int8 的一致率
+    Args:
+        model_names: 要比較的模型名稱列表，若為 None 則比較所有多模型辨識使用的模型
+        image_dir: 樣本圖片目錄
+        repeats: 每張圖片量測延遲的重複次數
+    Returns:
+        每個模型一筆比較結果的列表
+    """
+    # 延遲導入，避免與 food_recognition 循環導入
+    from PIL import Image
+    from food_catalog import normalize_name
+    from model_store import file_sha256
+    from food_recognition import (ENSEMBLE_MODELS, TRAINING_LABELS, get_model_input_size, get_calibration_image_paths,
+                                  load_calibration_inputs, preprocess_image, _load_model_from_checkpoint)
+
+    label_indices = {normalize_name(label): idx for idx, label in enumerate(TRAINING_LABELS)}
+    calibration_hashes = {file_sha256(path) for path in get_calibration_image_paths()}
+    image_paths = sorted(glob.glob(os.path.join(image_dir, "*.jpg")))
+    excluded_count = len(image_paths)
+    image_paths = [path for path in image_paths if file_sha256(path) not in calibration_hashes]
+    excluded_count -= len(image_paths)
+    if excluded_count:
+        print(f"ℹ️ 已排除 {excluded_count} 張與校正圖片相同的樣本圖片，評估 {len(image_paths)} 張")
+    if not image_paths:
+        raise ValueError(f"{image_dir} 中沒有可評估的樣本圖片（校正圖片不列入評估）")
+    images = [(Image.open(path).convert("RGB"), label_indices.get(normalize_name(os.path.splitext(os.path.basename(path))[0])))
+              for path in image_paths]
+    labeled_count = sum(1 for _, label_idx in images if label_idx is not None)
+
+    report = []
+    for model_name in model_names or ENSEMBLE_MODELS:
+        calibration_inputs = load_calibration_inputs(model_name)
+        if requires_calibration(model_name) and not calibration_inputs:
+            report.append({"模型": model_name, "量化方式": "略過",
+                           "說明": "沒有校正圖片（QUANTIZATION_CALIBRATION_DIR），int8 後端以 fp32 推論"})
+            continue
+
+        model = _load_model_from_checkpoint(model_name)
+        if model is None:
+            report.append({"模型": model_name, "錯誤": "模型無法載入"})
+            continue
+        model = model.float().eval()
+
+        quantized, mode = quantize_model(model, model_name, get_model_input_size(model_name), calibration_inputs)
+
+        fp32_ms, int8_ms = [], []
+        fp32_correct, int8_correct, agreement = 0, 0, 0
+        for image, label_idx in images:
+            input_tensor = preprocess_image(image, model_name)
+            with torch.no_grad():
+                fp32_pred = int(model(input_tensor).argmax())
+                int8_pred = int(quantized(input_tensor).argmax())
+            fp32_ms.append(_time_forward(model, input_tensor, repeats))
+            int8_ms.append(_time_forward(quantized, input_tensor, repeats))
+
+            agreement += int(fp32_pred == int8_pred)
+            if label_idx is not None:
+                fp32_correct += int(fp32_pred == label_idx)
+                int8_correct += int(int8_pred == label_idx)
+
+        fp32_latency = sum(fp32_ms) / len(fp32_ms)
+        int8_latency = sum(int8_ms) / len(int8_ms)
+        report.append({
+            "模型": model_name,
+            "量化方式": mode,
+            "fp32 準確度": f"{fp32_correct}/{labeled_count}",
+            "int8 準確度": f"{int8_correct}/{labeled_count}",
+            "top-1 一致率": f"{agreement}/{len(images)}",
+            "評估圖片": f"{len(images)} 張（已排除 {excluded_count} 張校正圖片）",
+            "fp32 延遲": f"{fp32_latency:.1f} ms",
+            "int8 延遲": f"{int8_latency:.1f} ms",
+            "加速": f"{fp32_latency / int8_latency:.2f}x"
+        })
+    return report
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description='比較 fp32 與 int8 量化模型在樣本圖片上的準確度與延遲')
+    parser.add_argument('models', nargs='*', help='要比較的模型名稱，預設為多模型辨識使用的所有模型')
+    parser.add_argument('--image_dir', default='assets/images', help='樣本圖片目錄')
+    parser.add_argument('--repeats', type=int, default=3, help='每張圖片量測延遲的重複次數')
+    args = parser.parse_args()
+
+    for row in build_quantization_report(args.models or None, args.image_dir, args.repeats):
+        print(" | ".join(f"{key}: {value}" for key, value in row.items()))
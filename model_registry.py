@@ -0,0 +1,186 @@
+# model_registry.py - 模型註冊表模組
+# 以記憶體預算管理常駐模型，超出預算時釋放最久未使用的模型
+import itertools
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional
+
+def measure_model_bytes(model) -> int:
+    """
+    計算模型參數與緩衝區實際佔用的記憶體（位元組）
+    Args:
+        model: PyTorch 模型（nn.Module）
+    """
+    # 自行提供佔用大小的模型：ONNX Runtime 模型，以及權重已內嵌為常數、沒有參數可計算的
+    # 凍結 TorchScript 模組（如 int8 量化模型，由量化時的權重或快取檔案大小得到）
+    model_bytes = getattr(model, "model_bytes", None)
+    if model_bytes is not None:
+        return model_bytes
+    if not hasattr(model, "parameters"):
+        return 0
+    
+    return sum(tensor.nbytes for tensor in itertools.chain(model.parameters(), model.buffers()))
+
+class ModelRegistry:
+    """
+    具記憶體預算的模型註冊表
+    以 LRU 順序保存已載入的模型，新模型載入超出預算時釋放最久未使用且未固定的模型；
+    載入失敗的模型記錄失敗原因，並以指數退避決定何時才允許再次嘗試載入
+    """
+
+    def __init__(self, budget_bytes: int = 0, pinned_models=None,
+                 retry_backoff: float = 60.0, max_retry_backoff: float = 3600.0):
+        """
+        Args:
+            budget_bytes: 常駐模型的記憶體預算（位元組），0 表示不限制
+            pinned_models: 不會被釋放的模型名稱列表
+            retry_backoff: 首次載入失敗後等待再次嘗試的秒數，之後每次失敗加倍
+            max_retry_backoff: 重試等待秒數的上限
+        """
+        self.budget_bytes = budget_bytes
+        self.pinned_models = set(pinned_models or [])
+        self.retry_backoff = retry_backoff
+        self.max_retry_backoff = max_retry_backoff
+        self._models = OrderedDict()
+        self._model_bytes = {}
+        self._failures = {}
+        self._lock = threading.RLock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.failed_loads = 0
+        self.skipped_loads = 0
+
+    def __contains__(self, model_name: str) -> bool:
+        with self._lock:
+            return model_name in self._models
+
+    def get(self, model_name: str, record_stats: bool = True):
+        """
+        取得已載入的模型並標記為最近使用，未載入時返回 None
+        Args:
+            model_name: 模型名稱
+            record_stats: 是否計入命中與未命中次數（同一次請求的重複檢查不重複計數）
+        """
+        with self._lock:
+            model = self._models.get(model_name)
+            if model is None:
+                if record_stats:
+                    self.misses += 1
+                return None
+            self._models.move_to_end(model_name)
+            if record_stats:
+                self.hits += 1
+            return model
+
+    def put(self, model_name: str, model):
+        """
+        加入新載入的模型，必要時依 LRU 順序釋放其他模型以符合記憶體預算
+        Args:
+            model_name: 模型名稱
+            model: 已載入的模型
+        """
+        model_bytes = measure_model_bytes(model)
+
+        with self._lock:
+            if model_name in self._models:
+                self._models.move_to_end(model_name)
+                return
+
+            if self.budget_bytes > 0:
+                self._evict_until_fits(model_bytes)
+                if self.resident_bytes() + model_bytes > self.budget_bytes:
+                    print(f"⚠️ 模型 {model_name} ({model_bytes / 1024**2:.0f} MB) 超出記憶體預算，仍保留以完成辨識")
+
+            self._models[model_name] = model
+            self._model_bytes[model_name] = model_bytes
+            # 載入成功即清除先前的失敗記錄
+            self._failures.pop(model_name, None)
+
+        print(f"📥 模型 {model_name} 已加入註冊表 ({model_bytes / 1024**2:.0f} MB，"
+              f"常駐 {self.resident_bytes() / 1024**2:.0f} MB)")
+
+    def _evict_until_fits(self, incoming_bytes: int):
+        """依 LRU 順序釋放未固定的模型，直到可容納新模型或已無可釋放的模型"""
+        for candidate in list(self._models.keys()):
+            if self.resident_bytes() + incoming_bytes <= self.budget_bytes:
+                break
+            # 以「模型名稱@後端」為鍵的模型，依模型名稱判斷是否固定
+            if candidate.partition("@")[0] in self.pinned_models:
+                continue
+            self.evict(candidate)
+
+    def evict(self, model_name: str) -> bool:
+        """釋放指定模型，返回是否確實釋放"""
+        with self._lock:
+            if model_name not in self._models:
+                return False
+            del self._models[model_name]
+            freed_bytes = self._model_bytes.pop(model_name, 0)
+            self.evictions += 1
+        print(f"📤 釋放模型 {model_name} ({freed_bytes / 1024**2:.0f} MB)")
+        return True
+
+    def record_failure(self, model_name: str, reason: str) -> Dict:
+        """
+        記錄模型載入失敗，連續失敗時重試等待時間加倍
+        Args:
+            model_name: 模型名稱
+            reason: 失敗原因
+        Returns:
+            失敗記錄（原因、失敗次數、可再次嘗試的時間）
+        """
+        with self._lock:
+            previous = self._failures.get(model_name)
+            attempts = previous["attempts"] + 1 if previous else 1
+            backoff = min(self.retry_backoff * 2 ** (attempts - 1), self.max_retry_backoff)
+            failure = {
+                "reason": reason,
+                "attempts": attempts,
+                "failed_at": time.time(),
+                "retry_at": time.time() + backoff
+            }
+            self._failures[model_name] = failure
+            self.failed_loads += 1
+
+        print(f"🚫 模型 {model_name} 載入失敗（第 {attempts} 次），{backoff:.0f} 秒內不再嘗試: {reason}")
+        return dict(failure)
+
+    def get_failure(self, model_name: str) -> Optional[Dict]:
+        """
+        取得仍在重試等待期間的失敗記錄；未失敗或等待期已過（允許重試）時返回 None
+        Args:
+            model_name: 模型名稱
+        """
+        with self._lock:
+            failure = self._failures.get(model_name)
+            if failure is None or time.time() >= failure["retry_at"]:
+                return None
+            self.skipped_loads += 1
+            return dict(failure)
+
+    def failures(self) -> Dict:
+        """所有模型的失敗記錄（含已過等待期、下次使用時將重試者）"""
+        with self._lock:
+            return {name: dict(failure) for name, failure in self._failures.items()}
+
+    def resident_bytes(self) -> int:
+        """目前常駐模型佔用的記憶體（位元組）"""
+        with self._lock:
+            return sum(self._model_bytes.values())
+
+    def stats(self) -> Dict:
+        """註冊表的命中、未命中、釋放次數與記憶體使用情況"""
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "failed_loads": self.failed_loads,
+                "skipped_loads": self.skipped_loads,
+                "failed_models": list(self._failures.keys()),
+                "resident_models": list(self._models.keys()),
+                "resident_mb": round(self.resident_bytes() / 1024**2, 1),
+                "budget_mb": round(self.budget_bytes / 1024**2, 1) if self.budget_bytes > 0 else None
+            }
@@ -0,0 +1,346 @@
+# model_store.py - 模型檢查點存放區模組
+# 將原始 .pth 檢查點一次轉換為已清理的標準格式並記錄於 manifest，之後依 manifest 直接建立架構與載入權重；
+# 權重以記憶體映射載入，同一主機上的多個程序經由作業系統頁面快取共用同一份權重
+import os
+import json
+import time
+import hashlib
+from typing import Dict, Optional
+
+# manifest 檔名，與標準化檢查點存放於同一目錄
+MANIFEST_FILENAME = "manifest.json"
+
+# 標準化檢查點可使用的儲存精度
+STORAGE_DTYPES = ("fp32", "fp16", "bf16")
+
+# food_recognition 專用載入函數使用的 torchvision 架構：模型類別名稱 -> (架構名稱, 分類層路徑)
+TORCHVISION_ARCHITECTURES = {
+    "ConvNeXt": ("convnext_base", "classifier.2"),
+    "EfficientNet": ("efficientnet_b5", "classifier.1"),
+    "VGG": ("vgg16", "classifier.6"),
+}
+
+def file_sha256(path: str, chunk_size: int = 1024 * 1024) -> str:
+    """計算檔案的 SHA-256 雜湊值"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        for chunk in iter(lambda: file.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def _torch_dtype(dtype_name: str):
+    """將 "fp32"/"fp16"/"bf16" 轉換為對應的 torch dtype"""
+    import torch
+    return {"fp32": torch.float32, "fp16": torch.float16, "bf16": torch.bfloat16}[dtype_name]
+
+def bf16_supported(device=None) -> bool:
+    """目前設備是否支援原生 bfloat16 運算（CPU 需 AVX512-BF16 或 AMX）"""
+    import torch
+
+    if device is not None and torch.device(device).type == "cuda":
+        return torch.cuda.is_bf16_supported()
+    try:
+        return bool(torch.ops.mkldnn._is_mkldnn_bf16_supported())
+    except (AttributeError, RuntimeError):
+        return False
+
+def describe_architecture(model) -> Dict:
+    """
+    從已載入的模型取得可重建架構的描述
+    Args:
+        model: 以原始檢查點載入完成的模型
+    Returns:
+        {"library": "timm" 或 "torchvision", "name": 架構名稱, "classifier": 分類層路徑（僅 torchvision）}
+    """
+    pretrained_cfg = getattr(model, "pretrained_cfg", None)
+    if pretrained_cfg and pretrained_cfg.get("architecture"):
+        return {"library": "timm", "name": pretrained_cfg["architecture"]}
+
+    class_name = type(model).__name__
+    if class_name in TORCHVISION_ARCHITECTURES:
+        name, classifier = TORCHVISION_ARCHITECTURES[class_name]
+        return {"library": "torchvision", "name": name, "classifier": classifier}
+
+    raise ValueError(f"無法描述模型架構: {class_name}")
+
+def build_architecture(architecture: Dict, num_classes: int):
+    """
+    依 manifest 的架構描述建立未載入權重的模型
+    Args:
+        architecture: describe_architecture 返回的架構描述
+        num_classes: 分類數量
+    """
+    if architecture["library"] == "timm":
+        import timm
+        return timm.create_model(architecture["name"], pretrained=False, num_classes=num_classes)
+
+    import torch.nn as nn
+    from torchvision import models
+
+    model = getattr(models, architecture["name"])(weights=None)
+
+    # 修改分類器的最後一層以匹配類別數
+    parent_name, index = architecture["classifier"].rsplit(".", 1)
+    parent = model.get_submodule(parent_name)
+    parent[int(index)] = nn.Linear(parent[int(index)].in_features, num_classes)
+    return model
+
+class ModelStore:
+    """
+    標準化檢查點存放區
+    每個模型一個已清理鍵名、與架構完全對應的 state_dict 檔案，並由 manifest 記錄架構、
+    類別數、輸入尺寸、儲存精度、檔案雜湊與參數量
+    """
+
+    def __init__(self, store_dir: str, source_dir: str = "./model", mmap: bool = True,
+                 compute_dtype: str = "fp32"):
+        """
+        Args:
+            store_dir: 標準化檢查點與 manifest 的存放目錄
+            source_dir: 原始 .pth 檢查點所在目錄
+            mmap: 是否以記憶體映射載入權重（模型參數直接指向映射的檔案內容，不複製）
+            compute_dtype: 推論精度，"fp32" 將半精度權重轉回 fp32；"bf16" 在設備支援時
+                直接以 bf16 權重推論（其他情況仍轉回 fp32）
+        """
+        self.store_dir = store_dir
+        self.source_dir = source_dir
+        self.mmap = mmap
+        self.compute_dtype = compute_dtype
+        self.manifest_path = os.path.join(store_dir, MANIFEST_FILENAME)
+        self.manifest = self._read_manifest()
+
+    def _read_manifest(self) -> Dict:
+        """讀取 manifest，不存在或格式錯誤時返回空的 manifest"""
+        if not os.path.exists(self.manifest_path):
+            return {"models": {}}
+        try:
+            with open(self.manifest_path, "r", encoding="utf-8") as file:
+                manifest = json.load(file)
+            manifest.setdefault("models", {})
+            return manifest
+        except (OSError, ValueError) as e:
+            print(f"⚠️ 無法讀取模型 manifest {self.manifest_path}: {e}")
+            return {"models": {}}
+
+    def _write_manifest(self):
+        """寫入 manifest（先寫入暫存檔再取代，避免讀到寫到一半的檔案）"""
+        os.makedirs(self.store_dir, exist_ok=True)
+        temp_path = self.manifest_path + ".tmp"
+        with open(temp_path, "w", encoding="utf-8") as file:
+            json.dump(self.manifest, file, ensure_ascii=False, indent=2)
+        os.replace(temp_path, self.manifest_path)
+
+    def source_path(self, model_name: str) -> str:
+        """原始檢查點的預設路徑"""
+        return os.path.join(self.source_dir, f"{model_name}.pth")
+
+    def checkpoint_path(self, entry: Dict) -> str:
+        """manifest 記錄中標準化檢查點的完整路徑"""
+        return os.path.join(self.store_dir, entry["file"])
+
+    def entry(self, model_name: str) -> Optional[Dict]:
+        """
+        取得模型可用的 manifest 記錄
+        標準化檔案不存在或大小不符、或原始檢查點在轉換後被更新時返回 None
+        Args:
+            model_name: 模型名稱
+        """
+        entry = self.manifest["models"].get(model_name)
+        if entry is None:
+            return None
+
+        checkpoint_path = self.checkpoint_path(entry)
+        if not os.path.exists(checkpoint_path) or os.path.getsize(checkpoint_path) != entry["file_size"]:
+            return None
+
+        # 只部署標準化檢查點（沒有原始 .pth）時直接使用；原始檔存在但已更新則需重新轉換
+        source_path = self.source_path(model_name)
+        if os.path.exists(source_path):
+            source_stat = os.stat(source_path)
+            if (source_stat.st_size != entry["source"]["size"]
+                    or int(source_stat.st_mtime) != entry["source"]["mtime"]):
+                print(f"⚠️ 原始檢查點 {source_path} 已在轉換後更新，請重新執行 python3 model_store.py")
+                return None
+
+        return entry
+
+    def fingerprint(self, model_name: str) -> Optional[str]:
+        """
+        模型權重的指紋，供量化、匯出等衍生檔案的快取判斷是否過期
+        有可用的 manifest 記錄時為標準化檢查點的 SHA-256，否則由原始檢查點的大小與修改時間計算
+        Returns:
+            指紋字串；標準化與原始檢查點皆不存在時返回 None
+        """
+        entry = self.entry(model_name)
+        if entry is not None:
+            return entry["sha256"]
+
+        source_path = self.source_path(model_name)
+        if not os.path.exists(source_path):
+            return None
+        source_stat = os.stat(source_path)
+        return hashlib.sha256(f"{model_name}:{source_stat.st_size}:{int(source_stat.st_mtime)}".encode()).hexdigest()
+
+    def load(self, model_name: str, device=None):
+        """
+        依 manifest 建立架構並以 strict 模式載入標準化權重
+        Args:
+            model_name: 模型名稱
+            device: 模型放置的設備，若為 None 則使用 CPU
+        Returns:
+            載入完成並設為 eval 模式的模型；沒有可用記錄或載入失敗時返回 None
+        """
+        entry = self.entry(model_name)
+        if entry is None:
+            return None
+
+        import torch
+
+        try:
+            start_time = time.time()
+            if self.mmap:
+                model = self._load_mapped(entry)
+            else:
+                model = build_architecture(entry["architecture"], entry["num_classes"])
+                state_dict = torch.load(self.checkpoint_path(entry), map_location="cpu", weights_only=True)
+                # 權重直接指派，精度與檔案中的儲存精度一致
+                model.load_state_dict(state_dict, strict=True, assign=True)
+            if device is not None:
+                model = model.to(device)
+            
+            # 半精度儲存的權重：設備支援且設定 bf16 推論時維持 bf16，否則轉回 fp32 推論
+            storage_dtype = entry.get("dtype", "fp32")
+            mapped = self.mmap and (device is None or torch.device(device).type == "cpu")
+            if storage_dtype != "fp32":
+                if storage_dtype == "bf16" and self.compute_dtype == "bf16" and bf16_supported(device):
+                    compute_text = "bf16 推論"
+                else:
+                    model = model.float()
+                    compute_text = "轉回 fp32 推論"
+                    if mapped:
+                        # 轉換精度會將所有權重複製到程序私有記憶體，多個程序不再共用頁面快取中的權重
+                        print(f"⚠️ {model_name} 以 {storage_dtype} 儲存但以 fp32 推論，轉換精度時複製權重，"
+                              f"記憶體映射的共用失效；請以 fp32 儲存，或以 bf16 儲存並設定 MODEL_COMPUTE_DTYPE=bf16")
+                        mapped = False
+            else:
+                compute_text = "fp32 推論"
+            
+            model.eval()
+            mode_text = "記憶體映射" if mapped else "完整讀取" if not self.mmap else "記憶體映射後複製"
+            print(f"✅ 由標準化檢查點載入 {model_name} ({entry['architecture']['name']}，{mode_text}，"
+                  f"{storage_dtype} 儲存、{compute_text}，耗時 {time.time() - start_time:.1f} 秒)")
+            return model
+        except Exception as e:
+            print(f"⚠️ 標準化檢查點 {model_name} 載入失敗，改用原始檢查點: {e}")
+            return None
+
+    def _load_mapped(self, entry: Dict):
+        """
+        以記憶體映射載入權重並直接指派給模型參數（assign），權重頁面由作業系統按需載入
+        架構先建立在 meta 設備上以略過隨機初始化；含有不存於 state_dict 的緩衝區
+        （如 Swin 的相對位置索引）的架構則改在 CPU 上建立
+        """
+        import torch
+
+        state_dict = torch.load(self.checkpoint_path(entry), map_location="cpu", weights_only=True, mmap=True)
+
+        with torch.device("meta"):
+            model = build_architecture(entry["architecture"], entry["num_classes"])
+        model.load_state_dict(state_dict, strict=True, assign=True)
+
+        if any(tensor.is_meta for tensor in list(model.parameters()) + list(model.buffers())):
+            model = build_architecture(entry["architecture"], entry["num_classes"])
+            model.load_state_dict(state_dict, strict=True, assign=True)
+        return model
+
+    def convert(self, model_name: str, model, input_size: int, dtype: str = "fp32") -> Dict:
+        """
+        將已載入的模型寫入標準化檢查點並更新 manifest
+        Args:
+            model_name: 模型名稱
+            model: 以原始檢查點載入完成的模型
+            input_size: 模型輸入的邊長（像素）
+            dtype: 儲存精度（"fp32"、"fp16" 或 "bf16"），半精度可使檔案與讀取量減半
+        Returns:
+            寫入 manifest 的記錄
+        """
+        import torch
+
+        if dtype not in STORAGE_DTYPES:
+            raise ValueError(f"不支援的儲存精度: {dtype}")
+        if self.mmap and dtype != "fp32" and not (dtype == "bf16" and self.compute_dtype == "bf16"):
+            print(f"⚠️ {dtype} 儲存的權重載入時需轉回 {self.compute_dtype} 並複製，記憶體映射的共用將失效；"
+                  f"記憶體映射時請以 fp32 儲存，或以 bf16 儲存並設定 MODEL_COMPUTE_DTYPE=bf16")
+
+        architecture = describe_architecture(model)
+        num_classes = _infer_num_classes(model)
+
+        # 只轉換浮點權重，整數緩衝區（如 BatchNorm 的 num_batches_tracked）維持原型別
+        storage_dtype = _torch_dtype(dtype)
+        state_dict = {}
+        for key, value in model.state_dict().items():
+            value = value.detach().cpu()
+            if value.is_floating_point():
+                value = value.to(storage_dtype)
+            state_dict[key] = value.contiguous()
+
+        os.makedirs(self.store_dir, exist_ok=True)
+        file_name = f"{model_name}.pt"
+        checkpoint_path = os.path.join(self.store_dir, file_name)
+        # 先寫入暫存檔再取代：執行中的程序若正映射舊檔案，仍保有舊內容而不會讀到寫到一半的檔案
+        temp_path = checkpoint_path + ".tmp"
+        torch.save(state_dict, temp_path)
+        os.replace(temp_path, checkpoint_path)
+
+        source_stat = os.stat(self.source_path(model_name))
+        entry = {
+            "architecture": architecture,
+            "num_classes": num_classes,
+            "input_size": input_size,
+            "dtype": dtype,
+            "file": file_name,
+            "file_size": os.path.getsize(checkpoint_path),
+            "sha256": file_sha256(checkpoint_path),
+            "num_params": sum(parameter.numel() for parameter in model.parameters()),
+            "source": {
+                "file": os.path.basename(self.source_path(model_name)),
+                "size": source_stat.st_size,
+                "mtime": int(source_stat.st_mtime)
+            },
+            "converted_at": time.strftime("%Y-%m-%d %H:%M:%S")
+        }
+        self.manifest["models"][model_name] = entry
+        self._write_manifest()
+
+        print(f"📦 已轉換 {model_name}: {architecture['name']}，{num_classes} 類，"
+              f"{entry['num_params'] / 1e6:.1f}M 參數，{dtype} 儲存 -> {checkpoint_path}")
+        return entry
+
+def _infer_num_classes(model) -> int:
+    """取得模型分類層的輸出類別數"""
+    num_classes = getattr(model, "num_classes", None)
+    if num_classes:
+        return int(num_classes)
+
+    # torchvision 模型沒有 num_classes 屬性，取最後一個線性層的輸出數
+    import torch.nn as nn
+    linear_layers = [module for module in model.modules() if isinstance(module, nn.Linear)]
+    return int(linear_layers[-1].out_features)
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description='將 ./model 下的原始檢查點轉換為標準化檢查點與 manifest')
+    parser.add_argument('models', nargs='*', help='要轉換的模型名稱，預設為多模型辨識使用的所有模型')
+    parser.add_argument('--dtype', choices=STORAGE_DTYPES, default='fp32',
+                        help='標準化檢查點的儲存精度；fp16/bf16 可使檔案大小減半，但除了 bf16 儲存且以 bf16 推論外，'
+                             '載入時都需轉回 fp32 而複製權重，記憶體映射無法共用')
+    args = parser.parse_args()
+
+    # 延遲導入，轉換時沿用 food_recognition 原本的檢查點推測與載入流程
+    from food_recognition import convert_model_checkpoints
+
+    results = convert_model_checkpoints(args.models or None, dtype=args.dtype)
+    failed = [name for name, result in results.items() if isinstance(result, str)]
+    print(f"轉換完成：成功 {len(results) - len(failed)} 個，失敗 {len(failed)} 個")
+    for name in failed:
+        print(f"❌ {name}: {results[name]}")
@@ -0,0 +1,269 @@
+# model_workers.py - 模型工作程序模組
+# 每個工作程序長駐載入一組模型，輸入 tensor 透過共享記憶體傳遞，只回傳 logits
+import os
+import queue
+import threading
+import itertools
+import time
+import torch
+import torch.multiprocessing as mp
+
+# 沒有指定輸入尺寸的模型使用的共享緩衝區尺寸
+DEFAULT_INPUT_SIZE = 224
+
+def _input_dtype(model):
+    """模型權重的精度，共享緩衝區的 fp32 輸入需轉換為相同精度"""
+    parameter = next(model.parameters(), None) if hasattr(model, "parameters") else None
+    if parameter is None or not parameter.is_floating_point():
+        return torch.float32
+    return parameter.dtype
+
+def _worker_main(model_names, input_buffers, request_queue, response_queue, cpu_cores, num_threads,
+                 load_model=None):
+    """
+    工作程序主迴圈：載入指定模型後，持續處理推論請求
+    Args:
+        model_names: 此程序負責的模型名稱列表
+        input_buffers: 以輸入尺寸為鍵的共享記憶體輸入 tensor [max_rows, 3, H, W]
+        request_queue: 接收 (請求編號, 模型名稱, 後端, 輸入尺寸, 列數) 的佇列，收到 None 時結束
+        response_queue: 回傳 (請求編號, logits, 錯誤信息) 的佇列
+        cpu_cores: 綁定的 CPU 核心列表，None 表示不綁定
+        num_threads: 此程序使用的 torch intra-op 執行緒數
+        load_model: 載入函數，參數為 (模型名稱, backend=後端)，若為 None 則使用 food_recognition.load_model
+    """
+    if cpu_cores and hasattr(os, "sched_setaffinity"):
+        os.sched_setaffinity(0, cpu_cores)
+    torch.set_num_threads(num_threads)
+
+    if load_model is None:
+        # 延遲導入，避免與 food_recognition 循環導入
+        from food_recognition import load_model
+
+    # 啟動時以預設後端載入所有模型，回報各模型是否載入成功
+    ready = {model_name: load_model(model_name, backend=None) is not None for model_name in model_names}
+    response_queue.put(("ready", ready, None))
+
+    while True:
+        request = request_queue.get()
+        if request is None:
+            break
+
+        request_id, model_name, backend, input_size, rows = request
+        try:
+            # 其他後端的模型在第一次請求時載入，之後由載入函數的快取（模型註冊表）取得
+            model = load_model(model_name, backend=backend) if model_name in ready else None
+            if model is None:
+                response_queue.put((request_id, None, f"模型 {model_name}（{backend}）未在工作程序中載入"))
+                continue
+
+            with torch.inference_mode():
+                outputs = model(input_buffers[input_size][:rows].to(_input_dtype(model)))
+            # 只回傳 logits（小型 numpy 陣列），不回傳模型或輸入
+            response_queue.put((request_id, outputs.float().cpu().numpy(), None))
+        except Exception as e:
+            response_queue.put((request_id, None, str(e)))
+
+class _ModelWorker:
+    """單一工作程序及其共享輸入緩衝區與通訊佇列"""
+
+    def __init__(self, context, model_names, input_sizes, max_rows, cpu_cores, num_threads, load_model=None):
+        self.model_names = list(model_names)
+        self.cpu_cores = cpu_cores
+        self.max_rows = max(1, max_rows)
+        self.lock = threading.Lock()
+        self.ready_models = None
+
+        # 共享記憶體輸入緩衝區：此程序各模型的每種輸入尺寸一個，可容納 max_rows 列，
+        # 每次請求只覆寫內容，不經過 pickle
+        self.input_buffers = {
+            size: torch.zeros(self.max_rows, 3, size, size).share_memory_()
+            for size in sorted(set(input_sizes))
+        }
+        self.request_queue = context.Queue()
+        self.response_queue = context.Queue()
+        self.process = context.Process(
+            target=_worker_main,
+            args=(self.model_names, self.input_buffers, self.request_queue,
+                  self.response_queue, cpu_cores, num_threads, load_model),
+            daemon=True
+        )
+
+    def wait_ready(self, timeout: float) -> bool:
+        """
+        等待工作程序回報模型載入結果
+        Returns:
+            在時間內收到回報時返回 True（結果記錄於 ready_models）
+        """
+        deadline = time.monotonic() + timeout
+        with self.lock:
+            # 分段等待，工作程序啟動失敗而結束時不必等到逾時
+            while self.ready_models is None and time.monotonic() < deadline:
+                try:
+                    response_id, ready_models, _ = self.response_queue.get(
+                        timeout=min(1.0, max(0.0, deadline - time.monotonic())))
+                except queue.Empty:
+                    if not self.process.is_alive():
+                        return False
+                    continue
+                if response_id == "ready":
+                    self.ready_models = ready_models
+            return self.ready_models is not None
+
+    def forward(self, request_id, model_name, backend, input_tensor, timeout):
+        """
+        將輸入寫入共享緩衝區並等待工作程序回傳 logits
+        超過緩衝區列數的輸入（如較多的餐盤區塊）分段送出後合併結果
+        """
+        input_size = input_tensor.shape[-1]
+        if input_size not in self.input_buffers:
+            raise ValueError(f"工作程序不支援輸入尺寸: {input_size}（支援 {sorted(self.input_buffers)}）")
+
+        outputs = []
+        # 每個工作程序同時只處理一個請求，共享緩衝區不會被覆寫
+        with self.lock:
+            for chunk in input_tensor.split(self.max_rows):
+                rows = chunk.shape[0]
+                self.input_buffers[input_size][:rows].copy_(chunk)
+                self.request_queue.put((request_id, model_name, backend, input_size, rows))
+
+                while True:
+                    response_id, logits, error = self.response_queue.get(timeout=timeout)
+                    if response_id == "ready":
+                        # 啟動時未在等待時間內回報的工作程序，之後才收到載入結果
+                        self.ready_models = logits
+                        continue
+                    if response_id == request_id:
+                        break
+
+                if error is not None:
+                    raise RuntimeError(error)
+                outputs.append(torch.from_numpy(logits))
+
+        return outputs[0] if len(outputs) == 1 else torch.cat(outputs)
+
+class RemoteModel:
+    """由工作程序以指定後端執行推論的模型代理，呼叫方式與本地模型相同"""
+
+    def __init__(self, pool, model_name: str, backend: str = None):
+        self.pool = pool
+        self.model_name = model_name
+        self.backend = backend
+
+    def __call__(self, input_tensor):
+        return self.pool.forward(self.model_name, input_tensor, self.backend)
+
+class ModelWorkerPool:
+    """
+    長駐模型工作程序池
+    每組模型由一個獨立程序載入與推論，脫離主程序的 GIL 與 Gradio 事件迴圈
+    """
+
+    def __init__(self, model_groups, pin_cores: bool = False, timeout: float = 120.0, input_sizes=None,
+                 max_rows: int = 1, load_model=None):
+        """
+        Args:
+            model_groups: 模型分組列表，每組由一個工作程序負責
+            pin_cores: 是否將各工作程序綁定到專屬的 CPU 核心
+            timeout: 等待工作程序載入模型與回應推論的秒數
+            input_sizes: 模型名稱 -> 輸入邊長的字典（如 manifest 記錄的 input_size），
+                         決定各工作程序共享緩衝區的尺寸；未列出的模型使用 DEFAULT_INPUT_SIZE
+            max_rows: 共享緩衝區的列數（測試時增強、餐盤區塊等多列輸入一次送出的上限）
+            load_model: 工作程序內的載入函數（需可由子程序導入），若為 None 則使用 food_recognition.load_model
+        """
+        self.timeout = timeout
+        self._request_ids = itertools.count()
+        self._model_to_worker = {}
+        self._remote_models = {}
+        self.workers = []
+        input_sizes = input_sizes or {}
+
+        context = mp.get_context("spawn")
+        core_groups = self._split_cores(len(model_groups)) if pin_cores else [None] * len(model_groups)
+        total_threads = torch.get_num_threads()
+
+        for model_names, cpu_cores in zip(model_groups, core_groups):
+            if cpu_cores:
+                num_threads = len(cpu_cores)
+            else:
+                num_threads = max(1, total_threads // len(model_groups))
+            group_sizes = [input_sizes.get(model_name, DEFAULT_INPUT_SIZE) for model_name in model_names]
+            worker = _ModelWorker(context, model_names, group_sizes, max_rows, cpu_cores, num_threads, load_model)
+            self.workers.append(worker)
+            for model_name in model_names:
+                self._model_to_worker[model_name] = worker
+
+    @staticmethod
+    def _split_cores(num_groups: int):
+        """將可用 CPU 核心平均切分給各工作程序"""
+        if not hasattr(os, "sched_getaffinity"):
+            return [None] * num_groups
+
+        cores = sorted(os.sched_getaffinity(0))
+        if len(cores) < num_groups:
+            # 核心不足以切分時不綁定
+            return [None] * num_groups
+
+        per_group = len(cores) // num_groups
+        return [cores[i * per_group:(i + 1) * per_group] for i in range(num_groups)]
+
+    def start(self, wait: bool = True):
+        """
+        啟動所有工作程序
+        Args:
+            wait: 是否等待各工作程序回報模型載入結果（最多 timeout 秒）；
+                  載入失敗的模型不再由工作程序負責，改回主程序處理
+        """
+        for worker in self.workers:
+            worker.process.start()
+            cores_text = f"，綁定核心 {worker.cpu_cores}" if worker.cpu_cores else ""
+            print(f"🚀 模型工作程序啟動 (PID {worker.process.pid}): {worker.model_names}{cores_text}")
+
+        if not wait:
+            return
+        for worker in self.workers:
+            if not worker.wait_ready(self.timeout):
+                print(f"⚠️ 模型工作程序 (PID {worker.process.pid}) 未在 {self.timeout:.0f} 秒內完成載入")
+                continue
+            failed = [name for name, loaded in worker.ready_models.items() if not loaded]
+            loaded_text = f"，載入失敗: {failed}" if failed else ""
+            print(f"✅ 模型工作程序 (PID {worker.process.pid}) 已就緒{loaded_text}")
+
+    def stop(self):
+        """通知所有工作程序結束並等待退出"""
+        for worker in self.workers:
+            if worker.process.is_alive():
+                worker.request_queue.put(None)
+        for worker in self.workers:
+            worker.process.join(timeout=5)
+            if worker.process.is_alive():
+                worker.process.terminate()
+
+    def serves(self, model_name: str) -> bool:
+        """此程序池是否負責指定模型（工作程序回報載入失敗的模型除外）"""
+        worker = self._model_to_worker.get(model_name)
+        if worker is None:
+            return False
+        return worker.ready_models is None or worker.ready_models.get(model_name, False)
+
+    def remote_model(self, model_name: str, backend: str = None) -> RemoteModel:
+        """取得指定模型與後端的工作程序代理"""
+        key = (model_name, backend)
+        if key not in self._remote_models:
+            self._remote_models[key] = RemoteModel(self, model_name, backend)
+        return self._remote_models[key]
+
+    def forward(self, model_name: str, input_tensor, backend: str = None):
+        """
+        在負責該模型的工作程序中執行推論
+        Args:
+            model_name: 模型名稱
+            input_tensor: 預處理後的輸入 tensor [列數, 3, H, W]
+            backend: 推論後端，若為 None 則使用工作程序的預設後端
+        Returns:
+            模型輸出的 logits tensor [列數, 類別數]
+        """
+        worker = self._model_to_worker[model_name]
+        if not worker.process.is_alive():
+            raise RuntimeError(f"模型 {model_name} 的工作程序已停止")
+        return worker.forward(next(self._request_ids), model_name, backend, input_tensor.float().cpu(),
+                              self.timeout)
@@ -0,0 +1,122 @@
+# onnx_backend.py - ONNX Runtime 推論後端模組
+# 將已載入的模型匯出為 ONNX（依檢查點指紋快取），以 ONNX Runtime CPU 執行提供者與完整圖形最佳化推論
+import os
+import glob
+import time
+import warnings
+import numpy as np
+
+def onnxruntime_available() -> bool:
+    """是否已安裝 ONNX Runtime"""
+    try:
+        import onnxruntime  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+def export_onnx_model(model, path: str, input_size: int):
+    """
+    將 PyTorch 模型匯出為 ONNX，批次維度為動態
+    Args:
+        model: fp32 模型（eval 模式）
+        path: 輸出的 .onnx 檔案路徑
+        input_size: 模型輸入的邊長（像素）
+    """
+    import inspect
+    import torch
+
+    example_input = torch.zeros(1, 3, input_size, input_size)
+    # 新版 PyTorch 的 dynamo 匯出器會成為預設值，明確使用 TorchScript 匯出器；舊版沒有 dynamo 參數，不能傳入
+    export_options = {"dynamo": False} if "dynamo" in inspect.signature(torch.onnx.export).parameters else {}
+    temp_path = path + ".tmp"
+    with torch.no_grad(), warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        torch.onnx.export(
+            model.float().eval(), (example_input,), temp_path,
+            input_names=["input"], output_names=["logits"],
+            dynamic_axes={"input": {0: "batch"}, "logits": {0: "batch"}},
+            opset_version=17, **export_options
+        )
+    os.replace(temp_path, path)
+
+class OnnxModel:
+    """
+    以 ONNX Runtime 執行推論的模型，呼叫方式與 PyTorch 模型相同（輸入與輸出皆為 torch tensor）
+    """
+
+    def __init__(self, path: str, num_threads: int):
+        """
+        Args:
+            path: .onnx 檔案路徑
+            num_threads: 此模型 session 使用的 intra-op 執行緒數
+        """
+        import onnxruntime as ort
+
+        session_options = ort.SessionOptions()
+        session_options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        session_options.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
+        session_options.intra_op_num_threads = num_threads
+        session_options.inter_op_num_threads = 1
+
+        self.path = path
+        self.num_threads = num_threads
+        self.session = ort.InferenceSession(path, session_options, providers=["CPUExecutionProvider"])
+        self.input_name = self.session.get_inputs()[0].name
+        # 供模型註冊表計算記憶體用量
+        self.model_bytes = os.path.getsize(path)
+
+    def __call__(self, input_tensor):
+        import torch
+
+        input_array = np.ascontiguousarray(input_tensor.detach().float().cpu().numpy())
+        logits = self.session.run(None, {self.input_name: input_array})[0]
+        return torch.from_numpy(logits)
+
+class OnnxModelCache:
+    """
+    匯出的 ONNX 模型快取
+    檔名包含原始檢查點的指紋，檢查點更新後自動重新匯出
+    """
+
+    def __init__(self, cache_dir: str):
+        """
+        Args:
+            cache_dir: ONNX 模型的存放目錄
+        """
+        self.cache_dir = cache_dir
+
+    def path(self, model_name: str, fingerprint: str) -> str:
+        """ONNX 模型檔案的完整路徑"""
+        return os.path.join(self.cache_dir, f"{model_name}.{fingerprint[:12]}.onnx")
+
+    def load(self, model_name: str, fingerprint: str, num_threads: int):
+        """
+        建立快取 ONNX 模型的推論 session
+        Returns:
+            OnnxModel；沒有快取或載入失敗時返回 None
+        """
+        path = self.path(model_name, fingerprint)
+        if not os.path.exists(path):
+            return None
+        try:
+            start_time = time.time()
+            model = OnnxModel(path, num_threads)
+            print(f"✅ 由快取建立 ONNX Runtime session {model_name} "
+                  f"({num_threads} 執行緒，耗時 {time.time() - start_time:.1f} 秒)")
+            return model
+        except Exception as e:
+            print(f"⚠️ ONNX 模型快取 {path} 載入失敗，將重新匯出: {e}")
+            return None
+
+    def export(self, model_name: str, fingerprint: str, model, input_size: int) -> str:
+        """匯出 ONNX 模型至快取，並移除同一模型舊指紋的快取檔案"""
+        os.makedirs(self.cache_dir, exist_ok=True)
+        path = self.path(model_name, fingerprint)
+        for stale_path in glob.glob(os.path.join(self.cache_dir, f"{model_name}.*.onnx")):
+            if stale_path != path:
+                os.remove(stale_path)
+
+        start_time = time.time()
+        export_onnx_model(model, path, input_size)
+        print(f"📦 已匯出 ONNX 模型 {model_name} -> {path} (耗時 {time.time() - start_time:.1f} 秒)")
+        return path
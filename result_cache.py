@@ -0,0 +1,247 @@
+# result_cache.py - 辨識結果快取模組
+# 以解碼後像素的雜湊為鍵快取辨識結果，重複上傳的圖片（範例圖片、分享的照片、重試）不再執行模型推論；
+# 精確雜湊未命中時再以感知雜湊（dHash）尋找重新壓縮或縮放過的相近圖片
+import copy
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional
+import numpy as np
+from PIL import Image
+
+def image_digest(image) -> str:
+    """
+    計算圖片解碼後像素的雜湊（與檔案格式、檔名、中繼資料無關，只要像素相同即相同）
+    Args:
+        image: PIL 圖片
+    """
+    hasher = hashlib.blake2b(digest_size=16)
+    hasher.update(f"{image.mode}:{image.size[0]}x{image.size[1]}:".encode())
+    hasher.update(image.tobytes())
+    return hasher.hexdigest()
+
+def perceptual_hash(image) -> int:
+    """
+    計算圖片的 64 位元差異雜湊（dHash）：縮小為 9x8 灰階縮圖後比較相鄰像素的明暗
+    重新壓縮、縮放或輕微調色的同一張照片雜湊相同或只差少數位元
+    Args:
+        image: PIL 圖片
+    """
+    thumbnail = np.asarray(image.convert("RGB").resize((9, 8), Image.BOX).convert("L"), dtype=np.int16)
+    bits = (thumbnail[:, 1:] > thumbnail[:, :-1]).flatten()
+    return int.from_bytes(np.packbits(bits).tobytes(), "big")
+
+# 0-255 每個位元組的 1 位元數，用於向量化計算漢明距離
+_POPCOUNT_TABLE = np.array([bin(value).count("1") for value in range(256)], dtype=np.uint8)
+
+class NearDuplicateIndex:
+    """
+    感知雜湊的近似重複索引
+    雜湊存於連續的 uint64 陣列，查詢時一次計算與所有項目的漢明距離；
+    每個項目記錄範圍（模型與後端）與對應的精確快取鍵。
+    移除的項目歸還其位置供之後加入的項目使用，與結果快取同步移除時索引不會覆寫仍在快取中的項目
+    """
+
+    def __init__(self, capacity: int):
+        """
+        Args:
+            capacity: 最多保存的項目數，沒有空位時移除最早加入的項目
+        """
+        self.capacity = max(1, capacity)
+        self._hashes = np.zeros(self.capacity, dtype=np.uint64)
+        self._scopes = np.full(self.capacity, -1, dtype=np.int32)
+        self._keys = [None] * self.capacity
+        # 精確快取鍵 -> 位置（依加入順序）與尚未使用的位置
+        self._slots = {}
+        self._free_slots = list(range(self.capacity - 1, -1, -1))
+        self._scope_ids = {}
+
+    def add(self, phash: int, scope, key):
+        """
+        加入一個項目
+        Args:
+            phash: 圖片的感知雜湊
+            scope: 查詢範圍（只與相同範圍的項目比對）
+            key: 對應的精確快取鍵
+        """
+        self.remove(key)
+        if not self._free_slots:
+            self.remove(next(iter(self._slots)))
+        slot = self._free_slots.pop()
+        self._hashes[slot] = phash
+        self._scopes[slot] = self._scope_ids.setdefault(scope, len(self._scope_ids))
+        self._keys[slot] = key
+        self._slots[key] = slot
+
+    def nearest(self, phash: int, scope, max_distance: int):
+        """
+        尋找相同範圍內漢明距離最小且不超過 max_distance 的項目
+        Returns:
+            (精確快取鍵, 漢明距離)；沒有符合的項目時返回 None
+        """
+        scope_id = self._scope_ids.get(scope)
+        if scope_id is None:
+            return None
+
+        candidates = np.flatnonzero(self._scopes == scope_id)
+        if len(candidates) == 0:
+            return None
+        differences = np.bitwise_xor(self._hashes[candidates], np.uint64(phash))
+        distances = _POPCOUNT_TABLE[differences.view(np.uint8)].reshape(-1, 8).sum(axis=1)
+        best = int(np.argmin(distances))
+        if distances[best] > max_distance:
+            return None
+        return self._keys[candidates[best]], int(distances[best])
+
+    def remove(self, key):
+        """移除對應精確快取鍵的項目（結果已過期或被移除時）"""
+        slot = self._slots.pop(key, None)
+        if slot is not None:
+            self._scopes[slot] = -1
+            self._keys[slot] = None
+            self._free_slots.append(slot)
+
+    def __len__(self) -> int:
+        return len(self._slots)
+
+class ResultCache:
+    """
+    有上限與有效期限的 LRU 辨識結果快取
+    超出上限時移除最久未使用的結果；超過有效期限的結果視為未命中並移除
+    """
+
+    def __init__(self, max_entries: int = 256, ttl_seconds: float = 3600.0, max_hash_distance: int = -1):
+        """
+        Args:
+            max_entries: 最多保存的結果數，0 表示停用快取
+            ttl_seconds: 結果的有效秒數，0 表示不過期
+            max_hash_distance: 精確雜湊未命中時，感知雜湊漢明距離不超過此值的圖片視為同一張；負數表示停用
+        """
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.max_hash_distance = max_hash_distance
+        self._entries = OrderedDict()
+        self._near_index = NearDuplicateIndex(max_entries) if max_entries > 0 and max_hash_distance >= 0 else None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.near_hits = 0
+        self.misses = 0
+        self.expirations = 0
+        self.evictions = 0
+        # 精確命中與相近圖片命中分別累計省下的推論次數（相近圖片的結果不一定與重新推論相同）
+        self.forwards_avoided = 0
+        self.near_forwards_avoided = 0
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+    def get(self, key, phash: Optional[int] = None):
+        """
+        取得快取的結果並標記為最近使用，未命中或已過期時返回 None
+        Args:
+            key: 快取鍵（圖片雜湊、模型與後端組成的 tuple）
+            phash: 圖片的感知雜湊，提供時精確鍵未命中後再尋找相同模型與後端的相近圖片
+        Returns:
+            結果的副本（呼叫端修改不影響快取內容）
+        """
+        if self.max_entries <= 0:
+            return None
+
+        with self._lock:
+            entry = self._get_entry(key)
+            if entry is not None:
+                self.hits += 1
+                self.forwards_avoided += entry[2]
+            elif phash is not None and self._near_index is not None:
+                entry = self._get_near_entry(phash, key[1:])
+            if entry is None:
+                self.misses += 1
+                return None
+            result = entry[1]
+        return copy.deepcopy(result)
+
+    def _get_entry(self, key):
+        """取得未過期的項目並標記為最近使用（呼叫端需持有鎖）"""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if self.ttl_seconds > 0 and time.time() - entry[0] > self.ttl_seconds:
+            self._remove(key)
+            self.expirations += 1
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    def _get_near_entry(self, phash: int, scope):
+        """
+        取得相同範圍內最相近且未過期的項目（呼叫端需持有鎖）
+        最相近的項目已過期時將其移出索引，繼續尋找距離上限內的其他項目
+        """
+        while True:
+            match = self._near_index.nearest(phash, scope, self.max_hash_distance)
+            if match is None:
+                return None
+            entry = self._get_entry(match[0])
+            if entry is not None:
+                self.near_hits += 1
+                self.near_forwards_avoided += entry[2]
+                print(f"♻️ 相近圖片（感知雜湊距離 {match[1]}）使用快取的辨識結果")
+                return entry
+            # 過期的項目已由 _get_entry 移出索引；確保不會再次比對到同一項目
+            self._near_index.remove(match[0])
+
+    def _remove(self, key):
+        """移除項目及其近似重複索引（呼叫端需持有鎖）"""
+        del self._entries[key]
+        if self._near_index is not None:
+            self._near_index.remove(key)
+
+    def put(self, key, result: Dict, phash: Optional[int] = None, forwards: int = 1):
+        """
+        寫入結果，超出上限時移除最久未使用的結果
+        Args:
+            key: 快取鍵
+            result: 辨識結果（保存副本）
+            phash: 圖片的感知雜湊，提供時加入近似重複索引
+            forwards: 產生此結果執行的模型推論次數（命中時計入省下的推論次數）
+        """
+        if self.max_entries <= 0:
+            return
+
+        result = copy.deepcopy(result)
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            # 先移除最久未使用的結果再加入，近似重複索引的空位由移除的結果歸還
+            while len(self._entries) >= self.max_entries:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+            self._entries[key] = (time.time(), result, forwards)
+            if phash is not None and self._near_index is not None:
+                self._near_index.add(phash, key[1:], key)
+
+    def clear(self):
+        """清除所有結果（模型或資料庫更新後使用）"""
+        with self._lock:
+            for key in list(self._entries):
+                self._remove(key)
+
+    def stats(self) -> Dict:
+        """快取的命中（精確與相近圖片）、未命中、過期與移除次數、命中率及精確與相近圖片命中各自省下的模型推論次數"""
+        with self._lock:
+            hits = self.hits + self.near_hits
+            lookups = hits + self.misses
+            return {
+                "hits": self.hits,
+                "near_hits": self.near_hits,
+                "misses": self.misses,
+                "forwards_avoided": self.forwards_avoided,
+                "near_forwards_avoided": self.near_forwards_avoided,
+                "hit_rate": round(hits / lookups * 100, 1) if lookups else 0.0,
+                "expirations": self.expirations,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "max_entries": self.max_entries
+            }
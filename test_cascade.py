@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# 串接式多模型辨識的提前停止測試：以各模型固定的 logits 取代實際推論
+
+import numpy as np
+import pytest
+from PIL import Image
+
+food_recognition = pytest.importorskip("food_recognition")
+
+from food_recognition import FOOD_CATALOG, TRAINING_LABELS
+
+CASCADE_MODELS = ["model_a", "model_b", "model_c", "model_d"]
+
+def known_label_indices(count: int) -> list:
+    """資料庫中有對應食物的前 count 個訓練標籤索引"""
+    return [index for index in range(len(TRAINING_LABELS)) if FOOD_CATALOG.by_label_index(index)][:count]
+
+def label_logits(label_index: int, confidence: float) -> np.ndarray:
+    """softmax 後該標籤機率約為 confidence 的 logits"""
+    logits = np.zeros(len(TRAINING_LABELS))
+    others = len(TRAINING_LABELS) - 1
+    logits[label_index] = np.log(confidence * others / (1 - confidence))
+    return logits
+
+@pytest.fixture
+def cascade(monkeypatch):
+    """固定的串接順序、空的串接統計與依模型返回預設 logits 的推論"""
+    monkeypatch.setattr(food_recognition, "CASCADE_CHEAPEST_FIRST", CASCADE_MODELS)
+    monkeypatch.setattr(food_recognition, "_cascade_runs", 0)
+    monkeypatch.setattr(food_recognition, "_cascade_models_run", 0)
+    model_logits, calls = {}, []
+
+    def compute_model_logits(image, model_name, **kwargs):
+        calls.append(model_name)
+        return model_logits[model_name], True
+
+    monkeypatch.setattr(food_recognition, "compute_model_logits", compute_model_logits)
+
+    def run(min_votes=3, confidence_threshold=95):
+        image = Image.new("RGB", (64, 64), (180, 90, 40))
+        return food_recognition.classify_with_cascade(image, order="cheapest", min_votes=min_votes,
+                                                      confidence_threshold=confidence_threshold, tta=False)
+
+    return model_logits, calls, run
+
+def test_stops_when_min_votes_agree(cascade):
+    """前 min_votes 個模型結果一致時停止，不執行其餘模型"""
+    model_logits, calls, run = cascade
+    food, other = known_label_indices(2)
+    model_logits.update({"model_a": label_logits(food, 0.6), "model_b": label_logits(other, 0.6),
+                         "model_c": label_logits(food, 0.6), "model_d": label_logits(food, 0.6)})
+
+    result = run(min_votes=2)
+
+    assert calls == ["model_a", "model_b", "model_c"]
+    comprehensive = result["🎯 綜合辨識結果"]
+    assert comprehensive["執行模型數"] == "3/4"
+    assert comprehensive["停止原因"] == "2 個模型結果一致"
+    assert comprehensive["最終辨識"] == FOOD_CATALOG.by_label_index(food).chinese
+
+def test_stops_on_confident_model(cascade):
+    """單一模型信心度達門檻即停止"""
+    model_logits, calls, run = cascade
+    food, other = known_label_indices(2)
+    model_logits.update({"model_a": label_logits(other, 0.5), "model_b": label_logits(food, 0.97),
+                         "model_c": label_logits(other, 0.5), "model_d": label_logits(other, 0.5)})
+
+    result = run(min_votes=3, confidence_threshold=95)
+
+    assert calls == ["model_a", "model_b"]
+    assert result["🎯 綜合辨識結果"]["停止原因"] == "model_b 信心度達 97%"
+    assert result["🎯 綜合辨識結果"]["執行模型數"] == "2/4"
+
+def test_runs_every_model_without_consensus(cascade):
+    """沒有達成共識或信心度門檻時執行全部模型"""
+    model_logits, calls, run = cascade
+    labels = known_label_indices(4)
+    model_logits.update({name: label_logits(label, 0.5) for name, label in zip(CASCADE_MODELS, labels)})
+
+    result = run(min_votes=2, confidence_threshold=95)
+
+    assert calls == CASCADE_MODELS
+    assert result["🎯 綜合辨識結果"]["停止原因"] == "已執行所有模型"
+    assert result["🎯 綜合辨識結果"]["執行模型數"] == "4/4"
+
+def test_failed_model_does_not_vote(cascade):
+    """辨識失敗的模型計入執行數但不投票"""
+    model_logits, calls, run = cascade
+    food, other = known_label_indices(2)
+    model_logits.update({"model_a": label_logits(food, 0.6), "model_c": label_logits(food, 0.6),
+                         "model_d": label_logits(other, 0.6)})
+
+    result = run(min_votes=2)
+
+    # model_b 沒有預設 logits，推論時拋出 KeyError
+    assert calls == ["model_a", "model_b", "model_c"]
+    assert result["🎯 綜合辨識結果"]["成功模型數"] == "2/3"
+    assert result["📊 各模型詳細結果"]["#2 model_b"]["狀態"] == "辨識失敗"
+
+def test_average_cascade_length(cascade):
+    """串接統計累計實際執行的模型數，估計值為平均（無條件捨去）"""
+    model_logits, calls, run = cascade
+    food, other = known_label_indices(2)
+    model_logits.update({"model_a": label_logits(food, 0.99), "model_b": label_logits(other, 0.5),
+                         "model_c": label_logits(other, 0.5), "model_d": label_logits(other, 0.5)})
+    run()
+    # 第二次沒有信心度足夠的模型，第 4 個模型時 other 達到 3 票
+    model_logits["model_a"] = label_logits(food, 0.5)
+    run()
+
+    assert (food_recognition._cascade_runs, food_recognition._cascade_models_run) == (2, 5)
+    assert food_recognition.estimate_cascade_forwards() == 2
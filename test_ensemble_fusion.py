@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# 多模型加權軟投票與模型輸出檢查的測試
+
+import numpy as np
+import pytest
+
+import food_recognition
+from food_recognition import fuse_model_logits, softmax_probabilities, TRAINING_LABELS
+
+def test_softmax_matches_hand_computed_values():
+    """softmax 與逐項計算 exp / sum(exp) 相同，且不受 logits 平移影響"""
+    logits = np.array([1.0, 2.0, 3.0])
+    expected = np.exp(logits) / np.exp(logits).sum()
+    np.testing.assert_allclose(softmax_probabilities(logits), expected)
+    np.testing.assert_allclose(softmax_probabilities(logits + 1000), expected)
+
+def test_fusion_matches_weighted_average_of_softmax():
+    """融合結果為各模型 softmax 機率依權重的加權平均"""
+    logits_stack = np.array([
+        [2.0, 0.0, -1.0],
+        [0.0, 3.0, 0.0],
+        [1.0, 1.0, 1.0],
+    ])
+    weights = np.array([1.0, 2.0, 0.5])
+
+    probabilities, fused = fuse_model_logits(logits_stack, weights)
+
+    expected_rows = [np.exp(row) / np.exp(row).sum() for row in logits_stack]
+    expected_fused = sum(w * p for w, p in zip(weights, expected_rows)) / weights.sum()
+    np.testing.assert_allclose(probabilities, np.stack(expected_rows))
+    np.testing.assert_allclose(fused, expected_fused)
+    assert fused.sum() == pytest.approx(1.0)
+    assert int(np.argmax(fused)) == 1
+
+def test_single_model_fusion_is_its_softmax():
+    """只有一個模型時融合結果即該模型的 softmax，權重大小不影響結果"""
+    logits = np.array([[0.5, -0.5, 2.0]])
+    _, fused = fuse_model_logits(logits, np.array([3.0]))
+    np.testing.assert_allclose(fused, softmax_probabilities(logits[0]))
+
+def test_wrong_head_size_raises(monkeypatch):
+    """分類頭類別數與訓練標籤數不符的模型回報錯誤，而不是截斷 logits"""
+    torch = pytest.importorskip("torch")
+    if not food_recognition.TORCH_AVAILABLE:
+        pytest.skip("PyTorch 不可用")
+
+    wrong_head = torch.nn.Sequential(torch.nn.Flatten(), torch.nn.Linear(3 * 8 * 8, len(TRAINING_LABELS) + 5))
+    monkeypatch.setattr(food_recognition, "load_model", lambda model_name, backend=None: wrong_head)
+    monkeypatch.setattr(food_recognition, "wait_for_model_ready", lambda model_name: True)
+    monkeypatch.setattr(food_recognition, "MICRO_BATCH_MAX_SIZE", 1)
+
+    input_tensor = torch.rand(1, 3, 8, 8)
+    with pytest.raises(ValueError, match="輸出類別數"):
+        food_recognition.compute_model_logits(None, "wrong_head_model", input_tensor=input_tensor)
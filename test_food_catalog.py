@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# 食物目錄的標籤→五性矩陣與向量化五性分佈測試：結果應與逐一標籤累加相同
+
+import numpy as np
+import pytest
+
+from config import FOOD_DATABASE
+from food_catalog import FoodCatalog, FOOD_CATALOG, FIVE_NATURES, TRAINING_LABELS, normalize_name
+
+def loop_nature_distribution(probabilities: np.ndarray) -> dict:
+    """逐一標籤查詢資料庫並累加各五性的機率（矩陣取代前的作法）"""
+    english_to_food = {}
+    for chinese_name, food_info in FOOD_DATABASE.items():
+        english_to_food.setdefault(normalize_name(food_info.get("英文名", "")), food_info)
+
+    distribution = dict.fromkeys(FIVE_NATURES, 0.0)
+    for label, probability in zip(TRAINING_LABELS, probabilities):
+        food_info = english_to_food.get(normalize_name(label))
+        if food_info is None:
+            continue
+        nature = food_info["五性"].rstrip("性")
+        if nature in distribution:
+            distribution[nature] += probability
+    return distribution
+
+def test_matrix_shape_and_rows():
+    """矩陣為 [訓練標籤數, 5]，每列為對應食物五性的 one-hot，找不到食物的標籤整列為 0"""
+    matrix = FOOD_CATALOG.label_nature_matrix
+    assert matrix.shape == (len(TRAINING_LABELS), 5) == (183, 5)
+    assert set(np.unique(matrix.sum(axis=1))) <= {0.0, 1.0}
+    for label_idx in range(len(TRAINING_LABELS)):
+        record = FOOD_CATALOG.by_label_index(label_idx)
+        if record is None:
+            assert not matrix[label_idx].any()
+        else:
+            assert FIVE_NATURES[int(matrix[label_idx].argmax())] == record.nature.rstrip("性")
+
+def test_small_catalog_matrix():
+    """以小型資料庫建立矩陣：「溫性」與「溫」視為相同，資料庫沒有的標籤整列為 0"""
+    catalog = FoodCatalog({
+        "玉米": {"英文名": "Corn", "五性": "平"},
+        "薑": {"英文名": "Ginger", "五性": "溫性"},
+        "西瓜": {"英文名": "Water melon", "五性": "寒"},
+    }, ["Corn", "Ginger", "Watermelon", "Unknown"])
+
+    expected = np.zeros((4, 5), dtype=np.float32)
+    expected[0, FIVE_NATURES.index("平")] = 1
+    expected[1, FIVE_NATURES.index("溫")] = 1
+    expected[2, FIVE_NATURES.index("寒")] = 1
+    np.testing.assert_array_equal(catalog.label_nature_matrix, expected)
+
+@pytest.mark.parametrize("seed", range(5))
+def test_vectorized_distribution_matches_loop(seed):
+    """softmax 機率乘上矩陣的五性分佈與逐一標籤累加的結果相同"""
+    rng = np.random.default_rng(seed)
+    logits = rng.normal(scale=3.0, size=len(TRAINING_LABELS))
+    probabilities = np.exp(logits - logits.max())
+    probabilities /= probabilities.sum()
+
+    vectorized = probabilities @ FOOD_CATALOG.label_nature_matrix
+    expected = loop_nature_distribution(probabilities)
+
+    np.testing.assert_allclose(vectorized, [expected[nature] for nature in FIVE_NATURES], rtol=1e-5, atol=1e-7)
+
+def test_compute_nature_distribution_formats_percentages():
+    """compute_nature_distribution 依五性順序以百分比字串輸出"""
+    food_recognition = pytest.importorskip("food_recognition")
+    probabilities = np.zeros(len(TRAINING_LABELS))
+    mapped = [idx for idx in range(len(TRAINING_LABELS)) if FOOD_CATALOG.by_label_index(idx)][:2]
+    probabilities[mapped] = 0.5
+
+    distribution = food_recognition.compute_nature_distribution(probabilities)
+
+    assert list(distribution) == FIVE_NATURES
+    expected = loop_nature_distribution(probabilities)
+    assert distribution == {nature: f"{expected[nature] * 100:.1f}%" for nature in FIVE_NATURES}
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# 上傳圖片讀取測試：JPEG 的 draft 縮小解碼、EXIF 方向轉正與最長邊上限
+
+import io
+
+import pytest
+from PIL import Image, JpegImagePlugin
+
+from image_ingest import load_image
+
+def encode(image: Image.Image, image_format: str, orientation: int = None) -> bytes:
+    """將圖片編碼為指定格式的位元組，可附上 EXIF 方向"""
+    buffer = io.BytesIO()
+    if orientation is None:
+        image.save(buffer, format=image_format)
+    else:
+        exif = Image.Exif()
+        exif[0x0112] = orientation
+        image.save(buffer, format=image_format, exif=exif)
+    return buffer.getvalue()
+
+@pytest.fixture
+def draft_calls(monkeypatch):
+    """記錄 JPEG draft 的呼叫與實際選用的解碼尺寸"""
+    calls = []
+    original_draft = JpegImagePlugin.JpegImageFile.draft
+
+    def draft(self, mode, size):
+        result = original_draft(self, mode, size)
+        calls.append((size, self.size))
+        return result
+
+    monkeypatch.setattr(JpegImagePlugin.JpegImageFile, "draft", draft)
+    return calls
+
+def test_large_jpeg_uses_draft_and_exif_orientation(draft_calls):
+    """4000x3000、EXIF 方向 6（需順時針轉 90 度）的 JPEG 以 draft 縮小解碼，轉正後為 768x1024"""
+    image = load_image(encode(Image.new("RGB", (4000, 3000), (200, 120, 40)), "JPEG", orientation=6),
+                       max_side=1024)
+
+    assert image.size == (768, 1024)
+    assert image.mode == "RGB"
+    # draft 以 1/2 比例解碼（2000x1500），之後才縮小到工作尺寸（thumbnail 內部的 draft 呼叫不再改變解碼尺寸）
+    assert draft_calls[0] == ((1024, 768), (2000, 1500))
+    assert all(decoded == (2000, 1500) for _, decoded in draft_calls)
+    assert image.getexif().get(0x0112) is None
+
+def test_rgba_png_is_resized_and_converted(draft_calls):
+    """非 JPEG 的 RGBA 圖片不使用 draft，縮小至最長邊上限並轉為 RGB"""
+    image = load_image(io.BytesIO(encode(Image.new("RGBA", (3000, 1500), (10, 200, 30, 128)), "PNG")),
+                       max_side=1024)
+
+    assert image.size == (1024, 512)
+    assert image.mode == "RGB"
+    assert draft_calls == []
+
+def test_small_image_is_not_resized(draft_calls):
+    """最長邊未超過上限的圖片維持原尺寸，只轉正與轉換色彩"""
+    image = load_image(encode(Image.new("RGB", (640, 480)), "JPEG", orientation=8), max_side=1024)
+
+    assert image.size == (480, 640)
+    assert draft_calls == []
+
+def test_zero_max_side_keeps_full_resolution():
+    """max_side 為 0 時不縮小，已解碼的 PIL 圖片也可直接傳入"""
+    image = load_image(Image.new("L", (2000, 1000)), max_side=0)
+    assert image.size == (2000, 1000)
+    assert image.mode == "RGB"
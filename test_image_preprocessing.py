@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# 圖片預處理器的正確性、緩衝區重複使用、測試時增強批次與多模型共用預處理的測試：結果應與 Resize → ToTensor → Normalize 相同
+
+import threading
+
+import numpy as np
+import pytest
+from PIL import Image
+
+torch = pytest.importorskip("torch")
+transforms = pytest.importorskip("torchvision.transforms")
+
+from image_preprocessing import ImagePreprocessor, get_image_preprocessor, IMAGENET_MEAN, IMAGENET_STD, TTA_VIEWS
+
+def random_image(width: int = 300, height: int = 200, seed: int = 0) -> Image.Image:
+    """隨機像素的 RGB 圖片"""
+    rng = np.random.default_rng(seed)
+    return Image.fromarray(rng.integers(0, 256, (height, width, 3), dtype=np.uint8))
+
+def reference_transform(input_size: int):
+    """原本辨識流程使用的 torchvision 轉換"""
+    return transforms.Compose([
+        transforms.Resize((input_size, input_size)),
+        transforms.ToTensor(),
+        transforms.Normalize(mean=list(IMAGENET_MEAN), std=list(IMAGENET_STD))
+    ])
+
+@pytest.mark.parametrize("input_size", [224, 192])
+def test_matches_torchvision_compose(input_size):
+    """合併的乘加正規化與 Resize → ToTensor → Normalize 的結果相同（僅浮點捨入誤差）"""
+    image = random_image()
+    expected = reference_transform(input_size)(image).unsqueeze(0)
+
+    result = ImagePreprocessor(input_size)(image)
+
+    assert result.shape == (1, 3, input_size, input_size)
+    assert torch.allclose(result, expected, atol=1e-6)
+
+def test_buffer_is_reused_across_calls():
+    """同一執行緒重複預處理時寫入同一個緩衝區，不配置新的 tensor"""
+    preprocessor = ImagePreprocessor(224)
+    buffer = preprocessor.buffer()
+    first = preprocessor(random_image(seed=1), buffer)
+    first_pointer = first.data_ptr()
+    second = preprocessor(random_image(seed=2), preprocessor.buffer())
+
+    assert second.data_ptr() == first_pointer == buffer.data_ptr()
+    expected = reference_transform(224)(random_image(seed=2)).unsqueeze(0)
+    assert torch.allclose(second, expected, atol=1e-6)
+
+def test_each_thread_has_its_own_buffers():
+    """不同執行緒取得各自的預處理器與緩衝區，同時預處理不同圖片時互不覆寫"""
+    start = threading.Barrier(4)
+    results = {}
+
+    def worker(seed):
+        preprocessor = get_image_preprocessor(224)
+        start.wait()
+        for _ in range(5):
+            output = preprocessor(random_image(seed=seed), preprocessor.buffer())
+        results[seed] = (id(preprocessor), output.data_ptr(), output.clone())
+
+    threads = [threading.Thread(target=worker, args=(seed,)) for seed in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len({preprocessor_id for preprocessor_id, _, _ in results.values()}) == 4
+    assert len({pointer for _, pointer, _ in results.values()}) == 4
+    for seed, (_, _, output) in results.items():
+        expected = reference_transform(224)(random_image(seed=seed)).unsqueeze(0)
+        assert torch.allclose(output, expected, atol=1e-6)
+
+def test_write_into_batch_row():
+    """write 可直接寫入批次緩衝區的某一列，不影響其他列"""
+    preprocessor = ImagePreprocessor(224)
+    batch = torch.zeros(3, 3, 224, 224)
+    preprocessor.write(random_image(), batch[1])
+
+    assert torch.count_nonzero(batch[0]) == 0 and torch.count_nonzero(batch[2]) == 0
+    assert torch.allclose(batch[1], reference_transform(224)(random_image()), atol=1e-6)
+
+def tta_views(image: Image.Image, crop_fraction: float = 0.875) -> list:
+    """原本逐一預處理的各視角圖片：原圖、中央裁切與兩者的水平翻轉"""
+    width, height = image.size
+    crop_width, crop_height = int(width * crop_fraction), int(height * crop_fraction)
+    left, top = (width - crop_width) // 2, (height - crop_height) // 2
+    crop = image.crop((left, top, left + crop_width, top + crop_height))
+    return [image, crop, image.transpose(Image.FLIP_LEFT_RIGHT), crop.transpose(Image.FLIP_LEFT_RIGHT)]
+
+def test_tta_batch_contains_each_view():
+    """TTA 批次依 TTA_VIEWS 的順序包含原圖、中央裁切與兩者的水平翻轉"""
+    image = random_image()
+    batch = ImagePreprocessor(224).write_tta_batch(image, crop_fraction=0.875)
+
+    assert batch.shape == (len(TTA_VIEWS), 3, 224, 224) == (4, 3, 224, 224)
+    transform = reference_transform(224)
+    for row, view in enumerate(tta_views(image)):
+        assert torch.allclose(batch[row], transform(view), atol=1e-5), TTA_VIEWS[row]
+
+def test_tta_average_matches_per_view_forwards(monkeypatch):
+    """一次批次推論後平均的 logits 與逐一預處理、逐一推論各視角後平均的結果相同"""
+    food_recognition = pytest.importorskip("food_recognition")
+    if not food_recognition.TORCH_AVAILABLE:
+        pytest.skip("PyTorch 不可用")
+
+    torch.manual_seed(0)
+    model = torch.nn.Sequential(torch.nn.Conv2d(3, 4, 5, stride=4), torch.nn.ReLU(), torch.nn.Flatten(),
+                                torch.nn.Linear(4 * 55 * 55, len(food_recognition.TRAINING_LABELS))).eval()
+    monkeypatch.setattr(food_recognition, "load_model", lambda model_name, backend=None: model)
+    monkeypatch.setattr(food_recognition, "wait_for_model_ready", lambda model_name: True)
+    monkeypatch.setattr(food_recognition, "MICRO_BATCH_MAX_SIZE", 1)
+    monkeypatch.setattr(food_recognition, "TTA_CROP_FRACTION", 0.875)
+
+    image = random_image()
+    logits, is_ai = food_recognition.compute_model_logits(image, "tta_model", backend="torch", tta=True)
+
+    transform = reference_transform(224)
+    with torch.no_grad():
+        expected = torch.stack([model(transform(view).unsqueeze(0))[0] for view in tta_views(image)]).mean(dim=0)
+    assert is_ai
+    np.testing.assert_allclose(logits, expected.numpy(), atol=1e-4)
+
+INPUT_SIZES = {"resnet_a": 224, "densenet_b": 224, "swinv2_c": 192}
+
+@pytest.fixture
+def shared_preprocessing(monkeypatch):
+    """三個模型（兩種輸入尺寸）的多模型辨識，記錄每次預處理與各模型收到的輸入"""
+    food_recognition = pytest.importorskip("food_recognition")
+    if not food_recognition.TORCH_AVAILABLE:
+        pytest.skip("PyTorch 不可用")
+
+    preprocess_calls, model_inputs = [], {}
+    original_preprocess = food_recognition.preprocess_image
+
+    def preprocess_image(image, model_name=None, reuse_buffer=False):
+        preprocess_calls.append((image.mode, model_name))
+        return original_preprocess(image, model_name, reuse_buffer)
+
+    def compute_model_logits(image, model_name, input_tensor=None, backend=None, tta=False, reduce_rows=True):
+        model_inputs[model_name] = input_tensor
+        return food_recognition._build_mock_logits(image), True
+
+    monkeypatch.setattr(food_recognition, "get_model_input_size", lambda model_name=None: INPUT_SIZES[model_name])
+    monkeypatch.setattr(food_recognition, "preprocess_image", preprocess_image)
+    monkeypatch.setattr(food_recognition, "compute_model_logits", compute_model_logits)
+    monkeypatch.setattr(food_recognition, "ENSEMBLE_MODELS", list(INPUT_SIZES))
+    monkeypatch.setattr(food_recognition, "ENSEMBLE_MAX_WORKERS", 1)
+    return food_recognition, preprocess_calls, model_inputs
+
+def test_each_input_size_is_preprocessed_once(shared_preprocessing):
+    """每種輸入尺寸只預處理一次，非 RGB 圖片只轉換一次，結果與各模型各自預處理相同"""
+    food_recognition, preprocess_calls, _ = shared_preprocessing
+    image = random_image().convert("RGBA")
+
+    input_tensors = food_recognition.preprocess_image_for_models(image, list(INPUT_SIZES))
+
+    assert sorted(input_tensors) == [192, 224]
+    assert sorted(INPUT_SIZES[model_name] for _, model_name in preprocess_calls) == [192, 224]
+    assert all(mode == "RGB" for mode, _ in preprocess_calls)
+    for size, input_tensor in input_tensors.items():
+        assert torch.allclose(input_tensor, reference_transform(size)(image.convert("RGB")).unsqueeze(0), atol=1e-6)
+
+def test_ensemble_models_share_the_preprocessed_input(shared_preprocessing):
+    """多模型辨識時相同輸入尺寸的模型收到同一個已預處理的 tensor，不再各自預處理"""
+    food_recognition, preprocess_calls, model_inputs = shared_preprocessing
+
+    food_recognition._classify_with_all_models(random_image(), backend="torch")
+
+    assert len(preprocess_calls) == 2
+    assert model_inputs["resnet_a"] is model_inputs["densenet_b"]
+    assert model_inputs["swinv2_c"].shape[-1] == 192
+    assert model_inputs["resnet_a"].shape[-1] == 224
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# 圖片品質檢查的判斷、提醒模式與省下推論次數統計的測試
+
+import os
+
+import numpy as np
+import pytest
+from PIL import Image
+
+import config
+from image_quality import ImageQualityGate, QUALITY_PASS, QUALITY_WARN, QUALITY_REJECT
+from result_cache import ResultCache
+
+def textured_image(brightness: int = 128, size: int = 128) -> Image.Image:
+    """亮度平均約為 brightness 的清晰隨機紋理圖片"""
+    rng = np.random.default_rng(0)
+    pixels = np.clip(brightness + rng.integers(-60, 61, (size, size, 3)), 0, 255).astype(np.uint8)
+    return Image.fromarray(pixels)
+
+def test_sharp_well_exposed_image_passes():
+    """清晰且曝光正常的圖片通過檢查"""
+    gate = ImageQualityGate()
+    assert gate.check(textured_image())["verdict"] == QUALITY_PASS
+
+@pytest.mark.parametrize("image, reason", [
+    (Image.new("RGB", (128, 128), (120, 120, 120)), "圖片幾乎沒有內容"),
+    (textured_image(brightness=5), "圖片過暗"),
+])
+def test_blank_and_dark_images_are_rejected(image, reason):
+    """單色與過暗的圖片在拒絕模式下被拒絕，並記錄省下的模型推論次數"""
+    gate = ImageQualityGate(reject=True)
+    quality = gate.check(image, forwards=8)
+    assert quality["verdict"] == QUALITY_REJECT
+    assert reason in quality["reasons"]
+    assert gate.stats()["forwards_avoided"] == 8
+
+def test_warn_mode_downgrades_rejections():
+    """提醒模式下原本會拒絕的圖片改為提醒，不計入省下的推論次數"""
+    gate = ImageQualityGate(reject=False)
+    quality = gate.check(Image.new("RGB", (128, 128)), forwards=8)
+    assert quality["verdict"] == QUALITY_WARN
+    assert "圖片幾乎沒有內容" in quality["reasons"]
+    stats = gate.stats()
+    assert (stats["warnings"], stats["rejections"], stats["forwards_avoided"]) == (1, 0, 0)
+
+def test_classifier_forwards_are_subtracted_from_savings():
+    """小型模型的推論次數從省下的推論次數中扣除，模擬模式的結果不作為判斷依據"""
+    gate = ImageQualityGate(min_confidence=0.5, reject=True)
+    assert gate.check(textured_image(), forwards=8, classify=lambda image: (0.1, True))["verdict"] == QUALITY_REJECT
+    assert gate.check(textured_image(), forwards=8, classify=lambda image: (0.1, False))["verdict"] == QUALITY_PASS
+
+    stats = gate.stats()
+    assert (stats["classifier_forwards"], stats["forwards_avoided"], stats["net_forwards_saved"]) == (2, 8, 6)
+
+@pytest.mark.skipif("QUALITY_GATE_MODE" in os.environ, reason="環境變數已指定品質檢查模式")
+def test_default_mode_is_warn():
+    """門檻驗證前預設只提醒，不拒絕圖片"""
+    assert config.QUALITY_GATE_MODE == "warn"
+
+@pytest.fixture
+def rejecting_gate(monkeypatch):
+    """拒絕模式的品質檢查與空的結果快取"""
+    food_recognition = pytest.importorskip("food_recognition")
+    gate = ImageQualityGate(reject=True)
+    monkeypatch.setattr(food_recognition, "_quality_gate", gate)
+    monkeypatch.setattr(food_recognition, "QUALITY_GATE_MODE", "reject")
+    monkeypatch.setattr(food_recognition, "QUALITY_GATE_MODEL", "")
+    monkeypatch.setattr(food_recognition, "_result_cache", ResultCache(max_entries=0))
+    return food_recognition, gate
+
+@pytest.mark.parametrize("runs, models_run, expected", [(0, 0, 1), (4, 10, 2), (3, 3, 1)])
+def test_cascade_rejection_counts_average_cascade_length(rejecting_gate, monkeypatch, runs, models_run, expected):
+    """串接模式拒絕時以先前串接辨識的平均執行模型數（無條件捨去）計算，尚未執行過時為 1"""
+    food_recognition, gate = rejecting_gate
+    monkeypatch.setattr(food_recognition, "_cascade_runs", runs)
+    monkeypatch.setattr(food_recognition, "_cascade_models_run", models_run)
+
+    result = food_recognition.classify_with_all_models(Image.new("RGB", (128, 128)), mode="cascade", tta=False)
+
+    assert "圖片品質不足" in result["🎯 綜合辨識結果"]["錯誤"]
+    assert gate.stats()["forwards_avoided"] == expected
+
+def test_all_mode_rejection_counts_every_model(rejecting_gate):
+    """全部模型模式拒絕時省下的推論次數為執行的模型數"""
+    food_recognition, gate = rejecting_gate
+    food_recognition.classify_with_all_models(Image.new("RGB", (128, 128)), mode="all", tta=False)
+    assert gate.stats()["forwards_avoided"] == len(food_recognition.ENSEMBLE_MODELS)
+
+def test_cascade_records_models_run(monkeypatch):
+    """每次串接辨識累計實際執行的模型數"""
+    food_recognition = pytest.importorskip("food_recognition")
+    monkeypatch.setattr(food_recognition, "_cascade_runs", 0)
+    monkeypatch.setattr(food_recognition, "_cascade_models_run", 0)
+
+    def confident_logits(image, model_name, **kwargs):
+        logits = np.zeros(len(food_recognition.TRAINING_LABELS))
+        logits[0] = 50.0
+        return logits, True
+
+    monkeypatch.setattr(food_recognition, "compute_model_logits", confident_logits)
+    food_recognition.classify_with_cascade(textured_image(), min_votes=10, confidence_threshold=90)
+
+    assert (food_recognition._cascade_runs, food_recognition._cascade_models_run) == (1, 1)
+    assert food_recognition.estimate_cascade_forwards() == 1
@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# 微批次排程的列數上限測試
+
+import threading
+
+import pytest
+
+torch = pytest.importorskip("torch")
+
+from model_batching import MicroBatcher
+
+class RecordingForward:
+    """記錄每次批次推論的輸入列數，輸出為輸入各列的總和（可驗證結果是否交回正確的請求）"""
+
+    def __init__(self):
+        self.batch_rows = []
+        self.lock = threading.Lock()
+        self.entered = threading.Event()
+        self.release = threading.Event()
+
+    def __call__(self, model, input_tensor):
+        self.entered.set()
+        self.release.wait()
+        with self.lock:
+            self.batch_rows.append(input_tensor.shape[0])
+        return input_tensor.sum(dim=(1, 2, 3)).unsqueeze(1)
+
+def submit_all(batcher, forward, row_counts):
+    """在排程執行緒暫停時送出所有請求，使其同時排入佇列，再放行推論"""
+    model = object()
+    # 第一個請求讓排程執行緒進入推論並暫停，其餘請求在此期間排入佇列
+    inputs = [torch.full((rows, 1, 1, 1), float(index)) for index, rows in enumerate(row_counts)]
+    futures = [batcher.submit(model, inputs[0])]
+    assert forward.entered.wait(timeout=5)
+    futures += [batcher.submit(model, input_tensor) for input_tensor in inputs[1:]]
+    forward.release.set()
+    return inputs, [future.result(timeout=5) for future in futures]
+
+def test_batches_are_capped_by_total_rows():
+    """多列請求依列數計算，合併的總列數不超過上限，結果仍交回對應的請求"""
+    forward = RecordingForward()
+    batcher = MicroBatcher("test", max_batch_rows=8, max_wait_ms=0, run_batch=forward)
+
+    inputs, results = submit_all(batcher, forward, [1, 4, 4, 4, 1, 1])
+
+    assert max(forward.batch_rows) <= 8
+    assert sum(forward.batch_rows) == 15
+    for input_tensor, result in zip(inputs, results):
+        assert result.shape[0] == input_tensor.shape[0]
+        assert torch.equal(result.flatten(), input_tensor.flatten())
+    assert batcher.stats()["largest_batch_rows"] <= 8
+
+def test_oversized_request_runs_alone():
+    """本身列數已超過上限的請求（如 9 個餐盤區塊）單獨推論，不與其他請求合併"""
+    forward = RecordingForward()
+    batcher = MicroBatcher("test", max_batch_rows=8, max_wait_ms=0, run_batch=forward)
+
+    inputs, results = submit_all(batcher, forward, [1, 9, 2, 2])
+
+    assert 9 in forward.batch_rows
+    assert sorted(forward.batch_rows) == [1, 4, 9]
+    for input_tensor, result in zip(inputs, results):
+        assert torch.equal(result.flatten(), input_tensor.flatten())
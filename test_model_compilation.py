@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# 模型編譯測試：依延遲選擇凍結或 channels-last 版本、輸出差異過大的版本不採用、依檢查點指紋快取
+
+import pytest
+
+torch = pytest.importorskip("torch")
+
+import food_recognition
+import model_compilation
+from model_compilation import CompiledModelCache, OPTIMIZED_SUFFIX, compile_model
+
+INPUT_SIZE = 32
+
+class TinyConvNet(torch.nn.Module):
+    """卷積、BatchNorm 加分類層的小型模型"""
+
+    def __init__(self):
+        super().__init__()
+        self.conv = torch.nn.Conv2d(3, 8, 3, padding=1)
+        self.bn = torch.nn.BatchNorm2d(8)
+        self.fc = torch.nn.Linear(8, 5)
+
+    def forward(self, input_tensor):
+        return self.fc(torch.relu(self.bn(self.conv(input_tensor))).mean(dim=(2, 3)))
+
+@pytest.fixture
+def latencies(monkeypatch):
+    """依量測順序（eager、各候選版本）返回指定延遲的計時函數"""
+    planned = {}
+    order = []
+
+    def time_forward(model, example_input, repeats):
+        order.append(model)
+        return planned["values"][len(order) - 1]
+
+    monkeypatch.setattr(model_compilation, "_time_forward", time_forward)
+    return planned
+
+def test_cnn_selects_fastest_channels_last_variant(latencies):
+    """卷積網路另外嘗試 channels-last，採用輸出一致且最快的版本"""
+    # 量測順序：eager、frozen、frozen+optimized、channels_last、channels_last+optimized
+    latencies["values"] = [10.0, 8.0, 7.0, 5.0, 6.0]
+    torch.manual_seed(0)
+    model = TinyConvNet().eval()
+
+    compiled, variant, measured = compile_model(model, "resnet_tiny", INPUT_SIZE)
+
+    assert variant == "channels_last"
+    assert list(measured) == ["eager", "frozen", "frozen" + OPTIMIZED_SUFFIX,
+                              "channels_last", "channels_last" + OPTIMIZED_SUFFIX]
+    input_tensor = torch.rand(2, 3, INPUT_SIZE, INPUT_SIZE)
+    with torch.inference_mode():
+        assert torch.allclose(compiled(input_tensor), model(input_tensor), atol=1e-4)
+
+def test_transformer_skips_channels_last(latencies):
+    """Transformer 系列不嘗試 channels-last"""
+    latencies["values"] = [10.0, 9.0, 4.0]
+
+    _, variant, measured = compile_model(TinyConvNet().eval(), "vit_tiny", INPUT_SIZE)
+
+    assert variant == "frozen" + OPTIMIZED_SUFFIX
+    assert list(measured) == ["eager", "frozen", "frozen" + OPTIMIZED_SUFFIX]
+
+def test_variant_with_different_outputs_is_rejected(latencies, monkeypatch):
+    """最佳化後輸出差異超過 MAX_OUTPUT_DIFFERENCE 的版本即使較快也不採用"""
+    latencies["values"] = [10.0, 9.0, 8.0]
+
+    class Shifted(torch.nn.Module):
+        def __init__(self, model):
+            super().__init__()
+            self.model = model
+
+        def forward(self, input_tensor):
+            return self.model(input_tensor) + 1.0
+
+    monkeypatch.setattr(model_compilation, "apply_inference_optimization", lambda model, variant: Shifted(model))
+
+    _, variant, measured = compile_model(TinyConvNet().eval(), "vit_tiny", INPUT_SIZE)
+
+    assert variant == "frozen"
+    assert "frozen" + OPTIMIZED_SUFFIX not in measured
+
+def test_compiled_model_is_cached_by_fingerprint(monkeypatch, tmp_path):
+    """編譯結果與採用的版本依指紋寫入快取，之後直接載入不再由檢查點建立模型"""
+    torch.manual_seed(0)
+    model = TinyConvNet().eval()
+    loads = []
+
+    def load_checkpoint(model_name, model_path=None):
+        loads.append(model_name)
+        return model
+
+    monkeypatch.setattr(food_recognition, "_compiled_model_cache", CompiledModelCache(str(tmp_path)))
+    monkeypatch.setattr(food_recognition, "_load_model_from_checkpoint", load_checkpoint)
+    monkeypatch.setattr(food_recognition, "get_model_input_size", lambda model_name=None: INPUT_SIZE)
+    monkeypatch.setattr(food_recognition.MODEL_STORE, "fingerprint", lambda model_name: "0123456789abcdef")
+
+    first = food_recognition.load_compiled_model("resnet_tiny")
+    cached = food_recognition.load_compiled_model("resnet_tiny")
+
+    assert loads == ["resnet_tiny"]
+    assert [path.name for path in tmp_path.iterdir()] == ["resnet_tiny.compiled.0123456789ab.pt"]
+    assert isinstance(cached, torch.jit.ScriptModule)
+    input_tensor = torch.rand(1, 3, INPUT_SIZE, INPUT_SIZE)
+    with torch.inference_mode():
+        expected = model(input_tensor)
+        assert torch.allclose(first(input_tensor), expected, atol=1e-4)
+        assert torch.allclose(cached(input_tensor), expected, atol=1e-4)
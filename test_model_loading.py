@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# load_model 的單次載入（single-flight）與失敗退避測試
+
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+import food_recognition
+from model_registry import ModelRegistry
+
+@pytest.fixture
+def fresh_registry(monkeypatch):
+    """每個測試使用空的註冊表與載入鎖，不影響其他測試"""
+    if not food_recognition.TORCH_AVAILABLE:
+        pytest.skip("PyTorch 不可用，load_model 一律使用模擬模式")
+    registry = ModelRegistry(retry_backoff=60)
+    monkeypatch.setattr(food_recognition, "_model_registry", registry)
+    monkeypatch.setattr(food_recognition, "_model_load_locks", {})
+    return registry
+
+def test_concurrent_callers_share_one_load(fresh_registry, monkeypatch):
+    """N 個執行緒同時要求同一個未載入的模型，只執行一次載入並取得同一個模型"""
+    load_calls = []
+
+    def slow_load(model_name, model_path=None):
+        load_calls.append(model_name)
+        time.sleep(0.2)
+        return SimpleNamespace(model_bytes=1)
+
+    monkeypatch.setattr(food_recognition, "_load_model_from_checkpoint", slow_load)
+
+    start = threading.Barrier(8)
+    results = []
+
+    def worker():
+        start.wait()
+        results.append(food_recognition.load_model("shared_model", backend="torch"))
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert load_calls == ["shared_model"]
+    assert len(results) == 8
+    assert all(result is results[0] for result in results)
+
+def test_different_models_load_in_parallel(fresh_registry, monkeypatch):
+    """載入鎖以模型為單位，不同模型的載入不互相等待"""
+    in_progress, overlap = set(), []
+    lock = threading.Lock()
+
+    def slow_load(model_name, model_path=None):
+        with lock:
+            in_progress.add(model_name)
+            overlap.append(len(in_progress))
+        time.sleep(0.2)
+        with lock:
+            in_progress.discard(model_name)
+        return SimpleNamespace(model_bytes=1)
+
+    monkeypatch.setattr(food_recognition, "_load_model_from_checkpoint", slow_load)
+
+    threads = [threading.Thread(target=food_recognition.load_model, args=(name,), kwargs={"backend": "torch"})
+               for name in ("model_a", "model_b")]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert max(overlap) == 2
+
+def test_failed_load_is_not_retried_during_backoff(fresh_registry, monkeypatch):
+    """載入失敗的模型在等待期間直接返回 None，並行的呼叫者也只觸發一次載入"""
+    load_calls = []
+
+    def failing_load(model_name, model_path=None):
+        load_calls.append(model_name)
+        time.sleep(0.1)
+        food_recognition._record_load_error(model_name, "模型檔案不存在")
+        return None
+
+    monkeypatch.setattr(food_recognition, "_load_model_from_checkpoint", failing_load)
+
+    threads = [threading.Thread(target=food_recognition.load_model, args=("missing_model",),
+                                kwargs={"backend": "torch"}) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert food_recognition.load_model("missing_model", backend="torch") is None
+    assert load_calls == ["missing_model"]
+    assert fresh_registry.failures()["missing_model"]["reason"] == "模型檔案不存在"
+
+def test_concurrent_backend_failures_keep_their_own_reason(fresh_registry, monkeypatch):
+    """同一模型的兩個後端同時載入失敗時，各自的失敗原因不互相覆寫或清除"""
+    both_recorded = threading.Barrier(2)
+
+    def failing_loader(reason):
+        def load(model_name, model_path=None):
+            food_recognition._record_load_error(model_name, reason)
+            # 兩個後端都記錄失敗原因後才返回，確保兩次載入重疊
+            both_recorded.wait(timeout=5)
+            return None
+        return load
+
+    monkeypatch.setattr(food_recognition, "_load_model_from_checkpoint", failing_loader("PyTorch 檢查點損毀"))
+    monkeypatch.setattr(food_recognition, "load_quantized_model", failing_loader("量化失敗"))
+
+    threads = [threading.Thread(target=food_recognition.load_model, args=("shared_model",), kwargs={"backend": backend})
+               for backend in ("torch", "int8")]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    failures = fresh_registry.failures()
+    assert failures["shared_model"]["reason"] == "PyTorch 檢查點損毀"
+    assert failures["shared_model@int8"]["reason"] == "量化失敗"
+    assert food_recognition._model_load_errors == {}
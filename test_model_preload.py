@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# 背景預載測試：載入狀態與就緒事件、MODEL_READY_TIMEOUT 逾時與載入失敗時的模擬模式
+
+import threading
+
+import pytest
+from PIL import Image
+
+torch = pytest.importorskip("torch")
+
+import food_recognition
+from model_registry import ModelRegistry
+
+class ConstantModel(torch.nn.Module):
+    """固定預測第一個訓練標籤的模型"""
+
+    def forward(self, input_tensor):
+        logits = torch.zeros(input_tensor.shape[0], len(food_recognition.TRAINING_LABELS))
+        logits[:, 0] = 10.0
+        return logits
+
+@pytest.fixture
+def preload_env(monkeypatch):
+    """空的註冊表與預載狀態；載入函數在 release 事件設定前不會完成"""
+    release = threading.Event()
+    load_calls = []
+
+    def gated_load(model_name, model_path=None):
+        load_calls.append(model_name)
+        assert release.wait(10)
+        return None if model_name == "broken_model" else ConstantModel().eval()
+
+    monkeypatch.setattr(food_recognition, "_model_registry", ModelRegistry(retry_backoff=60))
+    monkeypatch.setattr(food_recognition, "_model_load_locks", {})
+    monkeypatch.setattr(food_recognition, "_model_load_status", {})
+    monkeypatch.setattr(food_recognition, "_model_ready_events", {})
+    monkeypatch.setattr(food_recognition, "_preload_executor", None)
+    monkeypatch.setattr(food_recognition, "_load_model_from_checkpoint", gated_load)
+    monkeypatch.setattr(food_recognition, "MODEL_BACKEND", "torch")
+    monkeypatch.setattr(food_recognition, "MODEL_READY_TIMEOUT", 0.05)
+    yield release, load_calls
+
+    release.set()
+    if food_recognition._preload_executor is not None:
+        food_recognition._preload_executor.shutdown(wait=True)
+
+def test_request_times_out_while_model_is_loading(preload_env):
+    """背景載入中的模型最多等待 MODEL_READY_TIMEOUT 秒，逾時回報載入中而不重複載入"""
+    release, load_calls = preload_env
+    image = Image.new("RGB", (64, 64), (200, 120, 40))
+
+    food_recognition.preload_models(["slow_model"], max_workers=1)
+    assert food_recognition.wait_for_model_ready("slow_model", timeout=0.05) is False
+    assert food_recognition.get_model_load_status()["slow_model"] in (
+        food_recognition.MODEL_STATUS_PENDING, food_recognition.MODEL_STATUS_LOADING)
+    with pytest.raises(TimeoutError, match="仍在背景載入中"):
+        food_recognition.compute_model_logits(image, "slow_model")
+
+    release.set()
+    assert food_recognition.wait_for_model_ready("slow_model", timeout=5)
+    logits, is_ai = food_recognition.compute_model_logits(image, "slow_model")
+
+    assert is_ai and int(logits.argmax()) == 0
+    assert food_recognition.get_model_load_status()["slow_model"] == food_recognition.MODEL_STATUS_READY
+    assert load_calls == ["slow_model"]
+
+def test_failed_preload_marks_ready_and_uses_mock(preload_env):
+    """載入失敗的模型同樣標示完成，請求不必等待逾時而直接使用模擬模式"""
+    release, _ = preload_env
+    release.set()
+
+    food_recognition.preload_models(["broken_model"], max_workers=1)
+    assert food_recognition.wait_for_model_ready("broken_model", timeout=5)
+    _, is_ai = food_recognition.compute_model_logits(Image.new("RGB", (64, 64)), "broken_model")
+
+    assert not is_ai
+    assert food_recognition.get_model_load_status()["broken_model"] == food_recognition.MODEL_STATUS_FAILED
+
+def test_preload_schedules_each_model_once(preload_env):
+    """重複呼叫預載不重複排程；未排入預載的模型不需等待"""
+    release, load_calls = preload_env
+    food_recognition.preload_models(["slow_model"], max_workers=1)
+    food_recognition.preload_models(["slow_model"], max_workers=1)
+    release.set()
+
+    assert food_recognition.wait_for_model_ready("slow_model", timeout=5)
+    food_recognition._preload_executor.shutdown(wait=True)
+    assert load_calls == ["slow_model"]
+    assert food_recognition.wait_for_model_ready("unscheduled_model", timeout=0) is True
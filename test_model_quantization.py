@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# int8 量化測試：需要靜態量化的卷積網路沒有校正圖片時不量化，並在量化報告中列為略過
+
+import pytest
+from PIL import Image
+
+torch = pytest.importorskip("torch")
+
+import food_recognition
+import model_quantization
+from model_quantization import QuantizedModelCache, quantize_model, requires_calibration
+from model_registry import measure_model_bytes
+
+INPUT_SIZE = 32
+
+class TinyConvNet(torch.nn.Module):
+    """卷積加分類層的小型模型，可靜態或動態量化"""
+
+    def __init__(self):
+        super().__init__()
+        self.conv = torch.nn.Conv2d(3, 4, 3, padding=1)
+        self.pool = torch.nn.AdaptiveAvgPool2d(1)
+        self.fc = torch.nn.Linear(4, len(food_recognition.TRAINING_LABELS))
+
+    def forward(self, input_tensor):
+        return self.fc(torch.flatten(self.pool(torch.relu(self.conv(input_tensor))), 1))
+
+@pytest.fixture
+def quantization_env(monkeypatch, tmp_path):
+    """空的校正目錄與量化快取目錄，模型由 TinyConvNet 取代"""
+    calibration_dir = tmp_path / "calibration"
+    calibration_dir.mkdir()
+    models = {}
+
+    def load_checkpoint(model_name, model_path=None):
+        return models.setdefault(model_name, TinyConvNet().eval())
+
+    monkeypatch.setattr(food_recognition, "QUANTIZATION_CALIBRATION_DIR", str(calibration_dir))
+    monkeypatch.setattr(food_recognition, "_quantized_model_cache", QuantizedModelCache(str(tmp_path / "int8")))
+    monkeypatch.setattr(food_recognition, "_load_model_from_checkpoint", load_checkpoint)
+    monkeypatch.setattr(food_recognition, "get_model_input_size", lambda model_name=None: INPUT_SIZE)
+    monkeypatch.setattr(food_recognition.MODEL_STORE, "fingerprint", lambda model_name: "0123456789abcdef")
+    return calibration_dir, tmp_path / "int8", models
+
+def add_images(directory, names):
+    """在目錄中建立純色的樣本圖片"""
+    for idx, name in enumerate(names):
+        Image.new("RGB", (48, 48), (40 * idx, 120, 200 - 30 * idx)).save(directory / name)
+
+def test_static_families_require_calibration():
+    """ResNet、DenseNet、VGG 需要校正圖片，沒有校正輸入時拒絕量化"""
+    assert requires_calibration("resnet50_78") and requires_calibration("densenet_86")
+    assert not requires_calibration("vit_base") and not requires_calibration("swinv2_tiny")
+    with pytest.raises(ValueError, match="校正圖片"):
+        quantize_model(TinyConvNet().eval(), "resnet_tiny", INPUT_SIZE, [])
+
+def test_cnn_without_calibration_keeps_fp32(quantization_env):
+    """沒有校正圖片時卷積網路不量化，返回 fp32 模型且不寫入量化快取"""
+    _, cache_dir, models = quantization_env
+
+    model = food_recognition.load_quantized_model("resnet_tiny")
+
+    assert model is models["resnet_tiny"]
+    assert not cache_dir.exists()
+
+def test_cnn_with_calibration_is_statically_quantized(quantization_env):
+    """有校正圖片時卷積網路靜態量化並寫入快取"""
+    calibration_dir, cache_dir, _ = quantization_env
+    add_images(calibration_dir, ["a.png", "b.png"])
+
+    model = food_recognition.load_quantized_model("resnet_tiny")
+
+    assert isinstance(model, torch.jit.ScriptModule)
+    assert [path.name for path in cache_dir.iterdir()] == ["resnet_tiny.int8.0123456789ab.pt"]
+    assert model(torch.rand(1, 3, INPUT_SIZE, INPUT_SIZE)).shape == (1, len(food_recognition.TRAINING_LABELS))
+
+def test_report_lists_skipped_models(quantization_env, tmp_path):
+    """量化報告列出因缺少校正圖片而略過的模型，動態量化的模型照常比較"""
+    image_dir = tmp_path / "images"
+    image_dir.mkdir()
+    add_images(image_dir, ["Corn.jpg", "Potato.jpg"])
+
+    report = model_quantization.build_quantization_report(["resnet_tiny", "vit_tiny"], str(image_dir), repeats=1)
+
+    assert report[0]["模型"] == "resnet_tiny"
+    assert report[0]["量化方式"] == "略過"
+    assert "QUANTIZATION_CALIBRATION_DIR" in report[0]["說明"]
+    assert report[1]["模型"] == "vit_tiny"
+    assert report[1]["量化方式"] == "dynamic"
+    assert report[1]["top-1 一致率"].endswith("/2")
+
+def test_quantized_model_size_without_serializing(quantization_env, monkeypatch):
+    """凍結的量化模型以量化後的權重或快取檔案大小計算記憶體佔用，不重新序列化模型"""
+    calibration_dir, cache_dir, _ = quantization_env
+    add_images(calibration_dir, ["a.png"])
+
+    def save_to_buffer(self):
+        raise AssertionError("不應序列化模型來計算大小")
+
+    monkeypatch.setattr(torch.jit.ScriptModule, "save_to_buffer", save_to_buffer, raising=False)
+
+    quantized = food_recognition.load_quantized_model("resnet_tiny")
+    fp32_bytes = measure_model_bytes(TinyConvNet())
+    assert 0 < measure_model_bytes(quantized) < fp32_bytes
+
+    monkeypatch.setattr(food_recognition, "_quantized_model_cache", QuantizedModelCache(str(cache_dir)))
+    cached = food_recognition.load_quantized_model("resnet_tiny")
+    assert measure_model_bytes(cached) == (cache_dir / "resnet_tiny.int8.0123456789ab.pt").stat().st_size
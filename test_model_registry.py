@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# 模型註冊表的記憶體預算與 LRU 釋放測試
+
+from types import SimpleNamespace
+
+import pytest
+
+from model_registry import ModelRegistry, measure_model_bytes
+
+MB = 1024 ** 2
+
+def fake_model(size_mb: int):
+    """以 model_bytes 提供佔用大小的假模型（與 ONNX Runtime 模型相同的介面）"""
+    return SimpleNamespace(model_bytes=size_mb * MB)
+
+def test_budget_evicts_least_recently_used_first():
+    """超出預算時依最久未使用的順序釋放，最近使用過的模型保留"""
+    registry = ModelRegistry(budget_bytes=300 * MB)
+    registry.put("a", fake_model(100))
+    registry.put("b", fake_model(100))
+    registry.put("c", fake_model(100))
+
+    # 使用 a 後，b 成為最久未使用的模型
+    assert registry.get("a") is not None
+    registry.put("d", fake_model(100))
+
+    assert "b" not in registry
+    assert all(name in registry for name in ("a", "c", "d"))
+    assert registry.evictions == 1
+    assert registry.resident_bytes() == 300 * MB
+
+def test_eviction_frees_only_what_is_needed():
+    """較大的新模型依 LRU 順序釋放到足以容納為止"""
+    registry = ModelRegistry(budget_bytes=300 * MB)
+    for name in ("a", "b", "c"):
+        registry.put(name, fake_model(100))
+
+    registry.put("big", fake_model(200))
+
+    assert registry.stats()["resident_models"] == ["c", "big"]
+    assert registry.evictions == 2
+
+def test_pinned_models_survive_eviction():
+    """固定的模型（包含其他後端的「名稱@後端」鍵）不會被釋放，改為釋放其他模型"""
+    registry = ModelRegistry(budget_bytes=300 * MB, pinned_models=["a"])
+    registry.put("a", fake_model(100))
+    registry.put("a@onnx", fake_model(100))
+    registry.put("b", fake_model(100))
+
+    registry.put("c", fake_model(100))
+
+    assert "a" in registry and "a@onnx" in registry
+    assert "b" not in registry and "c" in registry
+
+def test_model_over_budget_is_kept_when_nothing_can_be_freed():
+    """只剩固定模型時，超出預算的新模型仍保留以完成辨識"""
+    registry = ModelRegistry(budget_bytes=150 * MB, pinned_models=["a"])
+    registry.put("a", fake_model(100))
+    registry.put("b", fake_model(100))
+
+    assert "a" in registry and "b" in registry
+    assert registry.resident_bytes() == 200 * MB
+
+def test_unlimited_budget_never_evicts():
+    """預算為 0 時不限制常駐模型"""
+    registry = ModelRegistry(budget_bytes=0)
+    for index in range(10):
+        registry.put(f"m{index}", fake_model(1000))
+    assert registry.evictions == 0
+    assert len(registry.stats()["resident_models"]) == 10
+
+def test_hit_and_miss_counters():
+    """命中與未命中次數；record_stats=False 的重複檢查不計入"""
+    registry = ModelRegistry()
+    registry.put("a", fake_model(1))
+    registry.get("a")
+    registry.get("missing")
+    registry.get("missing", record_stats=False)
+    assert (registry.hits, registry.misses) == (1, 1)
+
+class FakeClock:
+    """取代 time.time 的可控時鐘"""
+
+    def __init__(self, now: float = 1000.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+def test_failed_load_blocks_retry_until_backoff_expires(monkeypatch):
+    """載入失敗後等待期間不允許重試，等待期過後允許再次嘗試"""
+    clock = FakeClock()
+    monkeypatch.setattr("model_registry.time.time", clock)
+    registry = ModelRegistry(retry_backoff=60, max_retry_backoff=3600)
+
+    failure = registry.record_failure("a", "模型檔案不存在")
+    assert failure["attempts"] == 1
+    assert failure["retry_at"] == clock.now + 60
+
+    clock.now += 59
+    assert registry.get_failure("a")["reason"] == "模型檔案不存在"
+    assert registry.skipped_loads == 1
+
+    clock.now += 1
+    assert registry.get_failure("a") is None
+    # 等待期已過的失敗記錄仍保留，用於下次失敗時加倍等待時間
+    assert "a" in registry.failures()
+
+def test_retry_delay_doubles_up_to_the_maximum(monkeypatch):
+    """連續失敗時等待時間加倍，且不超過上限"""
+    clock = FakeClock()
+    monkeypatch.setattr("model_registry.time.time", clock)
+    registry = ModelRegistry(retry_backoff=60, max_retry_backoff=200)
+
+    delays = []
+    for _ in range(4):
+        failure = registry.record_failure("a", "載入失敗")
+        delays.append(failure["retry_at"] - clock.now)
+    assert delays == [60, 120, 200, 200]
+    assert registry.failed_loads == 4
+
+def test_successful_load_clears_failure(monkeypatch):
+    """模型成功載入後清除失敗記錄，之後的失敗重新由首次等待時間計算"""
+    clock = FakeClock()
+    monkeypatch.setattr("model_registry.time.time", clock)
+    registry = ModelRegistry(retry_backoff=60)
+
+    registry.record_failure("a", "載入失敗")
+    registry.record_failure("a", "載入失敗")
+    clock.now += 1000
+    registry.put("a", fake_model(1))
+
+    assert registry.failures() == {}
+    assert registry.record_failure("a", "載入失敗")["attempts"] == 1
+
+def test_failures_are_tracked_per_model(monkeypatch):
+    """不同模型（與後端）的失敗記錄互不影響"""
+    monkeypatch.setattr("model_registry.time.time", FakeClock())
+    registry = ModelRegistry(retry_backoff=60)
+
+    registry.record_failure("a@onnx", "匯出失敗")
+    assert registry.get_failure("a@onnx") is not None
+    assert registry.get_failure("a") is None
+
+def test_measure_model_bytes_sums_parameters_and_buffers():
+    """PyTorch 模型以參數與緩衝區的實際位元組數計算（依各自的精度）"""
+    torch = pytest.importorskip("torch")
+    model = torch.nn.Sequential(torch.nn.Linear(10, 20), torch.nn.BatchNorm1d(20)).to(torch.bfloat16)
+
+    # Linear 220 個 bf16 參數、BatchNorm 40 個 bf16 參數與 40 個 bf16 統計量及 1 個 int64 計數
+    assert measure_model_bytes(model) == (220 + 40 + 40) * 2 + 8
+    assert measure_model_bytes(fake_model(3)) == 3 * MB
@@ -0,0 +1,222 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# 標準化檢查點測試：manifest 記錄與載入、記憶體映射載入時 fp32 權重應直接指向映射的檔案，不複製到程序私有記憶體
+
+import os
+
+import pytest
+
+torch = pytest.importorskip("torch")
+timm = pytest.importorskip("timm")
+
+import model_store
+from model_store import ModelStore, file_sha256
+
+MODEL_NAME = "tiny_model"
+
+def mapped_ranges(path: str):
+    """目前程序中映射指定檔案的位址範圍（讀取 /proc/self/maps）"""
+    real_path = os.path.realpath(path)
+    ranges = []
+    with open("/proc/self/maps") as maps:
+        for line in maps:
+            fields = line.split()
+            if len(fields) >= 6 and fields[5] == real_path:
+                start, end = (int(address, 16) for address in fields[0].split("-"))
+                ranges.append((start, end))
+    return ranges
+
+def points_into(tensor, ranges) -> bool:
+    """tensor 的資料是否位於映射的檔案範圍內"""
+    address = tensor.data_ptr()
+    return any(start <= address < end for start, end in ranges)
+
+def convert_tiny_model(tmp_path, dtype: str, model=None, **store_options) -> ModelStore:
+    """以小型 timm 模型（或指定的模型）建立標準化檢查點"""
+    source_dir = tmp_path / "source"
+    source_dir.mkdir()
+    (source_dir / f"{MODEL_NAME}.pth").write_bytes(b"placeholder")
+
+    store = ModelStore(str(tmp_path / "canonical"), source_dir=str(source_dir), **store_options)
+    if model is None:
+        model = timm.create_model("test_resnet", pretrained=False, num_classes=5).eval()
+    store.convert(MODEL_NAME, model, input_size=160, dtype=dtype)
+    return store
+
+@pytest.fixture(autouse=True)
+def require_proc_maps():
+    if not os.path.exists("/proc/self/maps"):
+        pytest.skip("需要 /proc/self/maps 檢查記憶體映射")
+
+def test_fp32_parameters_point_into_mapped_file(tmp_path):
+    """fp32 儲存並以記憶體映射載入時，所有浮點參數都直接指向映射的檢查點檔案"""
+    store = convert_tiny_model(tmp_path, "fp32", mmap=True)
+    model = store.load(MODEL_NAME)
+    assert model is not None
+
+    ranges = mapped_ranges(store.checkpoint_path(store.entry(MODEL_NAME)))
+    assert ranges, "檢查點檔案沒有被映射"
+    parameters = [parameter for parameter in model.parameters() if parameter.is_floating_point()]
+    assert parameters and all(parameter.dtype == torch.float32 for parameter in parameters)
+    assert all(points_into(parameter, ranges) for parameter in parameters)
+
+def test_half_precision_upcast_copies_and_warns(tmp_path, capsys):
+    """fp16 儲存以 fp32 推論時權重被複製出映射的檔案，並顯示記憶體映射失效的警告"""
+    store = convert_tiny_model(tmp_path, "fp16", mmap=True, compute_dtype="fp32")
+    model = store.load(MODEL_NAME)
+    assert model is not None
+
+    output = capsys.readouterr().out
+    assert "記憶體映射的共用失效" in output
+    assert "記憶體映射後複製" in output
+
+    ranges = mapped_ranges(store.checkpoint_path(store.entry(MODEL_NAME)))
+    assert all(parameter.dtype == torch.float32 for parameter in model.parameters())
+    assert not any(points_into(parameter, ranges) for parameter in model.parameters())
+
+def test_manifest_records_and_rebuilds_the_model(tmp_path):
+    """manifest 記錄架構、類別數、輸入尺寸與檔案雜湊，重新讀取 manifest 後建立的模型輸出與原模型相同"""
+    torch.manual_seed(0)
+    original = timm.create_model("test_resnet", pretrained=False, num_classes=5).eval()
+    store = convert_tiny_model(tmp_path, "fp32", model=original, mmap=False)
+
+    reopened = ModelStore(store.store_dir, source_dir=store.source_dir, mmap=False)
+    entry = reopened.entry(MODEL_NAME)
+    assert entry["architecture"] == {"library": "timm", "name": "test_resnet"}
+    assert (entry["num_classes"], entry["input_size"], entry["dtype"]) == (5, 160, "fp32")
+    assert entry["sha256"] == file_sha256(reopened.checkpoint_path(entry)) == reopened.fingerprint(MODEL_NAME)
+
+    model = reopened.load(MODEL_NAME)
+    input_tensor = torch.rand(2, 3, 160, 160)
+    with torch.no_grad():
+        assert torch.equal(model(input_tensor), original(input_tensor))
+
+def test_stale_or_truncated_checkpoints_are_not_used(tmp_path):
+    """原始檢查點在轉換後更新、或標準化檔案大小不符時沒有可用記錄，改由原始檢查點載入"""
+    store = convert_tiny_model(tmp_path, "fp32", mmap=False)
+    fingerprint = store.fingerprint(MODEL_NAME)
+
+    source_path = store.source_path(MODEL_NAME)
+    with open(source_path, "ab") as source:
+        source.write(b"updated")
+    assert store.entry(MODEL_NAME) is None
+    assert store.load(MODEL_NAME) is None
+    assert store.fingerprint(MODEL_NAME) != fingerprint
+
+    os.remove(source_path)
+    checkpoint_path = store.checkpoint_path(store.manifest["models"][MODEL_NAME])
+    assert store.entry(MODEL_NAME) is not None
+    with open(checkpoint_path, "r+b") as checkpoint:
+        checkpoint.truncate(os.path.getsize(checkpoint_path) - 1)
+    assert store.entry(MODEL_NAME) is None
+
+def test_load_model_prefers_the_manifest(tmp_path, monkeypatch):
+    """load_model 的預設路徑優先使用標準化檢查點，沒有可用記錄時才推測原始檢查點的格式"""
+    food_recognition = pytest.importorskip("food_recognition")
+    store = convert_tiny_model(tmp_path, "fp32", mmap=True)
+    source_loads = []
+
+    def load_from_source(model_name, model_path=None):
+        source_loads.append(model_name)
+        return None
+
+    monkeypatch.setattr(food_recognition, "MODEL_STORE", store)
+    monkeypatch.setattr(food_recognition, "_load_model_from_source", load_from_source)
+
+    model = food_recognition._load_model_from_checkpoint(MODEL_NAME)
+    assert model is not None and source_loads == []
+    assert food_recognition.get_model_input_size(MODEL_NAME) == 160
+
+    assert food_recognition._load_model_from_checkpoint("unconverted_model") is None
+    assert source_loads == ["unconverted_model"]
+
+class IndexedNet(torch.nn.Module):
+    """含有不存於 state_dict 的緩衝區（如 Swin 的相對位置索引）的模型，無法在 meta 設備上建立"""
+
+    def __init__(self, num_classes: int = 5):
+        super().__init__()
+        self.pretrained_cfg = {"architecture": "indexed_net"}
+        self.num_classes = num_classes
+        self.conv = torch.nn.Conv2d(3, 8, 3)
+        self.fc = torch.nn.Linear(8, num_classes)
+        self.register_buffer("channel_index", torch.arange(8).flip(0), persistent=False)
+
+    def forward(self, input_tensor):
+        features = self.conv(input_tensor).mean(dim=(2, 3))
+        return self.fc(features[:, self.channel_index])
+
+def test_buffers_outside_state_dict_fall_back_to_cpu_build(tmp_path, monkeypatch):
+    """meta 設備上建立後仍有 meta 緩衝區的架構改在 CPU 上建立，權重仍直接指向映射的檔案"""
+    torch.manual_seed(0)
+    original = IndexedNet().eval()
+    monkeypatch.setattr(model_store, "build_architecture", lambda architecture, num_classes: IndexedNet(num_classes))
+    store = convert_tiny_model(tmp_path, "fp32", model=original, mmap=True)
+
+    model = store.load(MODEL_NAME)
+
+    assert not any(tensor.is_meta for tensor in list(model.parameters()) + list(model.buffers()))
+    assert torch.equal(model.channel_index, original.channel_index)
+    ranges = mapped_ranges(store.checkpoint_path(store.entry(MODEL_NAME)))
+    assert all(points_into(parameter, ranges) for parameter in model.parameters())
+    input_tensor = torch.rand(2, 3, 32, 32)
+    with torch.no_grad():
+        assert torch.equal(model(input_tensor), original(input_tensor))
+
+def test_full_read_assigns_weights_without_mapping(tmp_path):
+    """停用記憶體映射時完整讀取並直接指派權重，輸出與映射載入相同"""
+    store = convert_tiny_model(tmp_path, "fp32", mmap=False)
+    model = store.load(MODEL_NAME)
+
+    ranges = mapped_ranges(store.checkpoint_path(store.entry(MODEL_NAME)))
+    assert not any(points_into(parameter, ranges) for parameter in model.parameters())
+
+    mapped_model = ModelStore(store.store_dir, source_dir=store.source_dir, mmap=True).load(MODEL_NAME)
+    input_tensor = torch.rand(1, 3, 160, 160)
+    with torch.no_grad():
+        assert torch.equal(model(input_tensor), mapped_model(input_tensor))
+
+@pytest.mark.parametrize("dtype", ["fp16", "bf16"])
+def test_half_precision_round_trip(tmp_path, dtype):
+    """半精度儲存的檔案約為 fp32 的一半；載入轉回 fp32 的權重與原權重轉換精度後相同，整數緩衝區維持原型別"""
+    torch.manual_seed(0)
+    original = timm.create_model("test_resnet", pretrained=False, num_classes=5).eval()
+    (tmp_path / "fp32").mkdir()
+    (tmp_path / dtype).mkdir()
+    fp32_size = convert_tiny_model(tmp_path / "fp32", "fp32", model=original).entry(MODEL_NAME)["file_size"]
+    store = convert_tiny_model(tmp_path / dtype, dtype, model=original, mmap=True, compute_dtype="fp32")
+
+    entry = store.entry(MODEL_NAME)
+    assert entry["dtype"] == dtype
+    assert entry["file_size"] < fp32_size * 0.6
+
+    model = store.load(MODEL_NAME)
+    storage_dtype = model_store._torch_dtype(dtype)
+    loaded, expected = model.state_dict(), original.state_dict()
+    for key, value in expected.items():
+        if value.is_floating_point():
+            assert loaded[key].dtype == torch.float32
+            assert torch.equal(loaded[key], value.to(storage_dtype).float()), key
+        else:
+            assert loaded[key].dtype == value.dtype and torch.equal(loaded[key], value), key
+
+    input_tensor = torch.rand(2, 3, 160, 160)
+    with torch.no_grad():
+        assert torch.allclose(model(input_tensor), original(input_tensor), rtol=0.05, atol=0.05)
+
+@pytest.mark.parametrize("supported", [True, False])
+def test_bf16_compute_keeps_mapped_weights_when_supported(tmp_path, monkeypatch, capsys, supported):
+    """bf16 儲存且設定 bf16 推論時，設備支援則直接以映射的 bf16 權重推論，不支援時轉回 fp32"""
+    monkeypatch.setattr(model_store, "bf16_supported", lambda device=None: supported)
+    store = convert_tiny_model(tmp_path, "bf16", mmap=True, compute_dtype="bf16")
+    assert "記憶體映射的共用將失效" not in capsys.readouterr().out
+
+    model = store.load(MODEL_NAME)
+
+    ranges = mapped_ranges(store.checkpoint_path(store.entry(MODEL_NAME)))
+    parameters = list(model.parameters())
+    if supported:
+        assert all(parameter.dtype == torch.bfloat16 for parameter in parameters)
+        assert all(points_into(parameter, ranges) for parameter in parameters)
+    else:
+        assert all(parameter.dtype == torch.float32 for parameter in parameters)
+        assert not any(points_into(parameter, ranges) for parameter in parameters)
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# 模型工作程序測試：共享緩衝區依模型輸入尺寸配置、多列輸入分段傳遞、後端傳遞與啟動時的載入回報
+
+import pytest
+
+torch = pytest.importorskip("torch")
+
+from model_workers import ModelWorkerPool
+
+BACKENDS = ("torch", "compiled", "int8", "onnx")
+
+class TinyModel(torch.nn.Module):
+    """輸出各通道平均、載入時的後端編號與輸入邊長，可驗證工作程序收到的輸入與後端"""
+
+    def __init__(self, backend: str):
+        super().__init__()
+        self.register_buffer("backend_code", torch.tensor(float(BACKENDS.index(backend or "torch"))))
+
+    def forward(self, input_tensor):
+        rows = input_tensor.shape[0]
+        return torch.cat([input_tensor.mean(dim=(2, 3)),
+                          self.backend_code.expand(rows, 1),
+                          torch.full((rows, 1), float(input_tensor.shape[-1]))], dim=1)
+
+def load_tiny_model(model_name, backend=None):
+    """工作程序內的載入函數（子程序以模組路徑導入）；missing_model 模擬載入失敗"""
+    if model_name == "missing_model":
+        return None
+    return TinyModel(backend).eval()
+
+@pytest.fixture(scope="module")
+def pool():
+    """兩個工作程序：一組 192 與 256 輸入的模型（含載入失敗的模型），一組 224 輸入的模型"""
+    worker_pool = ModelWorkerPool([["model_192", "model_256", "missing_model"], ["model_224"]], timeout=60,
+                                  input_sizes={"model_192": 192, "model_256": 256, "missing_model": 192},
+                                  max_rows=4, load_model=load_tiny_model)
+    worker_pool.start()
+    yield worker_pool
+    worker_pool.stop()
+
+def test_ready_is_received_at_startup(pool):
+    """啟動時即收到各工作程序的載入結果，載入失敗的模型不由工作程序負責"""
+    assert [worker.ready_models for worker in pool.workers] == [
+        {"model_192": True, "model_256": True, "missing_model": False}, {"model_224": True}]
+    assert pool.serves("model_192") and pool.serves("model_224")
+    assert not pool.serves("missing_model") and not pool.serves("unknown_model")
+
+def test_buffers_follow_model_input_sizes(pool):
+    """共享緩衝區依各程序模型的輸入尺寸配置（未指定的模型使用 224），列數為 max_rows"""
+    assert sorted(pool.workers[0].input_buffers) == [192, 256]
+    assert sorted(pool.workers[1].input_buffers) == [224]
+    assert pool.workers[0].input_buffers[256].shape == (4, 3, 256, 256)
+
+    outputs = pool.forward("model_256", torch.rand(1, 3, 256, 256))
+    assert outputs[0, -1].item() == 256
+    with pytest.raises(ValueError, match="不支援輸入尺寸"):
+        pool.forward("model_224", torch.rand(1, 3, 192, 192))
+
+@pytest.mark.parametrize("rows", [1, 4, 9])
+def test_multi_row_inputs_round_trip(pool, rows):
+    """多列輸入（超過緩衝區列數時分段）的各列結果與本地推論相同"""
+    input_tensor = torch.rand(rows, 3, 192, 192)
+    outputs = pool.forward("model_192", input_tensor)
+
+    with torch.inference_mode():
+        expected = TinyModel("torch")(input_tensor)
+    assert outputs.shape == (rows, 5)
+    assert torch.allclose(outputs, expected, atol=1e-6)
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_backend_is_passed_to_the_worker(pool, backend):
+    """推論請求附帶的後端傳給工作程序的載入函數"""
+    outputs = pool.remote_model("model_224", backend)(torch.rand(2, 3, 224, 224))
+    assert outputs[:, 3].tolist() == [float(BACKENDS.index(backend))] * 2
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# ONNX Runtime 後端測試：匯出結果與 PyTorch 相同、依檢查點指紋快取與重新匯出
+
+import pytest
+
+torch = pytest.importorskip("torch")
+pytest.importorskip("onnx")
+pytest.importorskip("onnxruntime")
+
+import food_recognition
+import onnx_backend
+from model_registry import measure_model_bytes
+from onnx_backend import OnnxModel, OnnxModelCache
+
+INPUT_SIZE = 32
+
+class TinyConvNet(torch.nn.Module):
+    """卷積加分類層的小型模型"""
+
+    def __init__(self):
+        super().__init__()
+        self.conv = torch.nn.Conv2d(3, 4, 3, padding=1)
+        self.fc = torch.nn.Linear(4, len(food_recognition.TRAINING_LABELS))
+
+    def forward(self, input_tensor):
+        return self.fc(torch.relu(self.conv(input_tensor)).mean(dim=(2, 3)))
+
+@pytest.fixture
+def onnx_env(monkeypatch, tmp_path):
+    """ONNX 快取目錄與可更換的檢查點指紋；記錄由 PyTorch 檢查點載入的次數"""
+    torch.manual_seed(0)
+    model = TinyConvNet().eval()
+    state = {"fingerprint": "0123456789abcdef", "loads": 0}
+
+    def load_checkpoint(model_name, model_path=None):
+        state["loads"] += 1
+        return model
+
+    monkeypatch.setattr(food_recognition, "_onnx_model_cache", OnnxModelCache(str(tmp_path)))
+    monkeypatch.setattr(food_recognition, "_load_model_from_checkpoint", load_checkpoint)
+    monkeypatch.setattr(food_recognition, "get_model_input_size", lambda model_name=None: INPUT_SIZE)
+    monkeypatch.setattr(food_recognition, "ONNX_INTRA_OP_THREADS", 1)
+    monkeypatch.setattr(food_recognition.MODEL_STORE, "fingerprint", lambda model_name: state["fingerprint"])
+    return model, state, tmp_path
+
+def test_exported_model_matches_pytorch(onnx_env):
+    """首次載入時匯出，ONNX Runtime 的輸出（包含動態批次維度）與 PyTorch 相同"""
+    model, state, cache_dir = onnx_env
+
+    onnx_model = food_recognition.load_onnx_model("tiny_model")
+
+    assert isinstance(onnx_model, OnnxModel)
+    assert [path.name for path in cache_dir.iterdir()] == ["tiny_model.0123456789ab.onnx"]
+    assert measure_model_bytes(onnx_model) == (cache_dir / "tiny_model.0123456789ab.onnx").stat().st_size
+    input_tensor = torch.rand(3, 3, INPUT_SIZE, INPUT_SIZE)
+    with torch.no_grad():
+        assert torch.allclose(onnx_model(input_tensor), model(input_tensor), atol=1e-5)
+
+def test_cached_export_is_reused_until_fingerprint_changes(onnx_env):
+    """相同指紋直接使用快取不載入 PyTorch 模型；指紋改變後重新匯出並移除舊檔案"""
+    _, state, cache_dir = onnx_env
+    food_recognition.load_onnx_model("tiny_model")
+    assert state["loads"] == 1
+
+    assert isinstance(food_recognition.load_onnx_model("tiny_model"), OnnxModel)
+    assert state["loads"] == 1
+
+    state["fingerprint"] = "fedcba9876543210"
+    assert isinstance(food_recognition.load_onnx_model("tiny_model"), OnnxModel)
+    assert state["loads"] == 2
+    assert [path.name for path in cache_dir.iterdir()] == ["tiny_model.fedcba987654.onnx"]
+
+def test_missing_onnxruntime_falls_back_to_pytorch(onnx_env, monkeypatch):
+    """未安裝 ONNX Runtime 時以 PyTorch 模型推論，不匯出"""
+    model, _, cache_dir = onnx_env
+    monkeypatch.setattr(onnx_backend, "onnxruntime_available", lambda: False)
+
+    assert food_recognition.load_onnx_model("tiny_model") is model
+    assert list(cache_dir.iterdir()) == []
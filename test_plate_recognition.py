@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# 餐盤多食物辨識的區域合併與快取測試
+
+import numpy as np
+import pytest
+from PIL import Image
+
+food_recognition = pytest.importorskip("food_recognition")
+from result_cache import ResultCache
+
+def fake_ensemble(label_for_tile):
+    """各區塊預測固定食物的假模型：label_for_tile(區塊索引) -> 訓練標籤索引"""
+    calls = []
+
+    def run_ensemble_models(image, model_names, input_tensors, backend=None, reduce_rows=True):
+        calls.append(image.size)
+        tiles = next(iter(input_tensors.values())).shape[0]
+        logits = np.zeros((tiles, len(food_recognition.TRAINING_LABELS)), dtype=np.float32)
+        for tile in range(tiles):
+            logits[tile, label_for_tile(tile)] = 20.0
+        return [(model_name, (logits, True)) for model_name in model_names]
+
+    return run_ensemble_models, calls
+
+@pytest.fixture
+def plate_env(monkeypatch):
+    cache = ResultCache(max_entries=8, max_hash_distance=4)
+    monkeypatch.setattr(food_recognition, "_result_cache", cache)
+    monkeypatch.setattr(food_recognition, "PLATE_GRID", 3)
+    monkeypatch.setattr(food_recognition, "PLATE_MIN_CONFIDENCE", 30)
+    return cache
+
+def test_tiles_merge_into_foods_with_regions(plate_env, monkeypatch):
+    """相同食物的區塊合併為一筆，區域為這些區塊的外接矩形"""
+    # 左欄三個區塊為食物 0，其餘為食物 1
+    run, _ = fake_ensemble(lambda tile: 0 if tile % 3 == 0 else 1)
+    monkeypatch.setattr(food_recognition, "run_ensemble_models", run)
+
+    image = Image.new("RGB", (900, 600), (180, 90, 30))
+    plate = food_recognition.classify_plate(image, ["model_a"])["🍱 餐盤辨識結果"]
+
+    first = food_recognition.FOOD_CATALOG.by_label_index(0).chinese
+    second = food_recognition.FOOD_CATALOG.by_label_index(1).chinese
+    assert plate["食物數"] == 2
+    assert plate["食物列表"][first]["區塊數"] == 3
+    assert plate["食物列表"][second]["區塊數"] == 6
+    assert plate["食物列表"][first]["區域"].startswith("(0, 0)-(")
+    assert plate["食物列表"][second]["區域"].endswith("-(900, 600)")
+
+def test_near_duplicate_hit_scales_regions_to_the_new_image(plate_env, monkeypatch):
+    """縮放後的副本由相近圖片快取命中時，區域依副本的尺寸換算"""
+    run, calls = fake_ensemble(lambda tile: 0)
+    monkeypatch.setattr(food_recognition, "run_ensemble_models", run)
+
+    image = Image.new("RGB", (1000, 712))
+    image.paste((220, 180, 40), (0, 0, 500, 712))
+    original = food_recognition.classify_plate(image, ["model_a"])["🍱 餐盤辨識結果"]
+    resized = food_recognition.classify_plate(image.resize((333, 237)), ["model_a"])["🍱 餐盤辨識結果"]
+
+    assert len(calls) == 1
+    assert plate_env.stats()["near_hits"] == 1
+    food = food_recognition.FOOD_CATALOG.by_label_index(0).chinese
+    assert original["食物列表"][food]["區域"] == "(0, 0)-(1000, 712)"
+    assert resized["食物列表"][food]["區域"] == "(0, 0)-(333, 237)"
+
+def test_missing_image_returns_plate_shaped_error():
+    """未上傳圖片時同樣以「🍱 餐盤辨識結果」包裝錯誤"""
+    assert food_recognition.classify_plate(None) == {"🍱 餐盤辨識結果": {"錯誤": "請上傳食物圖片"}}
+
+def test_tile_fusion_matches_per_tile_loop():
+    """[n_models, n_tiles, n_labels] 一次融合的結果與逐一區塊融合相同"""
+    rng = np.random.default_rng(0)
+    logits_stack = rng.normal(scale=4.0, size=(3, 9, len(food_recognition.TRAINING_LABELS))).astype(np.float32)
+    weights = np.array([1.0, 2.0, 0.5], dtype=np.float32)
+
+    _, fused = food_recognition.fuse_model_logits(logits_stack, weights)
+    expected = np.stack([food_recognition.fuse_model_logits(logits_stack[:, tile], weights)[1]
+                         for tile in range(logits_stack.shape[1])])
+
+    assert fused.shape == (9, len(food_recognition.TRAINING_LABELS))
+    np.testing.assert_allclose(fused, expected, rtol=1e-5, atol=1e-7)
+
+def test_mock_fallback_omits_regions(plate_env, monkeypatch):
+    """模擬模式的單列結果套用到所有區塊時不顯示區域，結果不快取"""
+    def run_ensemble_models(image, model_names, input_tensors, backend=None, reduce_rows=True):
+        return [(model_name, (food_recognition._logits_for_confidence(0, 0.9), False)) for model_name in model_names]
+
+    monkeypatch.setattr(food_recognition, "run_ensemble_models", run_ensemble_models)
+
+    plate = food_recognition.classify_plate(Image.new("RGB", (300, 300)), ["model_a"])["🍱 餐盤辨識結果"]
+
+    assert plate["模式"] == "模擬模式"
+    assert "說明" in plate
+    food = plate["食物列表"][food_recognition.FOOD_CATALOG.by_label_index(0).chinese]
+    assert "區域" not in food and "區域比例" not in food and "區塊數" not in food
+    assert len(plate_env) == 0
+
+def test_tiling_parameters_are_part_of_the_cache_key(plate_env, monkeypatch):
+    """切塊參數改變後同一張圖片重新辨識，不使用其他切塊方式的快取結果"""
+    run, calls = fake_ensemble(lambda tile: 0)
+    monkeypatch.setattr(food_recognition, "run_ensemble_models", run)
+    image = Image.new("RGB", (600, 600), (180, 90, 30))
+
+    food_recognition.classify_plate(image, ["model_a"])
+    food_recognition.classify_plate(image, ["model_a"])
+    monkeypatch.setattr(food_recognition, "PLATE_GRID", 2)
+    food_recognition.classify_plate(image, ["model_a"])
+    monkeypatch.setattr(food_recognition, "PLATE_TILE_OVERLAP", 0.5)
+    plate = food_recognition.classify_plate(image, ["model_a"])["🍱 餐盤辨識結果"]
+
+    assert len(calls) == 3
+    assert plate["區塊數"] == "4（2x2，重疊 50%）"
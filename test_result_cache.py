@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# 辨識結果快取的有效期限、LRU 移除與可快取結果判斷測試
+
+import pytest
+from PIL import Image
+
+from result_cache import NearDuplicateIndex, ResultCache
+
+class FakeClock:
+    """取代 time.time 的可控時鐘"""
+
+    def __init__(self, now: float = 1000.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake_clock = FakeClock()
+    monkeypatch.setattr("result_cache.time.time", fake_clock)
+    return fake_clock
+
+def key(name: str):
+    """與 get_result_cache_key 相同格式的快取鍵：(像素雜湊, 範圍, 後端)"""
+    return (name, "resnet50_78", "torch")
+
+def test_result_expires_after_ttl(clock):
+    """超過有效期限的結果視為未命中並移除"""
+    cache = ResultCache(max_entries=4, ttl_seconds=60)
+    cache.put(key("a"), {"辨識食物": "玉米"})
+
+    clock.now += 60
+    assert cache.get(key("a")) == {"辨識食物": "玉米"}
+
+    clock.now += 1
+    assert cache.get(key("a")) is None
+    stats = cache.stats()
+    assert (stats["expirations"], stats["entries"], stats["hits"], stats["misses"]) == (1, 0, 1, 1)
+
+def test_zero_ttl_never_expires(clock):
+    """有效期限為 0 時結果不過期"""
+    cache = ResultCache(max_entries=4, ttl_seconds=0)
+    cache.put(key("a"), {"辨識食物": "玉米"})
+    clock.now += 10 ** 9
+    assert cache.get(key("a")) is not None
+
+def test_evicts_least_recently_used(clock):
+    """超出上限時移除最久未使用的結果，讀取會更新使用順序"""
+    cache = ResultCache(max_entries=2, ttl_seconds=0)
+    cache.put(key("a"), {"辨識食物": "a"})
+    cache.put(key("b"), {"辨識食物": "b"})
+    cache.get(key("a"))
+
+    cache.put(key("c"), {"辨識食物": "c"})
+
+    assert cache.get(key("b")) is None
+    assert cache.get(key("a")) is not None
+    assert cache.get(key("c")) is not None
+    assert cache.stats()["evictions"] == 1
+
+def test_returns_copies(clock):
+    """呼叫端修改取得的結果不影響快取內容"""
+    cache = ResultCache(max_entries=2)
+    cache.put(key("a"), {"辨識食物": "玉米"})
+    cache.get(key("a"))["辨識食物"] = "已修改"
+    assert cache.get(key("a"))["辨識食物"] == "玉米"
+
+def test_disabled_cache_stores_nothing(clock):
+    """上限為 0 時停用快取"""
+    cache = ResultCache(max_entries=0)
+    cache.put(key("a"), {"辨識食物": "玉米"})
+    assert cache.get(key("a")) is None
+    assert len(cache) == 0
+
+def test_forwards_avoided_counts_hits(clock):
+    """命中時累計產生該結果所執行的模型推論次數"""
+    cache = ResultCache(max_entries=2)
+    cache.put(key("a"), {"辨識食物": "玉米"}, forwards=8)
+    cache.get(key("a"))
+    cache.get(key("a"))
+    assert cache.stats()["forwards_avoided"] == 16
+
+def test_near_hits_count_forwards_separately(clock):
+    """相近圖片命中省下的推論次數另外累計，不計入精確命中"""
+    cache = ResultCache(max_entries=2, max_hash_distance=2)
+    cache.put(key("a"), {"辨識食物": "玉米"}, phash=0b0000, forwards=8)
+    cache.get(key("a"))
+    cache.get(key("a2"), phash=0b0001)
+    cache.get(key("a3"), phash=0b0011)
+
+    stats = cache.stats()
+    assert (stats["hits"], stats["near_hits"]) == (1, 2)
+    assert (stats["forwards_avoided"], stats["near_forwards_avoided"]) == (8, 16)
+
+@pytest.mark.parametrize("result, cacheable", [
+    ({"辨識食物": "玉米", "模式": "AI模式"}, True),
+    ({"辨識食物": "玉米", "模式": "模擬模式"}, False),
+    ({"錯誤": "辨識過程發生錯誤"}, False),
+    ({"🎯 綜合辨識結果": {"最終辨識": "玉米"}, "📊 各模型詳細結果": {"vgg": {"錯誤信息": "載入失敗"}}}, False),
+    ({"🎯 綜合辨識結果": {"錯誤": "所有模型都無法成功辨識圖片"}}, False),
+    ({"🎯 綜合辨識結果": {"最終辨識": "玉米"}, "📊 各模型詳細結果": {"vgg": {"模式": "模擬模式"}}}, False),
+])
+def test_is_cacheable_result(result, cacheable):
+    """含錯誤或模擬模式（包含巢狀的各模型結果）的結果不快取"""
+    food_recognition = pytest.importorskip("food_recognition")
+    assert food_recognition.is_cacheable_result(result) is cacheable
+
+@pytest.mark.parametrize("outcome, stored", [("ai", 1), ("mock", 0), ("error", 0)])
+def test_mock_and_error_results_are_not_stored(monkeypatch, outcome, stored):
+    """單一模型辨識時，模擬模式與錯誤的結果不寫入快取，下次上傳同一張圖片重新辨識"""
+    food_recognition = pytest.importorskip("food_recognition")
+    cache = ResultCache(max_entries=8)
+    monkeypatch.setattr(food_recognition, "_result_cache", cache)
+
+    def compute_model_logits(image, model_name, **kwargs):
+        if outcome == "error":
+            raise RuntimeError("推論失敗")
+        return food_recognition._build_mock_logits(image), outcome == "ai"
+
+    monkeypatch.setattr(food_recognition, "compute_model_logits", compute_model_logits)
+
+    image = Image.new("RGB", (64, 64), (200, 120, 40))
+    result = food_recognition.classify_food_image(image, "resnet50_78", backend="torch", tta=False)
+    assert ("錯誤" in result) == (outcome == "error")
+    assert len(cache) == stored
+
+SCOPE = ("resnet50_78", "torch")
+
+def test_nearest_returns_closest_within_distance():
+    """以漢明距離尋找最接近的項目，超過距離上限時返回 None"""
+    index = NearDuplicateIndex(capacity=4)
+    index.add(0b0000, SCOPE, "zero")
+    index.add(0b1111, SCOPE, "four_bits")
+    index.add(0xFFFF_FFFF_FFFF_FFFF, SCOPE, "all_bits")
+
+    assert index.nearest(0b0001, SCOPE, max_distance=4) == ("zero", 1)
+    assert index.nearest(0b0111, SCOPE, max_distance=4) == ("four_bits", 1)
+    assert index.nearest(0xFFFF_FFFF_FFFF_FFF0, SCOPE, max_distance=4) == ("all_bits", 4)
+    assert index.nearest(0xFF00_0000_0000_0000, SCOPE, max_distance=4) is None
+
+def test_scopes_are_isolated():
+    """只與相同範圍（模型與後端）的項目比對"""
+    index = NearDuplicateIndex(capacity=4)
+    index.add(0b1010, ("resnet50_78", "torch"), "torch_key")
+    index.add(0b1010, ("resnet50_78", "onnx"), "onnx_key")
+
+    assert index.nearest(0b1010, ("resnet50_78", "onnx"), max_distance=0) == ("onnx_key", 0)
+    assert index.nearest(0b1010, ("densenet_86", "torch"), max_distance=64) is None
+
+def test_removed_slots_are_reused():
+    """移除的項目歸還位置，之後加入不會覆寫仍存在的項目"""
+    index = NearDuplicateIndex(capacity=2)
+    index.add(1, SCOPE, "a")
+    index.add(2, SCOPE, "b")
+    index.remove("a")
+    index.add(3, SCOPE, "c")
+
+    assert index.nearest(2, SCOPE, max_distance=0) == ("b", 0)
+    assert index.nearest(3, SCOPE, max_distance=0) == ("c", 0)
+    assert index.nearest(1, SCOPE, max_distance=0) is None
+    assert len(index) == 2
+
+def test_full_index_drops_oldest_entry():
+    """沒有空位時移除最早加入的項目"""
+    index = NearDuplicateIndex(capacity=2)
+    index.add(1, SCOPE, "a")
+    index.add(2, SCOPE, "b")
+    index.add(3, SCOPE, "c")
+    assert index.nearest(1, SCOPE, max_distance=0) is None
+    assert index.nearest(2, SCOPE, max_distance=0) == ("b", 0)
+
+def test_recently_used_entry_keeps_near_match(clock):
+    """最近使用而仍在快取中的結果，在新結果加入後仍可由相近圖片命中"""
+    cache = ResultCache(max_entries=2, ttl_seconds=0, max_hash_distance=2)
+    cache.put(key("a"), {"辨識食物": "a"}, phash=0b0000)
+    cache.put(key("b"), {"辨識食物": "b"}, phash=0xFF00)
+    cache.get(key("a"))
+
+    cache.put(key("c"), {"辨識食物": "c"}, phash=0xF0F0_0000)
+
+    # b 為最久未使用的結果而被移除，a 的相近圖片仍命中
+    assert cache.get(key("a2"), phash=0b0001) == {"辨識食物": "a"}
+    assert cache.get(key("b2"), phash=0xFF00) is None
+    assert cache.stats()["near_hits"] == 1
+
+def test_evicted_and_expired_entries_leave_the_index(clock):
+    """被 LRU 移除或過期的結果同時移出近似重複索引"""
+    cache = ResultCache(max_entries=2, ttl_seconds=60, max_hash_distance=2)
+    cache.put(key("a"), {"辨識食物": "a"}, phash=0b0000)
+    cache.put(key("b"), {"辨識食物": "b"}, phash=0xFF00)
+    cache.put(key("c"), {"辨識食物": "c"}, phash=0xF0F0_0000)
+    assert len(cache._near_index) == 2
+    assert cache.get(key("a2"), phash=0b0000) is None
+
+    clock.now += 61
+    assert cache.get(key("b")) is None
+    assert len(cache._near_index) == 1
+    assert cache.get(key("c2"), phash=0xF0F0_0000) is None
+    assert len(cache._near_index) == 0
+
+def test_near_lookup_skips_expired_closest_entry(clock):
+    """最相近的結果已過期時移出索引，改用距離上限內仍有效的其他結果"""
+    cache = ResultCache(max_entries=4, ttl_seconds=60, max_hash_distance=3)
+    cache.put(key("old"), {"辨識食物": "old"}, phash=0b0000)
+    clock.now += 30
+    cache.put(key("new"), {"辨識食物": "new"}, phash=0b0111)
+
+    clock.now += 31
+    assert cache.get(key("query"), phash=0b0001) == {"辨識食物": "new"}
+    stats = cache.stats()
+    assert (stats["near_hits"], stats["expirations"], stats["misses"]) == (1, 1, 0)
+    assert len(cache._near_index) == 1
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# 多模型並行時 torch intra-op 執行緒分配的測試：推論實際所在的執行緒（執行緒池或微批次排程執行緒）都使用分配的執行緒數
+
+import threading
+
+import pytest
+
+torch = pytest.importorskip("torch")
+
+import food_recognition
+
+class ThreadCountingModel(torch.nn.Module):
+    """記錄每次推論時所在執行緒與有效的 intra-op 執行緒數"""
+
+    def __init__(self):
+        super().__init__()
+        self.lock = threading.Lock()
+        self.calls = []
+
+    def forward(self, input_tensor):
+        with self.lock:
+            self.calls.append((threading.current_thread().name, torch.get_num_threads()))
+        return torch.zeros(input_tensor.shape[0], len(food_recognition.TRAINING_LABELS))
+
+@pytest.fixture
+def thread_budget(monkeypatch):
+    """以 4 個執行緒、2 個模型同時執行分配，測試結束後還原原本的執行緒數"""
+    if not food_recognition.TORCH_AVAILABLE:
+        pytest.skip("PyTorch 不可用")
+    original_threads = torch.get_num_threads()
+    monkeypatch.setattr(food_recognition, "_TOTAL_TORCH_THREADS", 4)
+    yield food_recognition.configure_intra_op_threads(2)
+    torch.set_num_threads(original_threads)
+
+@pytest.mark.parametrize("batch_rows, thread_prefix", [(1, "ensemble"), (8, "batcher")])
+def test_forwards_use_the_intra_op_budget(thread_budget, monkeypatch, batch_rows, thread_prefix):
+    """停用與啟用微批次時，推論分別在執行緒池與排程執行緒上執行，都使用分配的執行緒數"""
+    model = ThreadCountingModel()
+    monkeypatch.setattr(food_recognition, "load_model", lambda model_name, backend=None: model)
+    monkeypatch.setattr(food_recognition, "wait_for_model_ready", lambda model_name: True)
+    monkeypatch.setattr(food_recognition, "MICRO_BATCH_MAX_SIZE", batch_rows)
+    monkeypatch.setattr(food_recognition, "_micro_batchers", {})
+
+    model_names = ["budget_model_a", "budget_model_b"]
+    input_tensors = {food_recognition.get_model_input_size(name): torch.rand(1, 3, 8, 8) for name in model_names}
+    outcomes = food_recognition.run_ensemble_models(None, model_names, input_tensors, max_workers=2, backend="torch")
+
+    assert all(not isinstance(outcome, Exception) for _, outcome in outcomes)
+    assert thread_budget == 2
+    assert len(model.calls) == 2
+    assert all(name.startswith(thread_prefix) for name, _ in model.calls)
+    assert all(num_threads == thread_budget for _, num_threads in model.calls)
+
+def test_budget_is_process_wide(thread_budget):
+    """分配在程序層級設定一次，之後建立的執行緒（如 Gradio 的請求執行緒）看到相同的值"""
+    seen = []
+    thread = threading.Thread(target=lambda: seen.append(torch.get_num_threads()))
+    thread.start()
+    thread.join()
+    assert seen == [thread_budget] and torch.get_num_threads() == thread_budget